@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+"""Compares the fitting time of the Keras and NumPy backends
+
+Fits `ModelDDDD` with each backend over the grid of the data set shapes and
+prints the seconds per epoch. The Keras backend is skipped when the
+framework is not installed."""
+
+import os, sys, time, argparse, importlib.util
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lab.data import DataRandom
+from lab.target import TGAlpha
+from lab.fitter import Fitter
+
+
+def parameters():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+
+    parser.add_argument(
+        "--observations", type=int, nargs="+", default=[1000, 10000, 100000]
+    )
+    parser.add_argument("--features", type=int, nargs="+", default=[15, 100, 500])
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch-size", dest="batch_size", type=int, default=512)
+
+    return parser.parse_args()
+
+
+def main():
+    params = parameters()
+
+    backends = ["numpy"]
+    if importlib.util.find_spec("keras") is not None:
+        backends.insert(0, "keras")
+
+    print("observations", "features", *backends, "faster", sep="\t")
+
+    for observations in params.observations:
+        for features in params.features:
+            data = (
+                DataRandom(features=features, observations=observations, seed=1)
+                .makeTarget(TGAlpha())
+                .split(testSize=0.3, seed=1)
+            )
+
+            seconds = {}
+            for backend in backends:
+                started = time.perf_counter()
+                Fitter(backend=backend, seed=1).fit(
+                    data, batchSize=params.batch_size, epochs=params.epochs
+                )
+                seconds[backend] = (time.perf_counter() - started) / params.epochs
+
+            print(
+                observations,
+                features,
+                *["{0:.4f}".format(seconds[b]) for b in backends],
+                min(seconds, key=seconds.get),
+                sep="\t"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+
+"""Times the lab hot paths and compares them with the stored baseline
+
+Runs each case over the grid of the data set shapes, keeps the best time of
+the repeats and writes the results as JSON. With `--compare` the results are
+checked against a baseline file: the cases slower by more than the tolerance
+are reported and the exit status is 1. Runs offline on CPU; the shapes over
+`--max-cells` are skipped, so the full grid fits the memory of the machine.
+
+Usage:
+    benchmarks/suite.py --save benchmarks/baselines/quick.json
+    benchmarks/suite.py --compare benchmarks/baselines/quick.json
+    benchmarks/suite.py --observations 1000 10000000 --features 10 1000"""
+
+import os, sys, json, time, shutil, argparse, datetime, platform, tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from lab.data import Data, DataRandom
+from lab.target import TGAlpha
+from lab.damager import DMGNA, DMGNoiseFeatures
+from lab.fixer import FXZero, FXMean
+from lab.fitter import Fitter
+
+FORMAT = "lab.bench/1"
+
+
+def shape(observations: int, features: int) -> tuple:
+    return observations, features
+
+
+def generate(shape: tuple, **kwargs) -> Data:
+    return DataRandom(features=shape[1], observations=shape[0], seed=1, **kwargs)
+
+
+def dataset(observations: int, features: int) -> Data:
+    return DataRandom(features=features, observations=observations, seed=1)
+
+
+def targeted(observations: int, features: int) -> Data:
+    return dataset(observations, features).makeTarget(TGAlpha())
+
+
+def damaged(observations: int, features: int) -> Data:
+    return dataset(observations, features).damage(DMGNA(seed=1), 0.01)
+
+
+def fitted(observations: int, features: int) -> Data:
+    return targeted(observations, features).split(testSize=0.3, seed=1)
+
+
+def saved(observations: int, features: int) -> str:
+    path = tempfile.mkdtemp()
+    return targeted(observations, features).save(path, format="npy", name="data")
+
+
+def fit(data: Data) -> None:
+    Fitter(backend="numpy", seed=1).fit(data, batchSize=512, epochs=2)
+
+
+def saveData(data: Data) -> None:
+    path = tempfile.mkdtemp()
+    try:
+        data.save(path, format="npy", name="data")
+    finally:
+        shutil.rmtree(path)
+
+
+def readData(url: str) -> None:
+    data = Data().read(url)
+    data.x.sum()  # touches the mapped pages
+
+
+# case name: (setup by the shape, the timed call, cleanup of the setup result)
+CASES = {
+    "generate": (shape, generate, None),
+    "generateParallel": (
+        shape,
+        lambda s: generate(s, dtype=np.float32, workers=0),
+        None,
+    ),
+    "makeTarget": (dataset, lambda d: d.makeTarget(TGAlpha()), None),
+    "DMGNA": (dataset, lambda d: d.damage(DMGNA(seed=1), 0.01), None),
+    "DMGNoiseFeatures": (
+        dataset,
+        lambda d: d.damage(DMGNoiseFeatures(seed=1), 5),
+        None,
+    ),
+    "FXZero": (damaged, lambda d: d.fix(FXZero()), None),
+    "FXMean": (damaged, lambda d: d.fix(FXMean()), None),
+    "split": (targeted, lambda d: d.split(testSize=0.3, seed=1), None),
+    "save": (targeted, saveData, None),
+    "read": (saved, readData, lambda url: shutil.rmtree(os.path.dirname(url))),
+    "fit": (fitted, fit, None),
+}
+
+
+def parameters():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+
+    parser.add_argument(
+        "--observations", type=int, nargs="+", default=[1000, 10000, 100000]
+    )
+    parser.add_argument("--features", type=int, nargs="+", default=[10, 100])
+    parser.add_argument(
+        "--cases", nargs="+", choices=list(CASES.keys()), default=list(CASES.keys())
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--max-cells",
+        dest="max_cells",
+        type=int,
+        default=10**8,
+        help="skips the shapes with more cells",
+    )
+    parser.add_argument(
+        "--min-delta",
+        dest="min_delta",
+        type=float,
+        default=0.005,
+        help="the slowdown in seconds ignored as the timer noise",
+    )
+    parser.add_argument("--save", default="", help="writes the results file")
+    parser.add_argument("--compare", default="", help="reads the baseline file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.3,
+        help="the allowed slowdown relative to the baseline",
+    )
+
+    return parser.parse_args()
+
+
+def measure(case: str, observations: int, features: int, repeats: int) -> float:
+    """Returns the best time of the case in seconds
+
+    The setup is not timed, the first run warms up the caches and is dropped."""
+    setup, call, cleanup = CASES[case]
+
+    times = []
+    for _ in range(repeats + 1):
+        state = setup(observations, features)
+        started = time.perf_counter()
+        call(state)
+        times.append(time.perf_counter() - started)
+        if cleanup is not None:
+            cleanup(state)
+
+    return min(times[1:])
+
+
+def machine():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance, minDelta=0.0):
+    """Pairs the results with the baseline ones
+
+    The case regresses, when it is slower by more than `tolerance` of the
+    baseline time and by more than `minDelta` seconds.
+
+    Returns: The rows (case, observations, features, baseline seconds, seconds,
+    ratio, regressed) of the shapes present in both."""
+    reference = {
+        (r["case"], r["observations"], r["features"]): r["seconds"]
+        for r in baseline["results"]
+    }
+
+    rows = []
+    for r in results:
+        k = (r["case"], r["observations"], r["features"])
+        if k not in reference:
+            continue
+        ratio = r["seconds"] / reference[k] if reference[k] > 0 else 1.0
+        regressed = ratio > 1.0 + tolerance and r["seconds"] - reference[k] > minDelta
+        rows.append(k + (reference[k], r["seconds"], ratio, regressed))
+
+    return rows
+
+
+def main():
+    params = parameters()
+
+    results = []
+    for case in params.cases:
+        for observations in params.observations:
+            for features in params.features:
+                if observations * features > params.max_cells:
+                    print(case, observations, features, "skipped", sep="\t")
+                    continue
+
+                seconds = measure(case, observations, features, params.repeats)
+                results.append(
+                    {
+                        "case": case,
+                        "observations": observations,
+                        "features": features,
+                        "seconds": seconds,
+                    }
+                )
+                print(case, observations, features, "{0:.6f}".format(seconds), sep="\t")
+
+    report = {
+        "format": FORMAT,
+        "created": datetime.datetime.now().isoformat(),
+        "machine": machine(),
+        "repeats": params.repeats,
+        "results": results,
+    }
+
+    if params.save != "":
+        os.makedirs(os.path.dirname(os.path.abspath(params.save)), exist_ok=True)
+        with open(params.save, "w") as f:
+            json.dump(report, f, indent=1)
+
+    if params.compare == "":
+        return
+
+    with open(params.compare) as f:
+        baseline = json.load(f)
+
+    if baseline.get("format") != FORMAT:
+        sys.exit("Unknown baseline format.")
+
+    if baseline.get("machine") != report["machine"]:
+        print("The baseline is measured on a different machine.", file=sys.stderr)
+
+    measured = {
+        (r["case"], r["observations"], r["features"]) for r in baseline["results"]
+    }
+    for r in results:
+        if (r["case"], r["observations"], r["features"]) not in measured:
+            print(
+                r["case"],
+                r["observations"],
+                r["features"],
+                "no baseline",
+                sep="\t",
+                file=sys.stderr,
+            )
+
+    regressions = 0
+    print("case", "observations", "features", "baseline", "seconds", "ratio", sep="\t")
+    for case, observations, features, before, after, ratio, regressed in compare(
+        results, baseline, params.tolerance, params.min_delta
+    ):
+        regressions += regressed
+        print(
+            case,
+            observations,
+            features,
+            "{0:.6f}".format(before),
+            "{0:.6f}".format(after),
+            "{0:.2f}".format(ratio),
+            "REGRESSION" if regressed else "",
+            sep="\t",
+        )
+
+    sys.exit(1 if regressions > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
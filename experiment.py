@@ -1,48 +1,34 @@
 #!/usr/bin/env python3
 
-import os
+import os, sys, glob
 
-from lab.data import Data, DataRandom
-from lab.target import TGAlpha
-from lab.damager import DMGNA, DMGNoiseFeatures
-from lab.fixer import FXZero, FXMean
+from lab.sweep import Sweep
 
 cwd = os.getcwd()
 
-try:
-    os.system(f"cd {cwd} & rm data/* & rm plots/*")
-except:
-    pass
+for plot in glob.glob(os.path.join(cwd, "plots", "*")):
+    os.remove(plot)
 
 
-# create data
+# the experiment grid
 
-features = 15
-observations = 10000
-noiseFeatures = 5
-split = 0.3
-na = 0.001
+grid = {
+    "features": [15],
+    "observations": [10000],
+    "noiseFeatures": [5],
+    "na": [0.001],
+    "fixer": ["zero", "mean"],
+    "split": [0.3],
+}
 
-damagedData = (
-    DataRandom(features=features, observations=observations)
-    .makeTarget(TGAlpha())
-    .damage(DMGNoiseFeatures(), noiseFeatures)
-    .split(testSize=split)
-    .damage(DMGNA(), na)
-    .save("data")
-)
+results = Sweep(grid, path="data", plots="plots", epochs=300).run()
 
-fixZeroData = Data().read(url=damagedData).fix(FXZero()).save("data")
-fixMeanData = Data().read(url=damagedData).fix(FXMean()).save("data")
+failed = [r for r in results if r["status"] != "ok"]
 
-dataSignatureFixZero = (
-    f"F={features}, OBS={observations}, NF={noiseFeatures}, NA={na}, FX=0, SPL={split}"
-)
-dataSignatureFixMean = (
-    f"F={features}, OBS={observations}, NF={noiseFeatures}, NA={na}, FX=Mu, SPL={split}"
-)
+for result in results:
+    print(result["status"], result["signature"])
 
+for result in failed:
+    print(result["error"], file=sys.stderr)
 
-cmd = f'cd {cwd} & ./fit-data-and-plot.py --data {fixZeroData} --signature "{dataSignatureFixZero}" & ./fit-data-and-plot.py --data {fixMeanData} --signature "{dataSignatureFixMean}" '
-
-os.system(cmd)
+sys.exit(1 if failed else 0)
@@ -4,10 +4,9 @@ import os, sys
 from typing import Dict
 import argparse
 
-from lab.model import ModelDDDD
-from lab.data import Data
-from lab.fitter import Fitter
-from lab.plot import FittingAccuracy, FittingLossFunction
+from multiprocessing import AuthenticationError
+
+from lab.worker import ADDRESS, run, serve, stop, submit
 
 
 def parameters() -> Dict:
@@ -22,35 +21,98 @@ def parameters() -> Dict:
         "--signature", dest="data_signature", help="sets a data signature"
     )
 
-    # parser.add_argument("--model", dest="model_file_url", help="sets a model file url")
-
-    args = parser.parse_args()
+    parser.add_argument(
+        "--epochs", dest="epochs", type=int, default=300, help="sets a number of epochs"
+    )
 
-    return args
+    parser.add_argument(
+        "--batch-size",
+        dest="batch_size",
+        type=int,
+        default=512,
+        help="sets a batch size",
+    )
 
+    parser.add_argument(
+        "--patience",
+        dest="patience",
+        type=int,
+        default=0,
+        help="stops fitting after a number of epochs without the validation accuracy improvement",
+    )
 
-def main():
-    params = parameters()
+    parser.add_argument(
+        "--min-delta",
+        dest="min_delta",
+        type=float,
+        default=0.0,
+        help="sets a minimum improvement of the validation accuracy",
+    )
 
-    dataFile = params.data_file_url
+    parser.add_argument(
+        "--backend",
+        dest="backend",
+        choices=["keras", "numpy"],
+        default="keras",
+        help="sets a training backend",
+    )
 
-    dataSignature = params.data_signature
+    parser.add_argument(
+        "--socket", dest="socket", default=ADDRESS, help="sets a worker socket path"
+    )
 
-    data = Data().read(dataFile)
+    parser.add_argument(
+        "--serve",
+        dest="serve",
+        action="store_true",
+        help="starts the worker, which keeps the framework loaded and fits the data sets sent by clients",
+    )
 
-    fitter = Fitter()
+    parser.add_argument(
+        "--stop", dest="stop", action="store_true", help="stops the worker"
+    )
 
-    history = fitter.fit(data, epochs=300)
+    # parser.add_argument("--model", dest="model_file_url", help="sets a model file url")
 
-    FittingAccuracy()
+    args = parser.parse_args()
 
-    plotAcc = FittingAccuracy(dataSignature=dataSignature)
+    return args
 
-    plotLoss = FittingLossFunction(dataSignature=dataSignature)
 
-    plotAcc.plot(history)
+def main():
+    params = parameters()
 
-    plotLoss.plot(history)
+    if params.serve:
+        serve(params.socket)
+        return
+
+    if params.stop:
+        stop(params.socket)
+        return
+
+    job = {
+        "url": params.data_file_url,
+        "signature": params.data_signature,
+        "epochs": params.epochs,
+        "batchSize": params.batch_size,
+        "patience": params.patience,
+        "minDelta": params.min_delta,
+        "backend": params.backend,
+        "plots": "plots",
+        "cwd": os.getcwd(),
+    }
+
+    try:
+        result = submit(job, params.socket)
+    except (OSError, EOFError, AuthenticationError):
+        result = run(job)  # no usable worker, fits in this process
+
+    if result["status"] != "ok":
+        print(result["error"], file=sys.stderr)
+        sys.exit(1)
+
+    if params.patience > 0:
+        print("converged at epoch", result["convergedEpoch"])
 
 
 if __name__ == "__main__":
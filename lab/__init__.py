@@ -1,2 +1,18 @@
-__all__ = ["data", "damager", "fitter", "fixer", "model", "plot", "target"]
-
+__all__ = [
+    "batches",
+    "block",
+    "cache",
+    "data",
+    "damager",
+    "fitter",
+    "fixer",
+    "log",
+    "model",
+    "plan",
+    "plot",
+    "store",
+    "sweep",
+    "target",
+    "trace",
+    "worker",
+]
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+"""The streaming batch source class"""
+
+__author__ = "Ruben R. Kazumov"
+__copyright__ = "Copyright 2019, Ruben R. Kazumov"
+__credits__ = ["Ruben R. Kazumov"]
+__license__ = "MIT"
+__version__ = [3, 0, 0]
+__maintainer__ = "Ruben R. Kazumov"
+__email__ = "kazumov@gmail.com"
+__status__ = "Production"
+
+import itertools, threading, queue
+
+from typing import Iterator, Tuple
+
+import numpy as np
+
+from lab.block import BLOCK_SIZE, blocks
+
+END = None  # the end of the epoch in the prefetch queue
+
+
+class BatchSource:
+    """Streams the batches from the memory-mapped or in-memory arrays
+
+    Reads one row block at a time, so only the block and the prefetched
+    batches are in memory. The shuffling is done at the block level: the
+    block order and the rows inside a block are permuted every epoch. The
+    next batches are read by a background thread while the current batch
+    trains."""
+
+    def __init__(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        batchSize: int = 512,
+        blockSize: int = BLOCK_SIZE,
+        shuffle: bool = True,
+        seed: int = None,
+        prefetch: int = 4,
+        dtype=np.float32,
+    ):
+        """Parameters:
+
+        - x (ndarray): The features, e.g. `np.memmap` or `lab.data.Rows`.
+        - y (ndarray): The targets.
+        - batchSize (int): Number of rows in a batch.
+        - blockSize (int): Number of rows read from the disk at once.
+        - shuffle (bool): Permutes the blocks and the rows every epoch.
+        - seed (int): Random generator seed of the shuffling.
+        - prefetch (int): Number of batches read ahead.
+        - dtype: The batch data type."""
+        if len(x) != len(y):
+            raise Exception("The features and the targets have different lengths.")
+
+        self.x = x
+        self.y = y
+        self.batchSize = batchSize
+        self.blockSize = max(blockSize, batchSize)
+        self.shuffle = shuffle
+        self.prefetch = prefetch
+        self.dtype = dtype
+        self.rng = np.random.default_rng(seed)
+
+    @property
+    def steps(self) -> int:
+        """Number of batches in an epoch"""
+        return sum(
+            -(-(stop - start) // self.batchSize)
+            for start, stop in blocks(len(self.x), self.blockSize)
+        )
+
+    def batches(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Reads the batches of one epoch in the calling thread"""
+        ranges = list(blocks(len(self.x), self.blockSize))
+
+        if self.shuffle:
+            ranges = [ranges[i] for i in self.rng.permutation(len(ranges))]
+
+        for start, stop in ranges:
+            if hasattr(self.x, "rows"):  # the subset with the damage overlay
+                x = np.empty((stop - start,) + self.x.shape[1:], dtype=self.dtype)
+                x = self.x.rows(start, stop, out=x)
+            else:
+                x = np.asarray(self.x[start:stop], dtype=self.dtype)
+            y = np.asarray(self.y[start:stop], dtype=self.dtype)
+
+            if self.shuffle:
+                order = self.rng.permutation(len(x))
+                x, y = x[order], y[order]
+
+            for i in range(0, len(x), self.batchSize):
+                yield x[i : i + self.batchSize], y[i : i + self.batchSize]
+
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Iterates over the batches of one epoch, read by the background thread"""
+        batches = queue.Queue(maxsize=self.prefetch)
+        stopped = threading.Event()
+
+        def read() -> None:
+            try:
+                for batch in self.batches():
+                    while not stopped.is_set():
+                        try:
+                            batches.put(batch, timeout=0.1)
+                            break
+                        except queue.Full:
+                            pass
+                    if stopped.is_set():
+                        return
+                batches.put(END)
+            except Exception as e:
+                batches.put(e)
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+
+        try:
+            while True:
+                batch = batches.get()
+                if batch is END:
+                    break
+                if isinstance(batch, Exception):
+                    raise batch
+                yield batch
+        finally:
+            stopped.set()
+            reader.join()
+
+    def generator(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Iterates over the batches of the endless epochs, for `fit_generator()`"""
+        return itertools.chain.from_iterable(iter(self) for _ in itertools.count())
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+"""The row block helpers"""
+
+__author__ = "Ruben R. Kazumov"
+__copyright__ = "Copyright 2019, Ruben R. Kazumov"
+__credits__ = ["Ruben R. Kazumov"]
+__license__ = "MIT"
+__version__ = [3, 0, 0]
+__maintainer__ = "Ruben R. Kazumov"
+__email__ = "kazumov@gmail.com"
+__status__ = "Production"
+
+import os
+
+from typing import Callable, Iterator, List, Tuple
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+BLOCK_SIZE = 65536  # default number of rows in a block
+
+
+def blocks(rows: int, blockSize: int = BLOCK_SIZE) -> Iterator[Tuple[int, int]]:
+    """Iterates over the row blocks
+
+    Parameters:
+    - rows (int): Number of rows.
+    - blockSize (int): Number of rows in a block.
+
+    Returns: (Iterator[Tuple[int, int]]) The `(start, stop)` row ranges."""
+    if blockSize < 1:
+        raise Exception("The block size must be positive.")
+
+    for start in range(0, rows, blockSize):
+        yield start, min(start + blockSize, rows)
+
+
+def mapBlocks(
+    func: Callable[[int, int], object],
+    rows: int,
+    blockSize: int = BLOCK_SIZE,
+    workers: int = 1,
+) -> List[object]:
+    """Calls the function for each row block
+
+    NumPy releases the GIL in most of the array operations, so the blocks
+    run concurrently in a thread pool.
+
+    Parameters:
+    - func (Callable): Function of the `(start, stop)` row range.
+    - rows (int): Number of rows.
+    - blockSize (int): Number of rows in a block.
+    - workers (int): Number of threads, 0 for the number of CPU cores.
+
+    Returns: (List[object]) The function results in the block order."""
+    ranges = list(blocks(rows, blockSize))
+
+    if workers == 0:
+        workers = os.cpu_count() or 1
+
+    if workers == 1 or len(ranges) < 2:
+        return [func(start, stop) for start, stop in ranges]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda r: func(*r), ranges))
+
+
+def allocate(shape: Tuple[int, ...], dtype=float, url: str = "") -> np.ndarray:
+    """Allocates the output array
+
+    Parameters:
+    - shape (Tuple[int, ...]): Array shape.
+    - dtype: Array data type.
+    - url (str): Path to `.npy` file for the memory-mapped array, empty for
+      the in-memory array.
+
+    Returns: (ndarray) The uninitialized array."""
+    if url == "":
+        return np.empty(shape, dtype=dtype)
+
+    return np.lib.format.open_memmap(url, mode="w+", dtype=dtype, shape=shape)
+
+
+def generators(seed: int, count: int) -> List[np.random.Generator]:
+    """Creates the independent random generators
+
+    The generator of a block depends only on the seed and the block number, so
+    the blocks get the same random numbers in any processing order.
+
+    Parameters:
+    - seed (int): Random generator seed, `None` for the seed drawn from the
+      global random generator.
+    - count (int): Number of generators.
+
+    Returns: (List[Generator]) The random generators."""
+    if seed is None:
+        seed = np.random.randint(0, 2 ** 63 - 1)  # follows np.random.seed()
+
+    return [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(count)]
+
+
+def seeds(seed: int, count: int) -> List[int]:
+    """Derives the independent seeds of the pipeline steps
+
+    The steps seeded with the same number draw the same streams, e.g. the
+    damage mask of a block is the data of the next block, see `generators()`.
+
+    Parameters:
+    - seed (int): Random generator seed, `None` for the not reproducible steps.
+    - count (int): Number of seeds.
+
+    Returns: (List[int]) The seeds, `None` for `None` seed."""
+    if seed is None:
+        return [None] * count
+
+    return [
+        int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(count)
+    ]
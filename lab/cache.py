@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+"""The data set cache class"""
+
+__author__ = "Ruben R. Kazumov"
+__copyright__ = "Copyright 2019, Ruben R. Kazumov"
+__credits__ = ["Ruben R. Kazumov"]
+__license__ = "MIT"
+__version__ = [3, 0, 0]
+__maintainer__ = "Ruben R. Kazumov"
+__email__ = "kazumov@gmail.com"
+__status__ = "Production"
+
+import os, re, json, uuid, shutil, hashlib, inspect, functools
+
+from typing import Callable, Dict, List, Union
+
+import logging, logging.config
+
+import numpy as np
+
+from lab.log import logger
+
+SKIP = {"logger", "rng", "workers"}  # the attributes excluded from the recipe
+
+STEPS = ["makeTarget", "damage", "split", "fix"]  # the recordable Data methods
+
+KEY = re.compile(r"^[0-9a-f]{64}(\.pkl)?$")  # the names of the stored data sets
+
+UNKEYED = "unkeyed"  # the subdirectory of the not reproducible data sets
+
+
+def describe(value: object) -> object:
+    """Converts a pipeline step argument into a JSON serializable description
+
+    Arrays and the lists of numbers are described by the digest of their
+    content, objects by the class name and the public attributes.
+
+    Parameters:
+    - value (object): The argument value.
+
+    Returns: (object) The description."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+
+    if isinstance(value, np.generic):
+        return value.item()
+
+    if isinstance(value, np.ndarray):
+        content = np.ascontiguousarray(value)
+        return {
+            "shape": list(content.shape),
+            "dtype": content.dtype.str,
+            "sha256": hashlib.sha256(content.view(np.uint8)).hexdigest(),
+        }
+
+    if isinstance(value, (list, tuple)):
+        try:
+            content = np.asarray(value)
+        except ValueError:  # the ragged lists
+            content = None
+        if content is not None and content.dtype.kind in "biufc":
+            return describe(content)
+        return [describe(v) for v in value]
+
+    if isinstance(value, dict):
+        return {str(k): describe(v) for k, v in value.items()}
+
+    if isinstance(value, type):
+        return value.__name__
+
+    description = {"class": value.__class__.__name__}
+    for attr, v in vars(value).items():
+        if attr.startswith("_") or attr in SKIP:
+            continue
+        description[attr] = describe(v)
+
+    return description
+
+
+def describeCall(method: Callable, args: tuple, kwargs: dict, ignore=()) -> Dict:
+    """Describes a pipeline step call
+
+    Parameters:
+    - method (Callable): The unbound `Data` method.
+    - args (tuple): Positional arguments without `self`.
+    - kwargs (dict): Keyword arguments.
+    - ignore: Names of the arguments, which do not change the result.
+
+    Returns: (Dict) The step description."""
+    bound = inspect.signature(method).bind(None, *args, **kwargs)
+    bound.apply_defaults()
+
+    name = method.__qualname__.split(".")
+    step = {"step": name[0] if name[-1] == "__init__" else name[-1]}
+
+    for i, (arg, value) in enumerate(bound.arguments.items()):
+        if i == 0 or arg in ignore:
+            continue
+        step[arg] = describe(value)
+
+    return step
+
+
+def recorded(ignore=()) -> Callable:
+    """Decorates the `Data` method to record its call in the `recipe` attribute
+
+    Parameters:
+    - ignore: Names of the arguments, which do not change the result."""
+
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            step = describeCall(method, args, kwargs, ignore)
+            result = method(self, *args, **kwargs)
+            self.recipe.append(step)
+            return result
+
+        wrapper.ignore = ignore
+        return wrapper
+
+    return decorator
+
+
+def reproducible(recipe: object) -> bool:
+    """Checks all the random steps of the recipe have a seed
+
+    Parameters:
+    - recipe (object): The recipe or its part.
+
+    Returns: (bool) True if the recipe produces the same data on every run."""
+    if isinstance(recipe, dict):
+        if "seed" in recipe and recipe["seed"] is None:
+            return False
+        return all(reproducible(v) for v in recipe.values())
+
+    if isinstance(recipe, list):
+        return all(reproducible(v) for v in recipe)
+
+    return True
+
+
+def key(recipe: List[Dict]) -> str:
+    """Calculates the content address of the data set
+
+    Parameters:
+    - recipe (List[Dict]): The data set recipe.
+
+    Returns: (str) The key, empty for a not reproducible recipe."""
+    if len(recipe) == 0 or not reproducible(recipe):
+        return ""
+
+    return hashlib.sha256(json.dumps(recipe, sort_keys=True).encode()).hexdigest()
+
+
+class Recipe:
+    """The recorded data set pipeline
+
+    Records the constructor parameters and the chained `Data` method calls
+    without running them, e.g.:
+
+    `Recipe(DataRandom, features=15, seed=1).makeTarget(TGAlpha()).split(seed=2)`"""
+
+    def __init__(self, source: type, *args, **kwargs):
+        """Parameters:
+
+        - source (type): The `Data` class, which creates the data set.
+        - args, kwargs: The constructor parameters."""
+        self.source = source
+        self.args = args
+        self.kwargs = kwargs
+        self.calls = []
+
+    def __getattr__(self, name: str) -> Callable:
+        if name not in STEPS:
+            raise AttributeError(name)
+
+        def record(*args, **kwargs) -> Recipe:
+            self.calls.append((name, args, kwargs))
+            return self
+
+        return record
+
+    @property
+    def steps(self) -> List[Dict]:
+        """The recipe as recorded by `Data` after the build"""
+        calls = [("__init__", self.args, self.kwargs)] + self.calls
+
+        steps = []
+        for name, args, kwargs in calls:
+            method = getattr(self.source, name)
+            steps.append(
+                describeCall(method, args, kwargs, getattr(method, "ignore", ()))
+            )
+
+        return steps
+
+    def build(self) -> Data:
+        """Runs the pipeline
+
+        Returns: (Data) The data set."""
+        data = self.source(*self.args, **self.kwargs)
+
+        for name, args, kwargs in self.calls:
+            data = getattr(data, name)(*args, **kwargs)
+
+        return data
+
+
+class Cache:
+    """The content-addressed data set storage
+
+    The data sets are stored under the key of their recipe. The least recently
+    used data sets are removed, when the cache size exceeds the limit."""
+
+    def __init__(
+        self, path: str = "data", sizeLimit: int = 2 ** 30, format: str = "npy"
+    ):
+        """Parameters:
+
+        - path (str): Path to the cache directory.
+        - sizeLimit (int): Cache size limit in bytes.
+        - format (str): Data set format, `npy` or `pickle`."""
+        self.path = path
+        self.sizeLimit = sizeLimit
+        self.format = format
+
+        os.makedirs(path, exist_ok=True)
+
+        self.logger = logger(__class__.__name__)
+
+    def url(self, recipe: Union[Recipe, List[Dict]]) -> str:
+        """Finds the stored data set
+
+        Parameters:
+        - recipe (Union[Recipe, List[Dict]]): The data set recipe.
+
+        Returns: (str) URL to the data set, empty if the cache does not consist it."""
+        if isinstance(recipe, Recipe):
+            recipe = recipe.steps
+
+        k = key(recipe)
+        if k == "":
+            return ""
+
+        for name in [k, k + ".pkl"]:
+            url = self.path + os.sep + name
+            if os.path.exists(url):
+                os.utime(url)  # the last use time
+                self.logger.info("url(): cache hit `%s`", url)
+                return url
+
+        return ""
+
+    def put(self, data: Data) -> str:
+        """Stores the data set
+
+        A not reproducible data set is stored under the random name in the
+        `unkeyed` subdirectory and is never returned by the cache, it counts
+        against the size limit and is evicted like the other data sets.
+
+        Parameters:
+        - data (Data): The data set.
+
+        Returns: (str) URL to the data set."""
+        url = self.url(data.recipe)
+        if url != "":
+            return url
+
+        k = key(data.recipe)
+        if k == "":
+            path = self.path + os.sep + UNKEYED
+            os.makedirs(path, exist_ok=True)
+            url = data.save(path, format=self.format)
+        else:
+            # the data set is written under the temporary name and renamed, so
+            # an interrupted write is never found by `url()`
+            suffix = ".pkl" if self.format == "pickle" else ""
+            name = "tmp-" + str(uuid.uuid4())
+            temporary = self.path + os.sep + name + suffix
+            url = self.path + os.sep + k + suffix
+            try:
+                data.save(self.path, format=self.format, name=name)
+            except BaseException:
+                if os.path.exists(temporary):
+                    remove(temporary)
+                raise
+
+            try:
+                os.replace(temporary, url)
+            except OSError:
+                remove(temporary)
+                if not os.path.exists(url):  # not stored by the other process
+                    raise
+
+        self.evict(keep=url)
+
+        return url
+
+    def build(self, recipe: Recipe) -> str:
+        """Returns the stored data set or builds and stores it
+
+        Parameters:
+        - recipe (Recipe): The data set recipe.
+
+        Returns: (str) URL to the data set."""
+        url = self.url(recipe)
+        if url != "":
+            return url
+
+        return self.put(recipe.build())
+
+    def evict(self, keep: str = "") -> None:
+        """Removes the least recently used data sets over the size limit
+
+        Parameters:
+        - keep (str): URL to the data set, which must stay in the cache."""
+        unkeyed = self.path + os.sep + UNKEYED
+        urls = [
+            self.path + os.sep + name
+            for name in os.listdir(self.path)
+            if KEY.match(name) is not None
+        ]
+        if os.path.isdir(unkeyed):
+            urls.extend(unkeyed + os.sep + name for name in os.listdir(unkeyed))
+
+        entries = [(os.stat(url).st_mtime, size(url), url) for url in urls]
+
+        total = sum(e[1] for e in entries)
+
+        for _, entrySize, url in sorted(entries):
+            if total <= self.sizeLimit:
+                break
+            if url == keep:
+                continue
+
+            remove(url)
+            total -= entrySize
+
+            self.logger.info("evict(): removed `%s`", url)
+
+        return None
+
+
+def remove(url: str) -> None:
+    """Removes the file or directory"""
+    if os.path.isdir(url):
+        shutil.rmtree(url)
+    else:
+        os.remove(url)
+
+
+def size(url: str) -> int:
+    """Calculates the size of the file or directory in bytes"""
+    if not os.path.isdir(url):
+        return os.stat(url).st_size
+
+    return sum(
+        os.stat(os.path.join(root, f)).st_size
+        for root, _, files in os.walk(url)
+        for f in files
+    )
@@ -13,7 +13,7 @@ __status__ = "Production"
 
 import os, sys, functools, math, uuid, itertools
 
-from typing import List, Callable, Union
+from typing import List, Callable, Tuple, Union
 
 import logging, logging.config
 
@@ -21,31 +21,154 @@ from abc import ABC, abstractmethod
 
 import numpy as np
 
+from lab.block import BLOCK_SIZE, blocks, generators, mapBlocks
+from lab.log import logger, record
+
+
+def sample(rng: np.random.Generator, population: int, k: int) -> ndarray:
+    """Samples the integers without replacement
+
+    Draws the random integers and rejects the repeated ones, the cost is
+    O(k log k) and does not depend on the population size.
+
+    Parameters:
+    - rng (Generator): The random generator.
+    - population (int): The integers are drawn from the range [0, population).
+    - k (int): Number of the integers.
+
+    Returns: (ndarray) The integers in the random order."""
+    if k > population:
+        raise Exception("Cannot sample {0} of {1} elements.".format(k, population))
+
+    if 2 * k > population:
+        # the dense sample is the complement of the sparse one
+        keep = np.ones(population, dtype=bool)
+        keep[sample(rng, population, population - k)] = False
+        return rng.permutation(np.flatnonzero(keep))
+
+    drawn = np.zeros(0, dtype=np.int64)
+    while len(drawn) < k:
+        missing = k - len(drawn)
+        extra = int(missing * (k / (population - k + 1))) + 16  # the expected repeats
+        drawn = np.concatenate((drawn, rng.integers(0, population, missing + extra)))
+        _, first = np.unique(drawn, return_index=True)
+        drawn = drawn[np.sort(first)]  # the first occurrences in the drawing order
+
+    return drawn[:k]
+
+
+def allot(rng: np.random.Generator, sizes: ndarray, k: int) -> ndarray:
+    """Allots the sample size to the blocks
+
+    Draws the multivariate hypergeometric counts block by block, the huge
+    populations (over 10^9) use the binomial approximation.
+
+    Parameters:
+    - rng (Generator): The random generator.
+    - sizes (ndarray): The block sizes.
+    - k (int): The total sample size.
+
+    Returns: (ndarray) The sample size of each block."""
+    counts = np.zeros(len(sizes), dtype=np.int64)
+    rest = int(np.sum(sizes))
+
+    for b, size in enumerate(sizes):
+        size = int(size)
+        rest -= size
+
+        if k == 0:
+            break
+
+        if rest == 0:
+            counts[b] = k
+        elif size < 10 ** 9 and rest < 10 ** 9:
+            counts[b] = rng.hypergeometric(size, rest, k)
+        else:
+            counts[b] = min(max(rng.binomial(k, size / (size + rest)), k - rest), size)
+
+        k -= counts[b]
+
+    return counts
+
 
 class Damager(ABC):
-    """The data damager"""
+    """The data damager
+
+    Attributes:
+    - seed (int): Random generator seed, `None` for the global random generator.
+    - blockSize (int): Number of rows in a sampling block.
+    - workers (int): Number of threads damaging the blocks."""
 
     def __init__(self):
-        logging.basicConfig(
-            filename="app.log",
-            filemode="w",
-            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            level=logging.INFO,
-        )
+        self.seed = None
+        self.blockSize = BLOCK_SIZE
+        self.workers = 1
 
-        self.logger = logging.getLogger(__class__.__name__)
+        self.logger = logger(__class__.__name__)
 
     @abstractmethod
     def __call__(self, data: ndarray, quantity: Union(float, int)) -> ndarray:
         pass
 
+    def mask(self, shape: Tuple[int, int], quantity: Union(float, int)) -> ndarray:
+        """Selects the damaged cells without changing the data
+
+        Parameters:
+        - shape (Tuple[int, int]): The data shape.
+        - quantity (Union(float, int)): The damage quantity.
+
+        Returns: (ndarray) Sorted flat indices of the damaged cells."""
+        raise NotImplementedError(
+            "The damager {0} does not support the damage overlay.".format(
+                self.__class__.__name__
+            )
+        )
+
+    def sample(
+        self, shape: Tuple[int, int], k: int, block: int = None
+    ) -> List[ndarray]:
+        """Samples the cells in the row blocks
+
+        Parameters:
+        - shape (Tuple[int, int]): The data shape.
+        - k (int): Number of the cells.
+        - block (int): Number of the only block to sample, `None` for all the
+          blocks. The block gets the same cells as in the sample of all blocks.
+
+        Returns: (List[ndarray]) Sorted flat indices of the cells in each block,
+        relative to the block start."""
+        ranges = list(blocks(shape[0], self.blockSize))
+        sizes = np.array([(stop - start) * shape[1] for start, stop in ranges])
+
+        rngs = generators(self.seed, len(ranges) + 1)
+        counts = allot(rngs[0], sizes, k)
+
+        return [
+            np.sort(sample(rngs[b + 1], sizes[b], counts[b]))
+            for b in (range(len(ranges)) if block is None else [block])
+        ]
+
 
 class DMGNA(Damager):
-    """Damages the data array by replacing cells in the training data by NA"""
+    """Damages the data array by replacing cells in the training data by NA
 
-    def __init__(self):
+    The NA cells are sampled independently in the row blocks. The number of
+    NA cells of each block is drawn first, then each block draws its cells
+    with its own random generator, so the cost scales with the number of NA
+    cells and the result depends only on the seed and the block size."""
+
+    def __init__(self, seed: int = None, blockSize: int = BLOCK_SIZE, workers: int = 1):
+        """Parameters:
+
+        - seed (int): Random generator seed, `None` for the seed drawn from the
+          global random generator.
+        - blockSize (int): Number of rows in a sampling block.
+        - workers (int): Number of threads damaging the blocks."""
         super().__init__()
-        self.logger = logging.getLogger(__class__.__name__)
+        self.seed = seed
+        self.blockSize = blockSize
+        self.workers = workers
+        self.logger = logger(__class__.__name__)
 
     def __call__(self, data: ndarray, quantity: Union(float, int)) -> ndarray:
         """The damager callable function
@@ -54,21 +177,148 @@ class DMGNA(Damager):
         - data (ndarray): Data to damage.
         - amount (float): Proportion of the damaged to undamaged elements."""
         numberOfNaN = int(data.shape[0] * data.shape[1] * quantity)
-        data.ravel()[np.random.choice(data.size, numberOfNaN, replace=False)] = np.nan
-        self.logger.info(
-            "damaged {0} elements of the {1}".format(
-                numberOfNaN, data.__class__.__name__
-            )
-        )
+
+        cells = self.sample(data.shape, numberOfNaN)
+
+        def damage(start: int, stop: int) -> None:
+            np.put(data[start:stop], cells[start // self.blockSize], np.nan)
+
+        mapBlocks(damage, data.shape[0], self.blockSize, self.workers)
+
+        record(self.logger, "damage", shape=data.shape, cells=numberOfNaN)
         return data
 
+    def mask(self, shape: Tuple[int, int], quantity: float) -> ndarray:
+        """Selects the NA cells without changing the data
+
+        Parameters:
+        - shape (Tuple[int, int]): The data shape.
+        - quantity (float): Proportion of the damaged to undamaged elements.
+
+        Returns: (ndarray) Sorted flat indices of the NA cells."""
+        numberOfNaN = int(shape[0] * shape[1] * quantity)
+
+        cells = self.sample(shape, numberOfNaN)
+        starts = np.arange(0, shape[0], self.blockSize, dtype=np.int64) * shape[1]
+
+        return np.concatenate(
+            [np.zeros(0, dtype=np.int64)] + [c + s for c, s in zip(cells, starts)]
+        )
+
+    def masks(
+        self,
+        shape: Tuple[int, int],
+        rates: List[Union(float, List[float])],
+        pattern: str = "cell",
+        blockLength: int = 16,
+    ) -> List[ndarray]:
+        """Selects the nested NA cells for the list of rates
+
+        The damage units (cells, rows or blocks) are ranked once, the mask of
+        each rate is a prefix of the same ranking. So the mask of a lower rate
+        is a subset of the mask of a higher rate.
+
+        Parameters:
+        - shape (Tuple[int, int]): The data shape.
+        - rates (List[Union(float, List[float])]): The proportions of the
+          damaged units, a rate can be a list of the per-column rates.
+        - pattern (str): The damage unit: `cell`, `row` (the whole row is NA)
+          or `block` (`blockLength` consecutive rows of a column are NA).
+        - blockLength (int): Number of rows in a damaged block.
+
+        Returns: (List[ndarray]) Sorted flat indices of the NA cells for each rate."""
+        if pattern not in ["cell", "row", "block"]:
+            raise Exception("Unknown damage pattern `{0}`.".format(pattern))
+
+        rows, features = shape
+        population = rows if pattern != "block" else -(-rows // blockLength)
+
+        count = len(list(blocks(rows, self.blockSize)))
+        rngs = generators(self.seed, count + 2 + features)[count + 1 :]
+
+        if any(np.ndim(rate) > 0 for rate in rates):
+            if pattern == "row":
+                raise Exception("The row pattern has no per-column rates.")
+
+            rates = np.array([np.broadcast_to(r, (features,)) for r in rates])
+            masks = [[] for _ in rates]
+
+            for j in range(features):
+                k = (population * rates[:, j]).astype(np.int64)
+                ranking = sample(rngs[1 + j], population, int(k.max()))
+                for mask, prefix in zip(masks, k):
+                    mask.append(
+                        self.expand(ranking[:prefix], j, shape, pattern, blockLength)
+                    )
+
+            return [np.sort(np.concatenate(mask)) for mask in masks]
+
+        if pattern == "cell":
+            ranking = self.mask(shape, max(rates))
+            ranking = ranking[rngs[0].permutation(len(ranking))]
+            population *= features
+        else:
+            if pattern == "block":
+                population *= features
+            ranking = sample(rngs[0], population, int(population * max(rates)))
+
+        return [
+            np.sort(
+                self.expand(
+                    ranking[: int(population * rate)], None, shape, pattern, blockLength
+                )
+            )
+            for rate in rates
+        ]
+
+    def expand(
+        self,
+        units: ndarray,
+        column: int,
+        shape: Tuple[int, int],
+        pattern: str,
+        blockLength: int,
+    ) -> ndarray:
+        """Converts the damage units into flat indices of the cells
+
+        Parameters:
+        - units (ndarray): The units, rows of the column or blocks of the column
+          when the column is given, flat indices of the units otherwise.
+        - column (int): The column of the units, `None` for all columns.
+        - shape (Tuple[int, int]): The data shape.
+        - pattern (str): The damage unit: `cell`, `row` or `block`.
+        - blockLength (int): Number of rows in a damaged block.
+
+        Returns: (ndarray) Flat indices of the cells."""
+        rows, features = shape
+        units = units.astype(np.int64)
+
+        if pattern == "row":
+            return (units[:, None] * features + np.arange(features)).ravel()
+
+        if column is None:
+            if pattern == "cell":
+                return units
+            units, column = units // features, units % features
+
+        if pattern == "cell":
+            return units * features + column
+
+        firstRows = units[:, None] * blockLength + np.arange(blockLength)
+        cells = firstRows * features + np.reshape(column, (-1, 1))
+        return cells[firstRows < rows]
+
 
 class DMGNoiseFeatures(Damager):
     """Damages the data by adding noise features"""
 
-    def __init__(self):
+    def __init__(self, seed: int = None):
+        """Parameters:
+
+        - seed (int): Random generator seed, `None` for the global random generator."""
         super().__init__()
-        self.logger = logging.getLogger(__class__.__name__)
+        self.seed = seed
+        self.logger = logger(__class__.__name__)
 
     def __call__(self, data: ndarray, quantity: int) -> ndarray:
         """The damager callable function
@@ -76,22 +326,50 @@ class DMGNoiseFeatures(Damager):
         Properties:
         - data (ndarray): Data.
         - quantity (int): Number of features with a noise content."""
-        noise = np.random.rand(data.shape[0], quantity)
+        if self.seed is None:
+            noise = np.random.rand(data.shape[0], quantity)
+        else:
+            noise = np.random.default_rng(self.seed).random((data.shape[0], quantity))
         data = np.concatenate((data, noise), axis=1)
-        self.logger.info(
-            "{1} damaged by appending {0} noise features".format(
-                quantity, data.__class__.__name__
-            )
-        )
+        record(self.logger, "damage", shape=data.shape, features=quantity)
         return data
 
 
 class DMGNoiseValues(Damager):
-    """Damages the data by replacing the real values by noise"""
+    """Damages the data by replacing the real values by noise
 
-    def __init__(self):
+    The noise cells are sampled in the row blocks like the NA cells of `DMGNA`.
+    The values are replaced in place block by block."""
+
+    def __init__(
+        self,
+        seed: int = None,
+        distribution: str = "uniform",
+        keepRange: bool = True,
+        blockSize: int = BLOCK_SIZE,
+        workers: int = 1,
+    ):
+        """Parameters:
+
+        - seed (int): Random generator seed, `None` for the seed drawn from the
+          global random generator.
+        - distribution (str): The noise distribution, `uniform` or `normal`.
+        - keepRange (bool): Draws the noise of a feature from its value range
+          (uniform) or with its mean and standard deviation (normal), instead
+          of the standard distribution.
+        - blockSize (int): Number of rows in a sampling block.
+        - workers (int): Number of threads damaging the blocks."""
         super().__init__()
-        self.logger = logging.getLogger(__class__.__name__)
+
+        if distribution not in ["uniform", "normal"]:
+            raise Exception("Unknown noise distribution `{0}`.".format(distribution))
+
+        self.seed = seed
+        self.distribution = distribution
+        self.keepRange = keepRange
+        self.blockSize = blockSize
+        self.workers = workers
+        self.logger = logger(__class__.__name__)
 
     def __call__(self, data: ndarray, quantity: float) -> ndarray:
         """The damager callable function
@@ -101,11 +379,70 @@ class DMGNoiseValues(Damager):
         - quantity (float): Proportion damaged/undamaged of elements."""
         numberOfNoiseElements = int(data.shape[0] * data.shape[1] * quantity)
 
-        raise Exception("The metod `DMGNoiseValues.__call__()` implemented")
+        location, scale = self.parameters(data)
+
+        cells = self.sample(data.shape, numberOfNoiseElements)
+        rngs = generators(self.seed, 2 * len(cells) + 1)[len(cells) + 1 :]
+
+        def damage(start: int, stop: int) -> None:
+            b = start // self.blockSize
+            feature = cells[b] % data.shape[1]
 
-        self.logger.info(
-            "damaged {0} elements of the {1}".format(
-                numberOfNoiseElements, data.__class__.__name__
+            if self.distribution == "uniform":
+                noise = rngs[b].random(len(feature))
+            else:
+                noise = rngs[b].standard_normal(len(feature))
+
+            np.put(
+                data[start:stop], cells[b], location[feature] + scale[feature] * noise
             )
-        )
+
+        mapBlocks(damage, data.shape[0], self.blockSize, self.workers)
+
+        record(self.logger, "damage", shape=data.shape, cells=numberOfNoiseElements)
         return data
+
+    def parameters(self, data: ndarray) -> Tuple[ndarray, ndarray]:
+        """Calculates the noise location and scale of each feature
+
+        The statistics are accumulated in one pass over the row blocks, NA
+        cells are ignored.
+
+        Parameters:
+        - data (ndarray): Data.
+
+        Returns: (Tuple[ndarray, ndarray]) The location and scale arrays."""
+        features = data.shape[1]
+
+        if not self.keepRange:
+            return np.zeros(features), np.ones(features)
+
+        if self.distribution == "uniform":
+            ranges = mapBlocks(
+                lambda start, stop: (
+                    np.nanmin(data[start:stop], axis=0),
+                    np.nanmax(data[start:stop], axis=0),
+                ),
+                data.shape[0],
+                self.blockSize,
+                self.workers,
+            )
+            low = np.nanmin([r[0] for r in ranges], axis=0)
+            high = np.nanmax([r[1] for r in ranges], axis=0)
+            return low, high - low
+
+        sums = mapBlocks(
+            lambda start, stop: np.stack(
+                (
+                    np.sum(~np.isnan(data[start:stop]), axis=0),
+                    np.nansum(data[start:stop], axis=0),
+                    np.nansum(np.square(data[start:stop]), axis=0),
+                )
+            ),
+            data.shape[0],
+            self.blockSize,
+            self.workers,
+        )
+        count, total, squares = np.sum(sums, axis=0)
+        mean = total / count
+        return mean, np.sqrt(np.maximum(squares / count - mean ** 2, 0.0))
@@ -11,23 +11,175 @@ __maintainer__ = "Ruben R. Kazumov"
 __email__ = "kazumov@gmail.com"
 __status__ = "Production"
 
-import os, sys, functools, math, uuid, itertools
+import os, sys, functools, math, uuid, itertools, time
 
-from typing import List, Callable, Union
+from typing import Callable, Iterator, List, Tuple, Union
 
 import logging, logging.config
 
-import pickle
+import pickle, json, datetime, copy
 
 import numpy as np
 
-from pandas import DataFrame
+from lab.target import TargetGenerator, TGAlpha, batch
 
-from sklearn.model_selection import train_test_split as trainTestSplit
+from lab.damager import Damager
 
-from lab.target import TargetGenerator, TGAlpha
+from lab.block import BLOCK_SIZE, allocate, blocks, generators, mapBlocks
 
-from lab.damager import Damager
+from lab.cache import describe, describeCall, recorded
+from lab.plan import Plan
+from lab.log import logger, record
+from lab.trace import traced
+
+ARRAYS = [
+    "x",
+    "y",
+    "xTrain",
+    "xTest",
+    "yTrain",
+    "yTest",
+    "na",
+    "fill",
+    "rowsTrain",
+    "rowsTest",
+]  # stored
+
+MANIFEST = "manifest.json"
+
+MANIFEST_FORMAT = "lab.data/1"
+
+INFO_ROWS = 3  # the rows of the expanded `info()`
+
+
+def stratifiedPermutation(
+    rng: np.random.Generator, y: np.ndarray, testSize: float
+) -> Tuple[np.ndarray, int]:
+    """Permutes the rows, so the last rows are the test subset with the target
+    class proportions
+
+    Parameters:
+    - rng (Generator): The random generator.
+    - y (ndarray): The target classes.
+    - testSize (float): Split proportion.
+
+    Returns: (Tuple[ndarray, int]) The row order and the first test row."""
+    n = len(y)
+    classes, inverse = np.unique(np.asarray(y).ravel(), return_inverse=True)
+
+    counts = np.bincount(inverse, minlength=len(classes))
+    tests = np.floor(counts * testSize).astype(int)
+
+    # the rounding rest goes to the classes with the largest remainders
+    rest = math.ceil(testSize * n) - tests.sum()
+    if rest > 0:
+        tests[np.argsort(tests - counts * testSize)[:rest]] += 1
+
+    grouped = rng.permutation(n)
+    grouped = grouped[np.argsort(inverse[grouped], kind="stable")]
+
+    rank = np.arange(n) - np.repeat(np.cumsum(counts) - counts, counts)
+    test = rank < np.repeat(tests, counts)
+
+    order = np.concatenate(
+        (rng.permutation(grouped[~test]), rng.permutation(grouped[test]))
+    )
+
+    return order, n - int(test.sum())
+
+
+def permute(
+    arrays: List[np.ndarray], rng: np.random.Generator, order: np.ndarray = None
+) -> List[np.ndarray]:
+    """Reorders the rows of the arrays in place
+
+    Parameters:
+    - arrays (List[ndarray]): The arrays of the same length. The read-only
+      arrays are copied.
+    - rng (Generator): The random generator of the random order, all the
+      arrays get the same one.
+    - order (ndarray): The row order, the random one for `None`.
+
+    Returns: (List[ndarray]) The reordered arrays."""
+    state = rng.bit_generator.state
+
+    result = []
+    for a in arrays:
+        if order is not None:
+            if a.flags.writeable:
+                a[...] = a[order]
+            else:
+                a = a[order]
+        else:
+            rng.bit_generator.state = state  # the same order of all the arrays
+            if a.flags.writeable:
+                rng.shuffle(a)
+            else:
+                a = a[rng.permutation(len(a))]
+        result.append(a)
+
+    return result
+
+
+def swap(a: np.ndarray, i: int, j: int, size: int) -> None:
+    """Swaps the not overlapping row ranges of the array in place"""
+    if i == j or size == 0:
+        return
+    rows = a[i : i + size].copy()
+    a[i : i + size] = a[j : j + size]
+    a[j : j + size] = rows
+
+
+class Rows:
+    """The rows of the data set with the damage overlay applied
+
+    The array-like subset reads the rows on access by `Data.rows()`, so the
+    fixed variants of the data share `x` instead of copying the subsets. The
+    slices and the row number arrays return the ndarray rows."""
+
+    def __init__(self, data: Data, index: np.ndarray = None):
+        """Parameters:
+
+        - data (Data): The data set.
+        - index (ndarray): The rows of `x` in the subset, `None` for all the rows."""
+        self.data = data
+        self.index = index
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        x = self.data.x
+        return (x.shape[0] if self.index is None else len(self.index), x.shape[1])
+
+    @property
+    def dtype(self):
+        return self.data.x.dtype
+
+    @property
+    def ndim(self) -> int:
+        return 2
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def rows(self, start: int, stop: int, out: np.ndarray = None) -> np.ndarray:
+        """Returns the rows of the subset, see `Data.rows()`"""
+        return self.data.rows(start, stop, out=out, index=self.index)
+
+    def __getitem__(self, key) -> np.ndarray:
+        if isinstance(key, slice) and key.step in (None, 1):
+            start, stop, _ = key.indices(len(self))
+            return self.rows(start, max(start, stop))
+
+        index = np.arange(len(self))[key] if self.index is None else self.index[key]
+
+        if np.ndim(index) == 0:
+            return self.data.rows(0, 1, index=np.reshape(index, 1))[0]
+
+        return self.data.rows(0, len(index), index=index)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        rows = self[:]
+        return rows if dtype is None else rows.astype(dtype, copy=False)
 
 
 class Data:
@@ -38,20 +190,46 @@ class Data:
     - xTrain (ndarray): 2D list of train set features values.
     - yTrain (ndarray): 2D list (column) of train set target class values.
     - xTest (ndarray): 2D list of train set features values.
-    - yTest (ndarray): 2D list (column) of test set target class values."""
+    - yTest (ndarray): 2D list (column) of test set target class values.
+    - recipe (List[Dict]): The steps, which created the data set.
+    - na (ndarray): The damage overlay, sorted flat indices of the NA cells of
+      `x`. The `x` stays the undamaged read-only base array.
+    - fill (ndarray): The fixed values of the NA cells listed in `na`, `None`
+      for the not fixed data.
+    - boundary (int): The first test row, when the subsets are the views of
+      `x` and `y`, see `split()`, `None` for the copies.
+    - rowsTrain, rowsTest (ndarray): The rows of `x` in the subsets of the
+      data split after the damage overlay, the subsets are `Rows`, see
+      `splitRows()`."""
 
     def __init__(self):
 
-        logging.basicConfig(
-            filename="app.log",
-            filemode="w",
-            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            level=logging.INFO,
-        )
+        self.logger = logger(__class__.__name__)
 
-        self.logger = logging.getLogger(__class__.__name__)
+        self.recipe = []
 
+        self.boundary = None
+
+    @classmethod
+    def lazy(cls, *args, **kwargs) -> Plan:
+        """Records the pipeline instead of running it, see `lab.plan.Plan`
+
+        Parameters:
+        - args, kwargs: The constructor parameters.
+
+        Returns: (Plan) The plan of the data set."""
+        return Plan(cls, *args, **kwargs)
+
+    @recorded()
     def setX(self, x: Union(List[[float]], np.ndarray)) -> Data:
+        self.recipe = []
+
+        for attr in ["na", "fill", "rowsTrain", "rowsTest"]:
+            try:
+                delattr(self, attr)
+            except AttributeError:
+                pass
+
         if type(x).__name__ == "ndarray":
             self.x = x
 
@@ -81,13 +259,47 @@ class Data:
         except AttributeError:
             pass
 
+        self.boundary = None
+
         return self
 
-    def split(self, testSize: float = 0.3) -> Data:
+    def __getstate__(self) -> dict:
+        state = dict(self.__dict__)
+        if getattr(self, "boundary", None) is not None:
+            for attr in ["xTrain", "xTest", "yTrain", "yTest"]:
+                state.pop(attr, None)  # the views are restored from `x` and `y`
+        if "rowsTrain" in state:
+            for attr in ["xTrain", "xTest"]:
+                state.pop(attr, None)  # the rows are restored from `x`
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        if getattr(self, "boundary", None) is not None:
+            self.splitViews()
+        if "rowsTrain" in state:
+            self.splitRows()
+
+    @recorded()
+    @traced()
+    def split(
+        self,
+        testSize: float = 0.3,
+        seed: int = None,
+        views: bool = False,
+        stratify: bool = False,
+    ) -> Data:
         """Splits data set on test and training subsets
 
         Parameter:
-        - testSize (float): Split proportion."""
+        - testSize (float): Split proportion.
+        - seed (int): Random generator seed, `None` for the not reproducible split.
+        - views (bool): Permutes the rows of `x` and `y` once in place and
+          makes the subsets the views of the first (training) and the last
+          (test) rows, no copies. The data with the damage overlay keeps the
+          rows of the subsets instead, see `splitRows()`. The in-place damage
+          of `x` after the split changes the subsets too.
+        - stratify (bool): Keeps the target class proportions in the subsets."""
         try:
             x = self.x
         except ArithmeticError:
@@ -102,17 +314,167 @@ class Data:
                 "The targets data is empty. Set the targets with methods SetY() or makeTarget()."
             )
 
-        self.xTrain, self.xTest, self.yTrain, self.yTest = trainTestSplit(
-            x, y, test_size=testSize
-        )
+        self.boundary = None
+
+        overlay = hasattr(self, "na")
+        if overlay:
+            x = np.arange(x.shape[0])  # the subsets are the rows, see `Rows`
+            y = np.array(y)
+
+        if not views and not stratify:
+            from sklearn.model_selection import train_test_split as trainTestSplit
+
+            subsets = trainTestSplit(x, y, test_size=testSize, random_state=seed)
+
+            if overlay:
+                self.rowsTrain, self.rowsTest, self.yTrain, self.yTest = subsets
+                self.splitRows()
+            else:
+                self.xTrain, self.xTest, self.yTrain, self.yTest = subsets
+
+            return self
+
+        rng = np.random.default_rng(seed)
+
+        if stratify:
+            order, boundary = stratifiedPermutation(rng, y, testSize)
+        else:
+            order, boundary = None, x.shape[0] - math.ceil(testSize * x.shape[0])
+
+        if not views:
+            self.xTrain, self.xTest = x[order[:boundary]], x[order[boundary:]]
+            self.yTrain, self.yTest = y[order[:boundary]], y[order[boundary:]]
+            if overlay:
+                self.rowsTrain, self.rowsTest = self.xTrain, self.xTest
+                self.splitRows()
+            return self
+
+        if overlay:
+            x, y = permute([x, y], rng, order)
+            self.rowsTrain, self.rowsTest = x[:boundary], x[boundary:]
+            self.yTrain, self.yTest = y[:boundary], y[boundary:]
+            self.splitRows()
+        else:
+            x, y = permute([x, y], rng, order)
+            self.x, self.y, self.boundary = x, y, boundary
+            self.splitViews()
 
         return self
 
-    def makeTarget(self, targetGenerator: TargetGenerator) -> Data:
+    def splitRows(self) -> None:
+        """Updates the features subsets of the data split after the damage overlay
+
+        The subsets are the `Rows` of `rowsTrain` and `rowsTest`, so they read
+        the damage overlay and the fixed values of the data on access.
+
+        Raises: Exception, the data is split before the damage overlay."""
+        if getattr(self, "yTrain", None) is None:
+            return
+
+        if not hasattr(self, "rowsTrain"):
+            raise Exception(
+                "The data set is split without the damage overlay. "
+                "Call the method damage() before split()."
+            )
+
+        self.xTrain, self.xTest = Rows(self, self.rowsTrain), Rows(self, self.rowsTest)
+
+    def splitViews(self) -> None:
+        """Makes the subsets the views of `x` and `y` split at the `boundary` row"""
+        b = self.boundary
+        self.xTrain, self.xTest = self.x[:b], self.x[b:]
+        self.yTrain, self.yTest = self.y[:b], self.y[b:]
+
+    def folds(
+        self, k: int = 5, repeats: int = 1, seed: int = None, stratify: bool = False
+    ) -> Iterator[Data]:
+        """Iterates over the k-fold splits of the data set
+
+        The rows are permuted once per repeat in place, the fold test rows are
+        swapped with the last rows, so the subsets are the views of `x` and
+        `y`. The yielded data set is valid until the next one is requested.
+        The data with the damage overlay gets one fixed copy of `x`, the data
+        split into views gets a copy, so its subsets are kept.
+
+        Parameters:
+        - k (int): Number of folds.
+        - repeats (int): Number of the repeated k-fold splits.
+        - seed (int): Random generator seed, `None` for the not reproducible folds.
+        - stratify (bool): Keeps the target class proportions in the folds.
+
+        Returns: (Iterator[Data]) The data sets with the fold subsets."""
+        x, y = self.x, self.y
+
+        if hasattr(self, "na"):
+            x, y = self.rows(0, x.shape[0]), np.array(y)
+        elif self.boundary is not None or not (
+            x.flags.writeable and y.flags.writeable
+        ):
+            x, y = np.array(x), np.array(y)
+
+        step = describeCall(Data.folds, (k, repeats, seed, stratify), {})
+
+        rng = np.random.default_rng(seed)
+        n = x.shape[0]
+
+        for repeat in range(repeats):
+            if stratify:
+                # the class rows are dealt to the folds in turn
+                classes = np.unique(np.asarray(y).ravel(), return_inverse=True)[1]
+                grouped = rng.permutation(n)
+                grouped = grouped[np.argsort(classes[grouped], kind="stable")]
+                chunks = [grouped[i::k] for i in range(k)][::-1]
+                sizes = [len(c) for c in chunks]
+                x, y = permute([x, y], rng, np.concatenate(chunks))
+            else:
+                sizes = [n // k] * (k - 1) + [n - (k - 1) * (n // k)]
+                x, y = permute([x, y], rng)
+
+            # the last fold is the largest one, so the other folds are swapped
+            # with the last rows without overlapping
+            starts = np.cumsum([0] + sizes[:-1])
+
+            for fold in range(k):
+                start, size = int(starts[fold]), sizes[fold]
+                if fold < k - 1:
+                    for a in [x, y]:
+                        swap(a, start, n - size, size)
+
+                d = copy.copy(self)
+                for attr in ["na", "fill", "rowsTrain", "rowsTest"]:
+                    d.__dict__.pop(attr, None)  # the copy is fixed
+                d.x, d.y, d.boundary = x, y, n - size
+                d.splitViews()
+                d.recipe = self.recipe + [dict(step, repeat=repeat, fold=fold)]
+
+                yield d
+
+                if fold < k - 1:
+                    for a in [x, y]:
+                        swap(a, start, n - size, size)
+
+    @recorded(ignore=("blockSize", "workers", "url"))
+    @traced()
+    def makeTarget(
+        self,
+        targetGenerator: TargetGenerator,
+        blockSize: int = 0,
+        workers: int = 1,
+        url: str = "",
+    ) -> Data:
         """Creates target classes
 
         Parameters:
-        - targetGenerator (TargetGenerator): Callable, calculates y by feature values."""
+        - targetGenerator (TargetGenerator): Callable, calculates y by feature values,
+          a plain callable of a row is applied row by row.
+        - blockSize (int): Number of rows processed at once, 0 for the whole
+          data set. The memory peak is bounded by the block size.
+        - workers (int): Number of threads processing the blocks, 0 for the
+          number of CPU cores.
+        - url (str): Path to `.npy` file for the memory-mapped targets, empty
+          for the in-memory targets."""
+        started = time.perf_counter()
+
         try:
             x = self.x
         except AttributeError:
@@ -120,76 +482,242 @@ class Data:
                 "The features data is empty. Set the data with method SetX()."
             )
 
-        y = np.apply_along_axis(targetGenerator, axis=1, arr=x)
+        if blockSize == 0 and url == "":
+            y = batch(targetGenerator, x).reshape(x.shape[0], 1)
+        else:
+            y = allocate((x.shape[0], 1), url=url)
 
-        self.y = y.reshape(len(y), 1)
+            def target(start: int, stop: int) -> None:
+                y[start:stop, 0] = batch(targetGenerator, x[start:stop])
 
-        self.logger.info(
-            "makeTarget() calculated target classes for {0} observations. The targets histogram: {1}".format(
-                x.shape, str(np.histogram(y))
-            )
+            mapBlocks(target, x.shape[0], blockSize or x.shape[0], workers)
+
+        self.y = y
+
+        record(
+            self.logger,
+            "makeTarget",
+            shape=x.shape,
+            blockSize=blockSize,
+            duration=time.perf_counter() - started,
         )
         return self
 
-    def save(self, path: str) -> str:
+    @traced()
+    def save(self, path: str, format: str = "pickle", name: str = "") -> str:
         """Saves the data set on a disk
-        
+
         Parameters:
-        - path (str): Path to directory where the data set will be stored."""
-        fileName = str(uuid.uuid4()) + ".pkl"
+        - path (str): Path to directory where the data set will be stored.
+        - format (str): `pickle` for the single `.pkl` file, `npy` for the
+          directory with one `.npy` file per array and the `manifest.json`.
+        - name (str): The data set name, random when empty.
+
+        Returns: (str) URL to the stored data set."""
+        started = time.perf_counter()
+
+        if name == "":
+            name = str(uuid.uuid4())
+
+        if format == "pickle":
+            fileName = name + ".pkl"
 
-        url = path + os.sep + fileName
+            url = path + os.sep + fileName
 
-        with open(url, "wb") as f:
-            pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+            with open(url, "wb") as f:
+                pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
 
-        self.logger.info("save(): saved the data in file: `{0}`".format(url))
+        elif format == "npy":
+            url = path + os.sep + name
+
+            self.saveArrays(url)
+
+        else:
+            raise Exception("Unknown data format `{0}`.".format(format))
+
+        record(
+            self.logger,
+            "save",
+            url=url,
+            format=format,
+            duration=time.perf_counter() - started,
+        )
+
+        return url
+
+    def saveArrays(self, url: str) -> str:
+        """Saves the arrays in the columnar format
+
+        Parameters:
+        - url (str): Path to the data set directory.
+
+        Returns: (str) URL to the stored data set."""
+        os.makedirs(url, exist_ok=True)
+
+        arrays = {}
+
+        boundary = getattr(self, "boundary", None)
+
+        for attr in ARRAYS:
+            source = getattr(self, attr, None)
+            if source is None:
+                continue
+
+            if boundary is not None and attr in ["xTrain", "xTest", "yTrain", "yTest"]:
+                continue  # the views of `x` and `y`
+
+            if isinstance(source, Rows):
+                continue  # restored from `rowsTrain` and `rowsTest`
+
+            file = url + os.sep + attr + ".npy"
+            if getattr(source, "filename", None) == os.path.abspath(file):
+                source.flush()  # written in place, see `lab.plan`
+            else:
+                np.save(file, source)
+
+            arrays[attr] = {
+                "file": attr + ".npy",
+                "shape": list(source.shape),
+                "dtype": source.dtype.str,
+            }
+
+        manifest = {
+            "format": MANIFEST_FORMAT,
+            "class": self.__class__.__name__,
+            "version": __version__,
+            "created": datetime.datetime.now().isoformat(),
+            "recipe": self.recipe,
+            "arrays": arrays,
+            "boundary": boundary,
+        }
+
+        with open(url + os.sep + MANIFEST, "w") as f:
+            json.dump(manifest, f, indent=2)
 
         return url
 
-    def read(self, url: str) -> Data:
+    @traced()
+    def read(self, url: str, mmapMode: str = "c") -> Data:
+        """Reads the data set from a disk
+
+        Parameters:
+        - url (str): URL to the `.pkl` file or to the columnar data set directory.
+        - mmapMode (str): Memory-mapping mode for the columnar arrays. The
+          default copy-on-write mode loads only the used pages and never
+          changes the stored files.
+
+        Returns: (Data) self."""
+        if os.path.isdir(url):
+            return self.readArrays(url, mmapMode)
+
         with open(url, "rb") as f:
             d = pickle.load(f)
+            self.recipe = getattr(d, "recipe", [{"step": "read", "seed": None}])
+
             try:
                 self.x = d.x
             except AttributeError as e:
-                self.logger.info(
-                    "Data.read(): file `" + url + "` does not consist x data."
-                )
+                self.logger.info("Data.read(): file `%s` does not consist x data.", url)
 
             try:
                 self.xTrain = d.xTrain
             except AttributeError as e:
                 self.logger.info(
-                    "Data.read(): file `" + url + "` does not consist xTrain data."
+                    "Data.read(): file `%s` does not consist xTrain data.", url
                 )
 
             try:
                 self.xTest = d.xTest
             except AttributeError as e:
                 self.logger.info(
-                    "Data.read(): file `" + url + "` does not consist xTest data."
+                    "Data.read(): file `%s` does not consist xTest data.", url
                 )
 
             try:
                 self.yTrain = d.yTrain
             except AttributeError as e:
                 self.logger.info(
-                    "Data.read(): file `" + url + "` does not consist yTrain data."
+                    "Data.read(): file `%s` does not consist yTrain data.", url
                 )
 
             try:
                 self.yTest = d.yTest
             except AttributeError as e:
                 self.logger.info(
-                    "Data.read(): file `" + url + "` does not consist yTest data."
+                    "Data.read(): file `%s` does not consist yTest data.", url
                 )
 
-        self.logger.info("Data.read(): got data from `" + url + "`")
+            for attr in ["na", "fill", "boundary", "rowsTrain", "rowsTest"]:
+                if hasattr(d, attr):
+                    setattr(self, attr, getattr(d, attr))
+
+            if hasattr(self, "rowsTrain"):
+                self.splitRows()  # the rows of `d`
+
+        self.logger.info("Data.read(): got data from `%s`", url)
 
         return self
 
-    def damage(self, damager: Damager, quantity: Union(int, float)) -> Data:
+    def readArrays(self, url: str, mmapMode: str = "c") -> Data:
+        """Reads the data set in the columnar format
+
+        The arrays are memory-mapped, the data pages are loaded on access.
+
+        Parameters:
+        - url (str): Path to the data set directory.
+        - mmapMode (str): Memory-mapping mode, `None` loads the arrays in memory.
+
+        Returns: (Data) self."""
+        with open(url + os.sep + MANIFEST, "r") as f:
+            manifest = json.load(f)
+
+        if manifest.get("format") != MANIFEST_FORMAT:
+            raise Exception("The `{0}` is not a data set directory.".format(url))
+
+        self.recipe = manifest.get("recipe", [{"step": "read", "seed": None}])
+
+        for attr in ARRAYS:
+            try:
+                array = manifest["arrays"][attr]
+            except KeyError:
+                self.logger.info(
+                    "Data.read(): directory `%s` does not consist %s data.", url, attr
+                )
+                continue
+
+            setattr(
+                self, attr, np.load(url + os.sep + array["file"], mmap_mode=mmapMode)
+            )
+
+        if hasattr(self, "na") and not hasattr(self, "fill"):
+            self.fill = None  # the not fixed damage overlay
+
+        self.boundary = manifest.get("boundary")
+        if self.boundary is not None:
+            self.splitViews()
+
+        if hasattr(self, "rowsTrain"):
+            self.splitRows()
+
+        self.logger.info("Data.read(): mapped data from `%s`", url)
+
+        return self
+
+    @recorded()
+    @traced()
+    def damage(
+        self, damager: Damager, quantity: Union(int, float), overlay: bool = False
+    ) -> Data:
+        """Damages the features data
+
+        Parameters:
+        - damager (Damager): Callable, damages the features data.
+        - quantity (Union(int, float)): The damage quantity.
+        - overlay (bool): Keeps `x` untouched and adds the damaged cells to the
+          `na` overlay. The damager must implement the `mask()` method. The
+          subsets of the split data get the damage too, see `splitRows()`."""
+        started = time.perf_counter()
+
         try:
             x = self.x
         except AttributeError:
@@ -197,13 +725,47 @@ class Data:
                 "The features data is empty. Set the data with method SetX()."
             )
 
-        self.x = damager(x, quantity)
-
-        self.logger.info("Data.damage(): damaged by " + damager.__class__.__name__)
+        if overlay:
+            na = damager.mask(x.shape, quantity)
+            if hasattr(self, "na"):
+                na = np.union1d(self.na, na)
+
+            x.flags.writeable = False  # the base array is shared by the variants
+            self.na = na
+            self.fill = None
+            self.splitRows()
+        else:
+            self.x = damager(x, quantity)
+
+        record(
+            self.logger,
+            "damage",
+            damager=damager.__class__.__name__,
+            shape=self.x.shape,
+            overlay=overlay,
+            duration=time.perf_counter() - started,
+        )
 
         return self
 
-    def fix(self, fixer: Fixer) -> Data:
+    @recorded()
+    @traced()
+    def fix(self, fixer: Fixer, refit: bool = True, train: bool = False) -> Data:
+        """Fixes the damaged features data
+
+        The data with the damage overlay gets only the values of the NA cells,
+        the subsets of the split data are updated, see `splitRows()`.
+
+        Parameters:
+        - fixer (Fixer): Callable, fixes the features data.
+        - refit (bool): Learns the fixer statistics on the features data (on
+          `rows()` with the damage overlay), use False to apply the statistics
+          learned by `fixer.fit()` on other data.
+        - train (bool): Learns the statistics on the training subset only and
+          applies them to the test subset too, so the test rows do not leak
+          into the fix. The data must be split."""
+        started = time.perf_counter()
+
         try:
             x = self.x
         except AttributeError:
@@ -211,48 +773,274 @@ class Data:
                 "The features data is empty. Set the data with method SetX()."
             )
 
-        self.x = fixer(x)
+        if train and getattr(self, "yTrain", None) is None:
+            raise Exception(
+                "The data set is not split. Call the method split() before fix()."
+            )
 
-        self.logger.info("Data.fix(): fixed by " + fixer.__class__.__name__)
+        if hasattr(self, "na"):
+            if refit:
+                self.fill = None  # the NA cells of `rows()` are NaN
+                # the row blocks are read by the fixer
+                fixer.fit(self.xTrain if train else Rows(self))
+            elif fixer.statistics is None:
+                raise Exception("The fixer is not fitted. Call the method fit().")
+
+            self.fill = fixer.fill(x, self.na)
+            self.splitRows()
+        elif train:
+            if refit:
+                fixer.fit(self.xTrain)
+            self.x = fixer.transform(x)
+            if self.boundary is None:  # the subsets are copies
+                self.xTrain = fixer.transform(self.xTrain)
+                self.xTest = fixer.transform(self.xTest)
+        elif refit:
+            self.x = fixer(x)
+        else:
+            self.x = fixer.transform(x)
+
+        record(
+            self.logger,
+            "fix",
+            fixer=fixer.__class__.__name__,
+            shape=self.x.shape,
+            duration=time.perf_counter() - started,
+        )
 
         return self
 
+    def variant(self, fixer: Fixer, train: bool = False) -> Data:
+        """Creates the fixed variant of the data with the damage overlay
+
+        The variant shares all the arrays with the data, except the fixed values.
+
+        Parameters:
+        - fixer (Fixer): Callable, fixes the features data.
+        - train (bool): Learns the fixer statistics on the training rows only,
+          see `fix()`.
+
+        Returns: (Data) The fixed data."""
+        if not hasattr(self, "na"):
+            raise Exception("The data has no damage overlay.")
+
+        d = copy.copy(self)
+        d.recipe = list(self.recipe)
+
+        return d.fix(fixer, train=train)
+
+    @traced()
+    def sweep(
+        self,
+        damager: Damager,
+        rates: List[Union(float, List[float])],
+        pattern: str = "cell",
+        blockLength: int = 16,
+    ) -> List[Data]:
+        """Creates the damaged variants of the data for the list of rates
+
+        The variants share all the arrays, each one has its own damage overlay.
+        The overlays are nested, see `DMGNA.masks()`.
+
+        Parameters:
+        - damager (Damager): The damager implementing the `masks()` method.
+        - rates (List[Union(float, List[float])]): The damage rates.
+        - pattern (str): The damage unit: `cell`, `row` or `block`.
+        - blockLength (int): Number of rows in a damaged block.
+
+        Returns: (List[Data]) The damaged data for each rate."""
+        started = time.perf_counter()
+
+        try:
+            x = self.x
+        except AttributeError:
+            raise Exception(
+                "The features data is empty. Set the data with method SetX()."
+            )
+
+        step = describeCall(Data.sweep, (damager, rates, pattern, blockLength), {})
+
+        x.flags.writeable = False  # the base array is shared by the variants
+
+        variants = []
+        for rate, na in zip(rates, damager.masks(x.shape, rates, pattern, blockLength)):
+            d = copy.copy(self)
+            if hasattr(self, "na"):
+                na = np.union1d(self.na, na)
+            d.na = na
+            d.fill = None
+            d.splitRows()
+            d.recipe = self.recipe + [dict(step, rate=describe(rate))]
+            variants.append(d)
+
+        record(
+            self.logger,
+            "sweep",
+            damager=damager.__class__.__name__,
+            shape=x.shape,
+            rates=len(rates),
+            duration=time.perf_counter() - started,
+        )
+
+        return variants
+
+    def rows(
+        self, start: int, stop: int, out: np.ndarray = None, index: np.ndarray = None
+    ) -> np.ndarray:
+        """Returns the features data rows with the damage overlay applied
+
+        Parameters:
+        - start (int): The first row.
+        - stop (int): The row after the last one.
+        - out (ndarray): The batch array to write the rows into.
+        - index (ndarray): The rows of `x` to read, `start` and `stop` select
+          the rows of the index. `None` for the rows of `x` itself.
+
+        Returns: (ndarray) The rows, NA cells are NaN in the not fixed data."""
+        x = self.x
+
+        if out is None:
+            out = np.empty((stop - start, x.shape[1]), dtype=x.dtype)
+
+        if index is not None:
+            return self.takeRows(np.asarray(index[start:stop]), out)
+
+        out[...] = x[start:stop]
+
+        if hasattr(self, "na"):
+            first, last = np.searchsorted(
+                self.na, [start * x.shape[1], stop * x.shape[1]]
+            )
+            values = np.nan if self.fill is None else self.fill[first:last]
+            np.put(out, self.na[first:last] - start * x.shape[1], values)
+
+        return out
+
+    def takeRows(self, index: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """Writes the rows of `x` with the damage overlay applied, see `rows()`"""
+        x = self.x
+        features = x.shape[1]
+
+        np.take(x, index, axis=0, out=out)
+
+        if hasattr(self, "na"):
+            # the NA cells of each row are a range of the sorted overlay
+            first = np.searchsorted(self.na, index * features)
+            counts = np.searchsorted(self.na, (index + 1) * features) - first
+            cells = np.arange(counts.sum()) + np.repeat(
+                first - (np.cumsum(counts) - counts), counts
+            )
+            shift = np.repeat((index - np.arange(len(index))) * features, counts)
+            values = np.nan if self.fill is None else self.fill[cells]
+            np.put(out, self.na[cells] - shift, values)
+
+        return out
+
     def info(self, expanded: bool = True) -> None:
-        """Outputs the short dumps of the train and test data"""
-        self.logger.info("Content:")
+        """Outputs the shapes of the train and test data
 
+        Parameters:
+        - expanded (bool): Adds the first rows of each attribute."""
         for attr in ["x", "xTrain", "yTrain", "xTest", "yTest"]:
             try:
                 source = getattr(self, attr)
+            except AttributeError:
+                self.logger.info("The `%s` attribute is empty.", attr)
+                continue
 
-                self.logger.info(
-                    "The `{0}` attribute shape is {1}.".format(attr, source.shape)
-                )
+            fields = {"attribute": attr, "shape": source.shape, "dtype": source.dtype}
+            if expanded and self.logger.isEnabledFor(logging.INFO):
+                fields["head"] = np.asarray(source[:INFO_ROWS]).tolist()
 
-                if expanded:
-                    self.logger.info(
-                        "The `{0}` attribute content is:\n{1}".format(attr, source)
-                    )
+            record(self.logger, "info", **fields)
 
-            except AttributeError:
-                self.logger.info("The `{0}` attribute is empty.")
+        if hasattr(self, "na"):
+            record(self.logger, "info", attribute="na", cells=len(self.na))
 
         return None
 
 
 class DataRandom(Data):
-    def __init__(self, features: int = 10, observations: int = 10000):
-        """Creates splitted data set 
+    @recorded(ignore=("workers", "url"))
+    @traced()
+    def __init__(
+        self,
+        features: int = 10,
+        observations: int = 10000,
+        seed: int = None,
+        dtype=np.float64,
+        blockSize: int = BLOCK_SIZE,
+        workers: int = 1,
+        url: str = "",
+    ):
+        """Creates the random features data
+
+        The rows are generated in blocks, each block draws from its own random
+        stream spawned from the seed. So the data depends only on the seed and
+        the block size, the blocks are filled in parallel in any order.
+
         Parameters:
         - observations (int): Number of observations.
-        - features (int): Number of features."""
+        - features (int): Number of features.
+        - seed (int): Random generator seed, `None` for the not reproducible data.
+        - dtype: The data type, `float64` or `float32`.
+        - blockSize (int): Number of rows in a block.
+        - workers (int): Number of threads generating the blocks, 0 for the
+          number of CPU cores.
+        - url (str): Path to `.npy` file for the memory-mapped data, empty for
+          the in-memory data."""
 
         super().__init__()
 
-        self.x = np.random.rand(observations, features)
+        started = time.perf_counter()
 
-        self.logger.info(
-            "data set [{0}, {1}] created, x generated.".format(observations, features)
+        x = allocate((observations, features), dtype=dtype, url=url)
+        rngs = generators(seed, len(range(0, observations, blockSize)))
+
+        def generate(start: int, stop: int) -> None:
+            rngs[start // blockSize].random(dtype=x.dtype, out=x[start:stop])
+
+        mapBlocks(generate, observations, blockSize, workers)
+
+        self.x = x
+
+        record(
+            self.logger,
+            "generate",
+            shape=x.shape,
+            dtype=x.dtype,
+            workers=workers,
+            duration=time.perf_counter() - started,
         )
 
-        self.logger = logging.getLogger(__class__.__name__)
+        self.logger = logger(__class__.__name__)
+
+    @classmethod
+    def stream(
+        cls,
+        features: int = 10,
+        observations: int = 10000,
+        seed: int = None,
+        dtype=np.float64,
+        blockSize: int = BLOCK_SIZE,
+        workers: int = 1,
+        url: str = "",
+    ) -> Tuple[Tuple[int, int], Iterator[np.ndarray]]:
+        """Generates the features data of the constructor block by block
+
+        The blocks draw from the same random streams as in the constructor, so
+        they add up to the same data.
+
+        Parameters:
+        - features, observations, seed, dtype, blockSize: The constructor
+          parameters, `workers` and `url` are not used.
+
+        Returns: (Tuple[Tuple[int, int], Iterator[ndarray]]) The data shape and
+        the row blocks."""
+        rngs = generators(seed, len(range(0, observations, blockSize)))
+
+        def rows() -> Iterator[np.ndarray]:
+            for rng, (start, stop) in zip(rngs, blocks(observations, blockSize)):
+                yield rng.random((stop - start, features), dtype=dtype)
+
+        return (observations, features), rows()
@@ -13,45 +13,95 @@ __status__ = "Production"
 
 import os, sys, functools, math, uuid, itertools
 
-from typing import List, Callable, Union
+from typing import Dict, List, Callable, Union, TYPE_CHECKING
 
 import logging, logging.config
 
 import numpy as np
 
-import keras
+from lab.batches import BatchSource
+from lab.block import BLOCK_SIZE
+from lab.model import ModelDDDD, ModelDDDDNumPy, ModelStacked
+from lab.log import logger, record
+from lab.trace import active, epochTrace, traced
 
-from keras import Sequential
+if TYPE_CHECKING:
+    from keras.callbacks.callbacks import History
 
-from keras.callbacks.callbacks import History
+    from lab.data import Data
 
-from lab.data import DataRandom
 
-from lab.model import ModelDDDD
+BACKENDS = ["keras", "numpy"]
 
 
 class Fitter:
     """fits model to data"""
 
-    def __init__(self):
-        logging.basicConfig(
-            filename="app.log",
-            filemode="w",
-            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            level=logging.INFO,
-        )
+    def __init__(self, backend: str = "keras", seed: int = None):
+        """Parameters:
+
+        - backend (str): The training backend: `keras` (`ModelDDDD`) or `numpy`
+          (`ModelDDDDNumPy`, no framework overhead for the small data sets).
+        - seed (int): Random generator seed of the `numpy` backend."""
+        if backend not in BACKENDS:
+            raise Exception("Unknown backend `{0}`.".format(backend))
 
-        self.logger = logging.getLogger(__class__.__name__)
+        self.backend = backend
+        self.seed = seed
 
-    def fit(self, data: Data, batchSize: int = 512, epochs: int = 500) -> History:
+        self.logger = logger(__class__.__name__)
+
+    @traced("fit")
+    def fit(
+        self,
+        data: Data,
+        batchSize: int = 512,
+        epochs: int = 500,
+        patience: int = 0,
+        minDelta: float = 0.0,
+        monitor: str = "val_accuracy",
+        stream: bool = False,
+        blockSize: int = BLOCK_SIZE,
+    ) -> History:
         """ Fits model to data
         
         Parameters:
         - model (Model): The model to fit (keras.Sequential)
         - batchSize (int): A bath size for fitting.
-        - epochs (int): A number of fitting epochs. 
+        - epochs (int): A number of fitting epochs, the maximum one with the
+          convergence mode.
+        - patience (int): Turns on the convergence mode: the fitting stops after
+          `patience` epochs without the `monitor` improvement by `minDelta`,
+          the best weights are restored. 0 for the fixed number of epochs.
+        - minDelta (float): The minimum improvement of the monitored metric.
+        - monitor (str): The monitored validation metric.
+        - stream (bool): Streams the training and the test batches from the
+          (memory-mapped) arrays by the row blocks, see `BatchSource`.
+        - blockSize (int): Number of rows read at once in the streaming mode.
+
+        Returns: (History): The fitting history object. Its attribute
+        `convergedEpoch` is the number of the best `monitor` epoch."""
 
-        Returns: (History): The fitting history object."""
+        if stream:
+            return self.fitStream(
+                data, batchSize, epochs, patience, minDelta, monitor, blockSize
+            )
+
+        if self.backend == "numpy":
+            m = ModelDDDDNumPy(featuresCount=data.xTrain.shape[1], seed=self.seed)
+            history = m.fit(
+                data.xTrain,
+                data.yTrain,
+                batch_size=batchSize,
+                epochs=epochs,
+                verbose=0,
+                validation_data=(data.xTest, data.yTest),
+                patience=patience,
+                minDelta=minDelta,
+                monitor=monitor,
+                callbacks=self.epochCallbacks(len(data.xTrain), keras=False),
+            )
+            return self.converged(history, monitor, minDelta)
 
         m = ModelDDDD(featuresCount=data.xTrain.shape[1])()
 
@@ -62,6 +112,214 @@ class Fitter:
             epochs=epochs,
             verbose=1,
             validation_data=(data.xTest, data.yTest),
+            callbacks=earlyStopping(patience, minDelta, monitor)
+            + self.epochCallbacks(len(data.xTrain)),
+        )
+
+        return self.converged(history, monitor, minDelta)
+
+    def fitStream(
+        self,
+        data: Data,
+        batchSize: int = 512,
+        epochs: int = 500,
+        patience: int = 0,
+        minDelta: float = 0.0,
+        monitor: str = "val_accuracy",
+        blockSize: int = BLOCK_SIZE,
+    ) -> History:
+        """Fits model to the batches streamed from the data set arrays
+
+        The training rows are shuffled by the blocks, the test rows are read
+        in order. The batches are read ahead by the background threads, so
+        the memory-mapped data sets larger than the memory are fitted without
+        the loading. See `fit()` for the parameters."""
+        train = BatchSource(
+            data.xTrain, data.yTrain, batchSize, blockSize, seed=self.seed
+        )
+        test = BatchSource(data.xTest, data.yTest, batchSize, blockSize, shuffle=False)
+
+        if self.backend == "numpy":
+            m = ModelDDDDNumPy(featuresCount=data.xTrain.shape[1], seed=self.seed)
+            history = m.fit_generator(
+                train.generator(),
+                steps_per_epoch=train.steps,
+                epochs=epochs,
+                verbose=0,
+                validation_data=test.generator(),
+                validation_steps=test.steps,
+                patience=patience,
+                minDelta=minDelta,
+                monitor=monitor,
+                callbacks=self.epochCallbacks(len(data.xTrain), keras=False),
+            )
+        else:
+            m = ModelDDDD(featuresCount=data.xTrain.shape[1])()
+            history = m.fit_generator(
+                train.generator(),
+                steps_per_epoch=train.steps,
+                epochs=epochs,
+                verbose=1,
+                validation_data=test.generator(),
+                validation_steps=test.steps,
+                callbacks=earlyStopping(patience, minDelta, monitor)
+                + self.epochCallbacks(len(data.xTrain)),
+                workers=0,  # the source prefetches the batches itself
+            )
+
+        return self.converged(history, monitor, minDelta)
+
+    def epochCallbacks(self, samples: int, keras: bool = True) -> List:
+        """Returns the epoch tracing callback, none when not tracing, see `lab.trace`"""
+        tracer = active()
+        if tracer is None:
+            return []
+
+        return [epochTrace(tracer, samples, keras=keras)]
+
+    def converged(self, history: History, monitor: str, minDelta: float) -> History:
+        """Sets the `convergedEpoch` attribute of the history"""
+        history.convergedEpoch = convergedEpoch(
+            history.history.get(monitor, []), monitor, minDelta
+        )
+
+        record(
+            self.logger,
+            "fit",
+            monitor=monitor,
+            convergedEpoch=history.convergedEpoch,
+            epochs=len(history.epoch),
         )
 
         return history
+
+    @traced("fit")
+    def fitReplicas(
+        self, datasets: List[Data], batchSize: int = 512, epochs: int = 500
+    ) -> List[History]:
+        """Fits the independent models to the data sets in one batched model
+
+        The data sets must have the same shapes: the repeated data set for the
+        seed replicas, the folds or the differently fixed data sets. The
+        replicas see the training rows in the same order.
+
+        Parameters:
+        - datasets (List[Data]): The data sets, one per replica.
+        - batchSize (int): A bath size for fitting.
+        - epochs (int): A number of fitting epochs.
+
+        Returns: (List[History]): The fitting history of each replica."""
+        if self.backend == "numpy":
+            return [self.fit(d, batchSize=batchSize, epochs=epochs) for d in datasets]
+
+        from keras.callbacks import History
+
+        shapes = {
+            tuple(getattr(d, attr).shape for attr in ["xTrain", "xTest"])
+            for d in datasets
+        }
+        if len(shapes) != 1:
+            raise Exception("The replicas data sets have different shapes.")
+
+        m = ModelStacked(
+            featuresCount=datasets[0].xTrain.shape[1], replicas=len(datasets)
+        )()
+
+        history = m.fit(
+            [d.xTrain for d in datasets],
+            [d.yTrain for d in datasets],
+            batch_size=batchSize,
+            epochs=epochs,
+            verbose=1,
+            validation_data=(
+                [d.xTest for d in datasets],
+                [d.yTest for d in datasets],
+            ),
+            callbacks=self.epochCallbacks(len(datasets) * len(datasets[0].xTrain)),
+        )
+
+        histories = []
+        for r in range(len(datasets)):
+            h = History()
+            h.epoch = list(history.epoch)
+            h.history = replicaHistory(history.history, r)
+            histories.append(h)
+
+        record(
+            self.logger,
+            "fitReplicas",
+            replicas=len(datasets),
+            epochs=len(history.epoch),
+        )
+
+        return histories
+
+
+def replicaHistory(history: Dict[str, List[float]], replica: int) -> Dict:
+    """Selects the metrics of the replica from the stacked model history
+
+    Parameters:
+    - history (Dict[str, List[float]]): The stacked model metrics.
+    - replica (int): The replica number.
+
+    Returns: (Dict) The metrics named as in the single model history."""
+    prefix = "replica{0}_".format(replica)
+
+    metrics = {}
+    for name, values in history.items():
+        validation = name.startswith("val_")
+        if validation:
+            name = name[len("val_") :]
+
+        if name.startswith(prefix):
+            name = name[len(prefix) :]
+            if name == "acc":
+                name = "accuracy"
+            metrics[("val_" if validation else "") + name] = values
+
+    return metrics
+
+
+def earlyStopping(patience: int, minDelta: float, monitor: str) -> List:
+    """Returns the Keras callbacks of the convergence mode, none for `patience` 0"""
+    if patience <= 0:
+        return []
+
+    from keras.callbacks import EarlyStopping
+
+    return [
+        EarlyStopping(
+            monitor=monitor,
+            min_delta=minDelta,
+            patience=patience,
+            mode=mode(monitor),
+            restore_best_weights=True,
+        )
+    ]
+
+
+def mode(monitor: str) -> str:
+    """Returns `max` for the accuracy metrics and `min` for the loss ones"""
+    return "max" if "acc" in monitor else "min"
+
+
+def convergedEpoch(values: List[float], monitor: str, minDelta: float = 0.0) -> int:
+    """Finds the epoch of the best metric value
+
+    The value is the best one, if it improves the previous best value by more
+    than `minDelta`, like in the Keras `EarlyStopping`.
+
+    Parameters:
+    - values (List[float]): The metric values of each epoch.
+    - monitor (str): The metric name.
+    - minDelta (float): The minimum improvement.
+
+    Returns: (int) The epoch number, counting from 1, 0 for no values."""
+    sign = 1.0 if mode(monitor) == "max" else -1.0
+
+    best, epoch = -np.inf, 0
+    for i, value in enumerate(values):
+        if sign * value - abs(minDelta) > best:
+            best, epoch = sign * value, i + 1
+
+    return epoch
@@ -13,59 +13,410 @@ __status__ = "Production"
 
 # import os, sys, functools, math, uuid, itertools
 
+import time
+
+import logging, logging.config
+
 from abc import ABC, abstractmethod
 
 import numpy as np
 
+from lab.block import BLOCK_SIZE, mapBlocks
+from lab.log import logger, record
+
+
+class Statistics:
+    """The per-column statistics of the data with NA cells
+
+    Attributes:
+    - count (ndarray): Number of the not NA values in each column.
+    - mean (ndarray): The column means.
+    - m2 (ndarray): The sums of squared deviations from the column means.
+    - na (ndarray): Number of the NA cells in each column."""
+
+    def __init__(self, features: int):
+        self.count = np.zeros(features, dtype=np.int64)
+        self.mean = np.zeros(features)
+        self.m2 = np.zeros(features)
+        self.na = np.zeros(features, dtype=np.int64)
+
+    @classmethod
+    def of(cls, block: ndarray) -> Statistics:
+        """Calculates the statistics of the rows block
+
+        Parameters:
+        - block (ndarray): The rows.
+
+        Returns: (Statistics) The statistics."""
+        s = cls(block.shape[1])
+
+        isNan = np.isnan(block)
+        s.na = np.sum(isNan, axis=0)
+        s.count = block.shape[0] - s.na
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            s.mean = np.nansum(block, axis=0) / s.count
+            s.m2 = np.nansum(np.square(block - s.mean), axis=0)
+
+        return s
+
+    def merge(self, other: Statistics) -> Statistics:
+        """Adds the statistics of other rows (Welford-Chan parallel update)
+
+        Parameters:
+        - other (Statistics): The statistics of other rows.
+
+        Returns: (Statistics) self."""
+        count = self.count + other.count
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = other.mean - self.mean
+            share = np.where(count > 0, other.count / count, 0.0)
+            self.mean = np.where(other.count > 0, self.mean + delta * share, self.mean)
+            self.m2 = np.where(
+                other.count > 0,
+                self.m2 + other.m2 + delta ** 2 * self.count * share,
+                self.m2,
+            )
+
+        self.count = count
+        self.na = self.na + other.na
+
+        return self
+
+    @property
+    def variance(self) -> ndarray:
+        """The population variance of each column"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.m2 / self.count
+
 
 class Fixer(ABC):
-    """The data fixer/patcher"""
+    """The data fixer/patcher
 
-    def __init__(self):
-        pass
+    The fixer learns the per-column statistics in `fit()` and replaces NaN in
+    `transform()`. Both methods walk the data in row blocks, so they work on
+    memory-mapped arrays and the statistics learned on the training data can
+    be applied to the test data and to the new batches.
+
+    Attributes:
+    - statistics (Statistics): The learned statistics, `None` before `fit()`."""
+
+    learns = True  # the replacement values depend on the data, see `lab.plan`
+
+    def __init__(self, blockSize: int = BLOCK_SIZE, workers: int = 1):
+        """Parameters:
+
+        - blockSize (int): Number of rows processed at once.
+        - workers (int): Number of threads processing the blocks."""
+        self.blockSize = blockSize
+        self.workers = workers
+        self.statistics = None
 
-    @abstractmethod
     def __call__(self, data: ndarray) -> ndarray:
+        """Learns the statistics and replaces NaN in the same data
+
+        Parameters:
+        - data (ndarray): The data with NaN elements."""
+        return self.fit(data).transform(data)
+
+    def fit(self, data: ndarray) -> Fixer:
+        """Learns the per-column statistics in one pass over the row blocks
+
+        Parameters:
+        - data (ndarray): The data with NaN elements.
+
+        Returns: (Fixer) self."""
+        parts = mapBlocks(
+            lambda start, stop: Statistics.of(data[start:stop]),
+            data.shape[0],
+            self.blockSize,
+            self.workers,
+        )
+
+        self.statistics = Statistics(data.shape[1])
+        for part in parts:
+            self.statistics.merge(part)
+
+        return self
+
+    def transform(self, data: ndarray) -> ndarray:
+        """Replaces NaN with the values learned by `fit()`, in place
+
+        Parameters:
+        - data (ndarray): The data with NaN elements."""
+        if self.statistics is None:
+            raise Exception("The fixer is not fitted. Call the method fit().")
+
+        values = self.values()
+
+        def transform(start: int, stop: int) -> None:
+            block = data[start:stop]
+            np.copyto(
+                block, np.broadcast_to(values, block.shape), where=np.isnan(block)
+            )
+
+        mapBlocks(transform, data.shape[0], self.blockSize, self.workers)
+
+        return data
+
+    @abstractmethod
+    def values(self) -> ndarray:
+        """The replacement value of each column"""
         pass
 
+    def fill(self, data: ndarray, index: ndarray) -> ndarray:
+        """Calculates the fixed values of the damage overlay cells
+
+        Parameters:
+        - data (ndarray): The undamaged base data.
+        - index (ndarray): Sorted flat indices of the NA cells.
+
+        Returns: (ndarray) The values of the NA cells."""
+        raise NotImplementedError(
+            "The fixer {0} does not support the damage overlay.".format(
+                self.__class__.__name__
+            )
+        )
+
 
 class FXZero(Fixer):
     """Fixes NaN values by 0.0 replacement"""
 
-    def __call__(self, data: ndarray) -> ndarray:
-        """Replaces NaN with 0.0
-        
+    learns = False
+
+    def fit(self, data: ndarray) -> Fixer:
+        """Sets the number of features, the zero needs no statistics
+
         Parameters:
         - data (ndarray): The data with NaN elements."""
-        data[np.isnan(data)] = 0.0
-        # print(
-        #     Icon.info,
-        #     __class__.__name__,
-        #     "replaced NaN values in",
-        #     data.__class__.__name__,
-        #     "with 0.0",
-        # )
-        return data
+        self.statistics = Statistics(data.shape[1])
+        return self
+
+    def values(self) -> ndarray:
+        """Returns 0.0 for each column"""
+        return np.zeros(len(self.statistics.mean))
+
+    def fill(self, data: ndarray, index: ndarray) -> ndarray:
+        """Returns 0.0 for each NA cell
+
+        Parameters:
+        - data (ndarray): The undamaged base data.
+        - index (ndarray): Sorted flat indices of the NA cells."""
+        return np.zeros(len(index), dtype=data.dtype)
 
 
 class FXMean(Fixer):
-    def __call__(self, data: ndarray) -> ndarray:
-        """Replaces NaN with the feature mean value
-        
+    """Fixes NaN values by the feature mean replacement"""
+
+    def values(self) -> ndarray:
+        """Returns the feature mean value of each column"""
+        return self.statistics.mean
+
+    def fill(self, data: ndarray, index: ndarray) -> ndarray:
+        """Returns the feature mean value for each NA cell
+
+        The means are the learned ones after `fit()`, otherwise they are
+        calculated without the NA cells. The column of the NA cells only gets
+        NaN like in `values()`.
+
         Parameters:
-        - data (ndarray): The data with NaN elements."""
+        - data (ndarray): The undamaged base data.
+        - index (ndarray): Sorted flat indices of the NA cells."""
+        features = data.shape[1]
+        column = index % features
+
+        if self.statistics is not None:
+            return np.take(self.statistics.mean, column).astype(data.dtype)
+
+        naCount = np.bincount(column, minlength=features)
+        naSum = np.bincount(column, weights=data.ravel()[index], minlength=features)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            colMean = (data.sum(axis=0) - naSum) / (data.shape[0] - naCount)
+
+        return np.take(colMean, column).astype(data.dtype)
+
+
+class FXKNN(Fixer):
+    """Fixes NaN values by the mean of the k nearest complete rows
+
+    The distances between a row with NaN and the complete rows use only the
+    not NA features of the row. They are calculated by the blocked matrix
+    products: the query rows are processed in batches and the reference rows
+    in blocks, so the memory does not grow with the data size.
+
+    Attributes:
+    - reference (ndarray): The complete rows learned by `fit()`.
+    - rowsPerSecond (float): The throughput of the last imputation."""
+
+    def __init__(
+        self,
+        k: int = 5,
+        blockSize: int = BLOCK_SIZE,
+        workers: int = 1,
+        referenceBlock: int = 4096,
+        maxReference: int = 0,
+        seed: int = None,
+    ):
+        """Parameters:
+
+        - k (int): Number of the neighbours.
+        - blockSize (int): Number of rows processed at once.
+        - workers (int): Number of threads processing the blocks.
+        - referenceBlock (int): Number of the reference rows compared at once.
+        - maxReference (int): Maximum number of the reference rows, the random
+          subset of the complete rows is used above it. 0 for no limit.
+        - seed (int): Random generator seed of the reference subset."""
+        super().__init__(blockSize=blockSize, workers=workers)
+        self.k = k
+        self.referenceBlock = referenceBlock
+        self.maxReference = maxReference
+        self.seed = seed
+        self.reference = None
+        self.rowsPerSecond = 0.0
+        self.logger = logger(__class__.__name__)
+
+    def fit(self, data: ndarray) -> Fixer:
+        """Learns the column means and the complete rows
+
+        Parameters:
+        - data (ndarray): The data with NaN elements.
+
+        Returns: (Fixer) self."""
+        super().fit(data)
+
+        parts = mapBlocks(
+            lambda start, stop: data[start:stop][
+                ~np.isnan(data[start:stop]).any(axis=1)
+            ],
+            data.shape[0],
+            self.blockSize,
+            self.workers,
+        )
+        self.reference = np.concatenate(parts)
+
+        if 0 < self.maxReference < len(self.reference):
+            rng = np.random.default_rng(self.seed)
+            subset = rng.choice(len(self.reference), self.maxReference, replace=False)
+            self.reference = self.reference[np.sort(subset)]
+
+        return self
+
+    def values(self) -> ndarray:
+        """Returns the feature mean value of each column, used without neighbours"""
+        return self.statistics.mean
+
+    def transform(self, data: ndarray) -> ndarray:
+        """Replaces NaN with the neighbours mean values, in place
 
-        colMean = np.nanmean(data, axis=0)
+        Parameters:
+        - data (ndarray): The data with NaN elements."""
+        if self.reference is None:
+            raise Exception("The fixer is not fitted. Call the method fit().")
 
-        isNanIdx = np.where(np.isnan(data))
+        def transform(start: int, stop: int) -> int:
+            block = data[start:stop]
+            rows = np.flatnonzero(np.isnan(block).any(axis=1))
+            if len(rows) > 0:
+                block[rows] = self.impute(block[rows])
+            return len(rows)
 
-        data[isNanIdx] = np.take(colMean, isNanIdx[1])
+        started = time.perf_counter()
+        imputed = sum(mapBlocks(transform, data.shape[0], self.blockSize, self.workers))
+        self.report(imputed, time.perf_counter() - started)
 
-        # print(
-        #     Icon.info,
-        #     __class__.__name__,
-        #     "replaced each NaN value in",
-        #     data.__class__.__name__,
-        #     "with the feature mean",
-        # )
         return data
+
+    def fill(self, data: ndarray, index: ndarray) -> ndarray:
+        """Returns the neighbours mean value for each NA cell
+
+        Without `fit()` the reference rows are the rows without NA cells.
+
+        Parameters:
+        - data (ndarray): The undamaged base data.
+        - index (ndarray): Sorted flat indices of the NA cells."""
+        features = data.shape[1]
+        rows, row = np.unique(index // features, return_inverse=True)
+
+        if self.reference is None:
+            complete = np.ones(data.shape[0], dtype=bool)
+            complete[rows] = False
+            self.fit(data[complete])
+
+        query = data[rows].astype(float)
+        query[row, index % features] = np.nan
+
+        started = time.perf_counter()
+        query = self.impute(query)
+        self.report(len(rows), time.perf_counter() - started)
+
+        return query[row, index % features].astype(data.dtype)
+
+    def impute(self, query: ndarray) -> ndarray:
+        """Imputes the rows with NaN by the nearest reference rows
+
+        The query rows are processed in batches of `referenceBlock` rows, so
+        the distances take at most `referenceBlock` x `referenceBlock` floats.
+
+        Parameters:
+        - query (ndarray): The rows with NaN elements.
+
+        Returns: (ndarray) The imputed rows."""
+        step = max(self.referenceBlock, 1)
+        if len(query) <= step:
+            return self.imputeBatch(query)
+
+        return np.concatenate(
+            [self.imputeBatch(query[i : i + step]) for i in range(0, len(query), step)]
+        )
+
+    def imputeBatch(self, query: ndarray) -> ndarray:
+        """Imputes the batch of the rows with NaN, see `impute()`
+
+        Parameters:
+        - query (ndarray): The rows with NaN elements.
+
+        Returns: (ndarray) The imputed rows."""
+        observed = ~np.isnan(query)
+        q = np.where(observed, query, 0.0)
+        m = observed.astype(float)
+        k = min(self.k, len(self.reference))
+
+        if k == 0:
+            return np.where(observed, query, self.values())
+
+        queryNorm = np.sum(q * q, axis=1, keepdims=True)
+        bestDistance = np.full((len(query), 0), np.inf)
+        bestIndex = np.zeros((len(query), 0), dtype=np.int64)
+
+        step = max(self.referenceBlock, k)
+        for start in range(0, len(self.reference), step):
+            r = self.reference[start : start + step]
+
+            # squared distances over the observed features of each query row
+            distance = queryNorm - 2.0 * (q @ r.T) + m @ (r * r).T
+
+            distance = np.concatenate((bestDistance, distance), axis=1)
+            candidates = np.arange(start, start + len(r))
+            index = np.concatenate(
+                (bestIndex, np.broadcast_to(candidates, (len(query), len(r)))), axis=1
+            )
+            nearest = np.argpartition(distance, k - 1, axis=1)[:, :k]
+            bestDistance = np.take_along_axis(distance, nearest, axis=1)
+            bestIndex = np.take_along_axis(index, nearest, axis=1)
+
+        neighbours = self.reference[bestIndex].mean(axis=1)
+
+        return np.where(observed, query, neighbours)
+
+    def report(self, rows: int, seconds: float) -> None:
+        """Logs the imputation throughput"""
+        self.rowsPerSecond = rows / seconds if seconds > 0 else 0.0
+        record(
+            self.logger,
+            "impute",
+            rows=rows,
+            duration=seconds,
+            rowsPerSecond=round(self.rowsPerSecond),
+        )
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+"""The package logging"""
+
+__author__ = "Ruben R. Kazumov"
+__copyright__ = "Copyright 2019, Ruben R. Kazumov"
+__credits__ = ["Ruben R. Kazumov"]
+__license__ = "MIT"
+__version__ = [3, 0, 0]
+__maintainer__ = "Ruben R. Kazumov"
+__email__ = "kazumov@gmail.com"
+__status__ = "Production"
+
+import os, json, atexit, queue
+
+import logging, logging.handlers
+
+from typing import Dict
+
+PACKAGE = "lab"  # the parent logger of the package loggers
+
+FILE = "app.log"
+
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+LEVEL = "LAB_LOG_LEVEL"  # the environment variable of the logging level
+
+LISTENERS = []  # the running queue listener of the process
+
+HANDLERS = []  # the queue handler of the package logger and the log file path
+
+
+def configure(
+    filename: str = FILE, level: int = None, filemode: str = "w"
+) -> logging.handlers.QueueListener:
+    """Sets up the package logging once per process
+
+    The records are put into the queue, the background thread of the listener
+    writes them into the file, so the pipeline does not wait for the disk.
+    The later calls return the running listener.
+
+    Parameters:
+    - filename (str): Path to the log file.
+    - level (int): The logging level, the `LAB_LOG_LEVEL` environment variable
+      (e.g. `WARNING`) or `INFO` by default.
+    - filemode (str): `w` for the new file, `a` for appending.
+
+    Returns: (QueueListener) The listener."""
+    if LISTENERS:
+        return LISTENERS[0]
+
+    if level is None:
+        level = logging.getLevelName(os.environ.get(LEVEL, "INFO").upper())
+        if not isinstance(level, int):
+            level = logging.INFO
+
+    handler = logging.FileHandler(filename, mode=filemode, delay=True)
+    handler.setFormatter(logging.Formatter(FORMAT))
+
+    records = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    package = logging.getLogger(PACKAGE)
+    package.setLevel(level)
+    package.addHandler(logging.handlers.QueueHandler(records))
+
+    LISTENERS.append(listener)
+    HANDLERS.extend([package.handlers[-1], filename])
+
+    return listener
+
+
+def restart() -> None:
+    """Restarts the logging in the forked process
+
+    The listener thread is not copied by the fork, so the child process gets
+    its own listener, which appends to the parent log file."""
+    if not LISTENERS:
+        return
+
+    handler, filename = HANDLERS
+    logging.getLogger(PACKAGE).removeHandler(handler)
+
+    LISTENERS.clear()
+    HANDLERS.clear()
+
+    configure(filename, level=logging.getLogger(PACKAGE).level, filemode="a")
+
+
+def logger(name: str) -> logging.Logger:
+    """Returns the package logger, sets up the package logging on the first call
+
+    Parameters:
+    - name (str): The logger name, e.g. the class name.
+
+    Returns: (Logger) The `lab.<name>` logger."""
+    configure()
+
+    return logging.getLogger(PACKAGE + "." + name)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=restart)
+
+
+class Fields:
+    """The structured record fields, formatted only when the record is written"""
+
+    def __init__(self, fields: Dict):
+        self.fields = fields
+
+    def __str__(self) -> str:
+        return json.dumps(self.fields, default=str)
+
+
+def record(
+    log: logging.Logger, stage: str, level: int = logging.INFO, **fields
+) -> None:
+    """Logs the structured record of the pipeline stage
+
+    Nothing is formatted, when the level is disabled. The record has the `stage`
+    and the `fields` attributes for the structured handlers, the message is
+    `<stage>() <fields as JSON>`.
+
+    Parameters:
+    - log (Logger): The logger.
+    - stage (str): The stage name, e.g. `makeTarget`.
+    - level (int): The logging level.
+    - fields: The record values: shapes, durations, counts, no arrays."""
+    if not log.isEnabledFor(level):
+        return
+
+    log.log(
+        level,
+        "%s() %s",
+        stage,
+        Fields(fields),
+        extra={"stage": stage, "fields": fields},
+    )
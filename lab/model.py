@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 """The model class"""
 
 __author__ = "Ruben R. Kazumov"
@@ -9,13 +11,14 @@ __maintainer__ = "Ruben R. Kazumov"
 __email__ = "kazumov@gmail.com"
 __status__ = "Production"
 
-from typing import Union
+import itertools
 
-import keras
+from typing import Dict, Iterator, List, Tuple, Union, TYPE_CHECKING
 
-from keras.models import Sequential
+import numpy as np
 
-from keras.layers import Dense, Dropout
+if TYPE_CHECKING:
+    from keras.models import Model, Sequential
 
 
 class ModelDDDD:
@@ -28,6 +31,10 @@ class ModelDDDD:
         """
         super().__init__()
 
+        from keras.models import Sequential
+
+        from keras.layers import Dense, Dropout
+
         model = Sequential()
 
         dense1 = int(featuresCount * 0.75)
@@ -48,3 +55,367 @@ class ModelDDDD:
 
     def summary(self):
         self.model.summary()
+
+
+class ModelStacked:
+    """Independent replicas of `ModelDDDD` in one model
+
+    Each replica has its own input, layers and output. The model loss is the
+    sum of the replica losses, so one training step updates all the replicas,
+    and the replica weights get the same updates as in separate fits."""
+
+    def __init__(self, featuresCount: int, replicas: int):
+        """Parameters:
+
+        - featuresCount (int): A number of features of the data set.
+        - replicas (int): A number of the replicas.
+        """
+        super().__init__()
+
+        from keras.models import Model
+
+        from keras.layers import Input, Dense, Dropout
+
+        dense1 = int(featuresCount * 0.75)
+        dense2 = int(featuresCount * 0.5)
+
+        inputs, outputs = [], []
+        for r in range(replicas):
+            x = Input(shape=(featuresCount,), name="input{0}".format(r))
+            inputs.append(x)
+
+            x = Dense(dense1, activation="relu")(x)
+            x = Dropout(0.1)(x)
+            x = Dense(dense2, activation="relu")(x)
+            outputs.append(
+                Dense(1, activation="sigmoid", name="replica{0}".format(r))(x)
+            )
+
+        model = Model(inputs=inputs, outputs=outputs)
+        model.compile(
+            optimizer="rmsprop", loss="binary_crossentropy", metrics=["accuracy"]
+        )
+        self.model = model
+        self.replicas = replicas
+
+    def __call__(self) -> Union[Model]:
+        """A factory method"""
+        return self.model
+
+    def summary(self):
+        self.model.summary()
+
+
+class History:
+    """The fitting history compatible with the Keras `History`
+
+    Attributes:
+    - epoch (List[int]): The epoch numbers, counting from 0.
+    - history (Dict[str, List[float]]): The metric values of each epoch.
+    - model: The fitted model."""
+
+    def __init__(self):
+        self.epoch = []
+        self.history = {}
+        self.model = None
+
+    def append(self, epoch: int, metrics: Dict[str, float]) -> None:
+        """Adds the metrics of the epoch"""
+        self.epoch.append(epoch)
+        for name, value in metrics.items():
+            self.history.setdefault(name, []).append(float(value))
+
+
+class ModelDDDDNumPy:
+    """NumPy model with layers: Dense->Dropout->Dense->Dense
+
+    The architecture, the initialization (Glorot uniform), the optimizer
+    (RMSprop) and the loss (binary cross-entropy) follow `ModelDDDD`. The
+    model has the `fit()` method of the Keras model, so it is used without
+    the framework overhead for the small data sets."""
+
+    def __init__(
+        self, featuresCount: int, learningRate: float = 0.001, seed: int = None
+    ):
+        """Parameters:
+
+        - featuresCount (int): A number of features of the data set.
+        - learningRate (float): The RMSprop learning rate.
+        - seed (int): Random generator seed of the weights, the dropout and the
+          shuffling, `None` for the not reproducible fitting.
+        """
+        super().__init__()
+
+        self.rng = np.random.default_rng(seed)
+        self.learningRate = learningRate
+        self.rho = 0.9
+        self.epsilon = 1e-7
+        self.dropout = 0.1
+
+        dense1 = int(featuresCount * 0.75)
+        dense2 = int(featuresCount * 0.5)
+
+        self.weights = []
+        for fanIn, fanOut in [(featuresCount, dense1), (dense1, dense2), (dense2, 1)]:
+            limit = np.sqrt(6.0 / (fanIn + fanOut))
+            self.weights.append(
+                self.rng.uniform(-limit, limit, (fanIn, fanOut)).astype(np.float32)
+            )
+            self.weights.append(np.zeros(fanOut, dtype=np.float32))
+
+        self.accumulators = [np.zeros_like(w) for w in self.weights]
+
+    def __call__(self) -> ModelDDDDNumPy:
+        """A factory method"""
+        return self
+
+    def summary(self) -> str:
+        """Returns the layers summary"""
+        lines = []
+        for i in range(0, len(self.weights), 2):
+            lines.append(
+                "Dense {0} -> {1}, params: {2}".format(
+                    self.weights[i].shape[0],
+                    self.weights[i].shape[1],
+                    self.weights[i].size + self.weights[i + 1].size,
+                )
+            )
+        lines.append("Total params: {0}".format(sum(w.size for w in self.weights)))
+        return "\n".join(lines)
+
+    def forward(self, x: np.ndarray, training: bool = False) -> Tuple:
+        """Calculates the layer outputs
+
+        Returns: (Tuple) The probabilities and the hidden layer outputs."""
+        w1, b1, w2, b2, w3, b3 = self.weights
+
+        h1 = np.maximum(x @ w1 + b1, 0.0)
+
+        keep = None
+        if training:
+            keep = self.rng.random(h1.shape, dtype=np.float32) >= self.dropout
+            keep = keep.astype(np.float32) / np.float32(1.0 - self.dropout)
+            h1 = h1 * keep
+
+        h2 = np.maximum(h1 @ w2 + b2, 0.0)
+
+        z = h2 @ w3 + b3
+        p = 1.0 / (1.0 + np.exp(-z))
+
+        return p, h1, h2, keep
+
+    def predict(self, x: np.ndarray, batch_size: int = 512) -> np.ndarray:
+        """Calculates the target class probabilities"""
+        return np.concatenate(
+            [
+                self.forward(np.asarray(x[i : i + batch_size], dtype=np.float32))[0]
+                for i in range(0, len(x), batch_size)
+            ]
+        )
+
+    def evaluate(
+        self, x: np.ndarray, y: np.ndarray, batch_size: int = 512
+    ) -> Tuple[float, float]:
+        """Calculates the loss and the accuracy"""
+        p = self.predict(x, batch_size)
+        return loss(p, y), accuracy(p, y)
+
+    def step(self, x: np.ndarray, y: np.ndarray) -> Tuple[float, float]:
+        """Updates the weights on the batch
+
+        Returns: (Tuple[float, float]) The batch loss and accuracy."""
+        w1, b1, w2, b2, w3, b3 = self.weights
+
+        p, h1, h2, keep = self.forward(x, training=True)
+
+        dz = (p - y) / len(x)  # the sigmoid and cross-entropy derivative
+        dh2 = (dz @ w3.T) * (h2 > 0)
+        dh1 = (dh2 @ w2.T) * (h1 > 0) * keep
+
+        gradients = [
+            x.T @ dh1,
+            dh1.sum(axis=0),
+            h1.T @ dh2,
+            dh2.sum(axis=0),
+            h2.T @ dz,
+            dz.sum(axis=0),
+        ]
+
+        for w, a, g in zip(self.weights, self.accumulators, gradients):
+            a *= self.rho
+            a += (1.0 - self.rho) * g * g
+            w -= self.learningRate * g / (np.sqrt(a) + self.epsilon)
+
+        return loss(p, y), accuracy(p, y)
+
+    def fit(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        batch_size: int = 32,
+        epochs: int = 1,
+        verbose: int = 1,
+        validation_data: Tuple[np.ndarray, np.ndarray] = None,
+        patience: int = 0,
+        minDelta: float = 0.0,
+        monitor: str = "val_accuracy",
+        callbacks: List = None,
+    ) -> History:
+        """Fits the model
+
+        Parameters:
+        - x (ndarray): The training features.
+        - y (ndarray): The training targets.
+        - batch_size (int): A bath size for fitting.
+        - epochs (int): A number of fitting epochs.
+        - verbose (int): Prints the epoch metrics when positive.
+        - validation_data (Tuple[ndarray, ndarray]): The test features and targets.
+        - patience (int): Stops after `patience` epochs without the `monitor`
+          improvement by `minDelta` and restores the best weights, 0 for the
+          fixed number of epochs.
+        - minDelta (float): The minimum improvement of the monitored metric.
+        - monitor (str): The monitored metric.
+        - callbacks (List): The objects with the Keras `Callback` methods
+          `on_epoch_begin(epoch, logs)` and `on_epoch_end(epoch, logs)`.
+
+        Returns: (History): The fitting history object."""
+
+        def training() -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+            while True:
+                order = self.rng.permutation(len(x))
+                for i in range(0, len(x), batch_size):
+                    batch = order[i : i + batch_size]
+                    yield x[batch], y[batch]
+
+        def validation() -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+            while True:
+                for i in range(0, len(validation_data[0]), batch_size):
+                    yield (
+                        validation_data[0][i : i + batch_size],
+                        validation_data[1][i : i + batch_size],
+                    )
+
+        return self.fit_generator(
+            training(),
+            steps_per_epoch=-(-len(x) // batch_size),
+            epochs=epochs,
+            verbose=verbose,
+            validation_data=None if validation_data is None else validation(),
+            validation_steps=(
+                None
+                if validation_data is None
+                else -(-len(validation_data[0]) // batch_size)
+            ),
+            patience=patience,
+            minDelta=minDelta,
+            monitor=monitor,
+            callbacks=callbacks,
+        )
+
+    def fit_generator(
+        self,
+        generator: Iterator[Tuple[np.ndarray, np.ndarray]],
+        steps_per_epoch: int,
+        epochs: int = 1,
+        verbose: int = 1,
+        validation_data: Iterator[Tuple[np.ndarray, np.ndarray]] = None,
+        validation_steps: int = None,
+        patience: int = 0,
+        minDelta: float = 0.0,
+        monitor: str = "val_accuracy",
+        callbacks: List = None,
+    ) -> History:
+        """Fits the model to the batches, like the Keras `fit_generator()`
+
+        Parameters:
+        - generator (Iterator[Tuple[ndarray, ndarray]]): The endless training
+          batches, e.g. `BatchSource.generator()`.
+        - steps_per_epoch (int): A number of the training batches in an epoch.
+        - epochs (int): A number of fitting epochs.
+        - verbose (int): Prints the epoch metrics when positive.
+        - validation_data (Iterator[Tuple[ndarray, ndarray]]): The endless test
+          batches.
+        - validation_steps (int): A number of the test batches in an epoch.
+        - patience (int): Stops after `patience` epochs without the `monitor`
+          improvement by `minDelta` and restores the best weights, 0 for the
+          fixed number of epochs.
+        - minDelta (float): The minimum improvement of the monitored metric.
+        - monitor (str): The monitored metric.
+        - callbacks (List): The objects with the Keras `Callback` methods
+          `on_epoch_begin(epoch, logs)` and `on_epoch_end(epoch, logs)`.
+
+        Returns: (History): The fitting history object."""
+        history = History()
+        history.model = self
+
+        sign = 1.0 if "acc" in monitor else -1.0
+        best, bestWeights, wait = -np.inf, None, 0
+
+        callbacks = callbacks or []
+
+        for epoch in range(epochs):
+            for callback in callbacks:
+                callback.on_epoch_begin(epoch)
+
+            losses, accuracies, sizes = [], [], []
+
+            for x, y in itertools.islice(generator, steps_per_epoch):
+                batchLoss, batchAccuracy = self.step(
+                    np.asarray(x, dtype=np.float32),
+                    np.asarray(y, dtype=np.float32).reshape(-1, 1),
+                )
+                losses.append(batchLoss)
+                accuracies.append(batchAccuracy)
+                sizes.append(len(x))
+
+            metrics = {
+                "loss": np.average(losses, weights=sizes),
+                "accuracy": np.average(accuracies, weights=sizes),
+            }
+            if validation_data is not None:
+                losses, accuracies, sizes = [], [], []
+                for x, y in itertools.islice(validation_data, validation_steps):
+                    p = self.forward(np.asarray(x, dtype=np.float32))[0]
+                    losses.append(loss(p, y))
+                    accuracies.append(accuracy(p, y))
+                    sizes.append(len(x))
+
+                metrics["val_loss"] = np.average(losses, weights=sizes)
+                metrics["val_accuracy"] = np.average(accuracies, weights=sizes)
+
+            history.append(epoch, metrics)
+
+            for callback in callbacks:
+                callback.on_epoch_end(epoch, metrics)
+
+            if verbose > 0:
+                print(
+                    "Epoch {0}/{1}".format(epoch + 1, epochs),
+                    *["{0}: {1:.4f}".format(k, v) for k, v in metrics.items()],
+                    sep=" - ",
+                )
+
+            if patience > 0:
+                if sign * metrics[monitor] - abs(minDelta) > best:
+                    best, wait = sign * metrics[monitor], 0
+                    bestWeights = [w.copy() for w in self.weights]
+                else:
+                    wait += 1
+                    if wait >= patience:
+                        self.weights = bestWeights
+                        break
+
+        return history
+
+
+def loss(p: np.ndarray, y: np.ndarray) -> float:
+    """Calculates the binary cross-entropy"""
+    p = np.clip(p, 1e-7, 1.0 - 1e-7)
+    y = np.asarray(y, dtype=np.float32).reshape(p.shape)
+    return float(-np.mean(y * np.log(p) + (1.0 - y) * np.log(1.0 - p)))
+
+
+def accuracy(p: np.ndarray, y: np.ndarray) -> float:
+    """Calculates the binary accuracy"""
+    y = np.asarray(y).reshape(p.shape)
+    return float(np.mean((p > 0.5) == (y > 0.5)))
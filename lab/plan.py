@@ -0,0 +1,424 @@
+from __future__ import annotations
+
+"""The lazy data set pipeline class"""
+
+__author__ = "Ruben R. Kazumov"
+__copyright__ = "Copyright 2019, Ruben R. Kazumov"
+__credits__ = ["Ruben R. Kazumov"]
+__license__ = "MIT"
+__version__ = [3, 0, 0]
+__maintainer__ = "Ruben R. Kazumov"
+__email__ = "kazumov@gmail.com"
+__status__ = "Production"
+
+import os, copy, time, uuid, inspect, functools
+
+from typing import Callable, Dict, List, Tuple, TYPE_CHECKING
+
+import logging, logging.config
+
+import numpy as np
+
+from lab.block import allocate
+from lab.cache import STEPS, Recipe
+from lab.damager import Damager, DMGNoiseFeatures
+from lab.fixer import Fixer, Statistics
+from lab.log import logger, record
+from lab.target import batch
+from lab.trace import traced
+
+if TYPE_CHECKING:
+    from lab.data import Data
+
+
+class Stage:
+    """The fused call of the plan
+
+    Attributes:
+    - call (tuple): The recorded call `(name, args, kwargs)`.
+    - shape (Tuple[int, int]): The features data shape after the call.
+    - mutates (bool): The call changes the features block in place.
+    - na (ndarray): The damage overlay cells added by the call, `None` for
+      the damage of the data.
+    - fixer (Fixer): The fixer, which learns the statistics in the pass and
+      runs `transform()` after it.
+    - statistics (Statistics): The statistics learned in the pass.
+    - block (Callable): Function of the features rows, the target rows and
+      the first row number, returns the changed features and target rows."""
+
+    def __init__(self, call: tuple, shape: Tuple[int, int]):
+        """Parameters:
+
+        - call (tuple): The recorded call `(name, args, kwargs)`.
+        - shape (Tuple[int, int]): The features data shape before the call."""
+        self.call = call
+        self.shape = shape
+        self.mutates = False
+        self.na = None
+        self.fixer = None
+        self.statistics = None
+        self.block = None
+
+
+class Plan(Recipe):
+    """The lazy data set pipeline
+
+    Records the chained `Data` calls like `Recipe` and runs them in one pass
+    over the row blocks: a block is generated, gets the targets, the damage
+    and the fix and is written to the output arrays, so the pipeline never
+    creates the full size temporaries. A chained call returns a new plan, so
+    the plans with a common prefix are the branches, which share the
+    upstream work when executed together, e.g.:
+
+    `base = DataRandom.lazy(features=15, seed=1).makeTarget(TGAlpha()).damage(DMGNA(seed=2), 0.1)`
+
+    `zero, mean = execute([base.fix(FXZero()), base.fix(FXMean())])`
+
+    The pass fuses `makeTarget()`, `damage()` by a damager with the `mask()`
+    method or by `DMGNoiseFeatures`, and `fix()` by a fixer replacing NaN
+    with the per-column values. The fixer learning the statistics ends the
+    pass, `transform()` runs on the written data. The rest of the calls
+    (e.g. `split()`) run on the built data set as usual. The source class
+    must implement the `stream()` method, which returns the data shape and
+    the row blocks for the constructor parameters, otherwise the plan is
+    built as `Recipe`."""
+
+    def __getattr__(self, name: str) -> Callable:
+        if name not in STEPS:
+            raise AttributeError(name)
+
+        def record(*args, **kwargs) -> Plan:
+            plan = copy.copy(self)
+            plan.calls = self.calls + [(name, args, kwargs)]
+            return plan
+
+        return record
+
+    def stages(self, shape: Tuple[int, int], compiled: Dict[int, Stage]) -> List[Stage]:
+        """Compiles the fused calls
+
+        Parameters:
+        - shape (Tuple[int, int]): The shape of the source features data.
+        - compiled (Dict[int, Stage]): The stages of the calls compiled for
+          the other branches, by the call identity.
+
+        Returns: (List[Stage]) The stages of the leading fused calls."""
+        stages = []
+        overlay = False
+
+        for call in self.calls:
+            stage = compiled.get(id(call))
+            if stage is None:
+                stage = compileStage(self.source, call, shape, overlay)
+                if stage is None:
+                    break
+                compiled[id(call)] = stage
+
+            stages.append(stage)
+            shape = stage.shape
+            overlay = overlay or stage.na is not None
+
+            if stage.fixer is not None:
+                break  # `transform()` needs the statistics of all the rows
+
+        return stages
+
+    @traced()
+    def execute(self, url: str = "") -> Data:
+        """Runs the plan
+
+        Parameters:
+        - url (str): Path to the directory for the memory-mapped arrays,
+          empty for the in-memory arrays.
+
+        Returns: (Data) The data set."""
+        return execute([self], [url])[0]
+
+    def save(self, path: str, name: str = "") -> str:
+        """Runs the plan and writes the arrays directly to a disk
+
+        The data set is stored in the `npy` format, see `Data.save()`.
+
+        Parameters:
+        - path (str): Path to directory where the data set will be stored.
+        - name (str): The data set name, random when empty.
+
+        Returns: (str) URL to the stored data set."""
+        url = path + os.sep + (name or str(uuid.uuid4()))
+
+        return self.execute(url).saveArrays(url)
+
+
+def compileStage(
+    source: type, call: tuple, shape: Tuple[int, int], overlay: bool
+) -> Stage:
+    """Creates the stage of the call
+
+    Parameters:
+    - source (type): The `Data` class.
+    - call (tuple): The recorded call `(name, args, kwargs)`.
+    - shape (Tuple[int, int]): The features data shape before the call.
+    - overlay (bool): The data has the damage overlay.
+
+    Returns: (Stage) The stage, `None` for the call, which is not fused."""
+    name, args, kwargs = call
+    bound = inspect.signature(getattr(source, name)).bind(None, *args, **kwargs)
+    bound.apply_defaults()
+    bound = bound.arguments
+    stage = Stage(call, shape)
+
+    if name == "makeTarget":
+        targetGenerator = bound["targetGenerator"]
+        stage.block = lambda x, y, start: (
+            x,
+            np.reshape(batch(targetGenerator, x), (-1, 1)),
+        )
+        return stage
+
+    if name == "damage":
+        damager, quantity = bound["damager"], bound["quantity"]
+
+        if type(damager).mask is not Damager.mask:
+            na = damager.mask(shape, quantity)
+
+            if bound["overlay"]:
+                stage.na = na
+                stage.block = lambda x, y, start: (x, y)
+                return stage
+
+            if overlay:
+                return None
+
+            def damage(x: np.ndarray, y: np.ndarray, start: int) -> Tuple:
+                first, last = np.searchsorted(
+                    na, [start * shape[1], (start + len(x)) * shape[1]]
+                )
+                np.put(x, na[first:last] - start * shape[1], np.nan)
+                return x, y
+
+            stage.mutates = True
+            stage.block = damage
+            return stage
+
+        if isinstance(damager, DMGNoiseFeatures) and not (overlay or bound["overlay"]):
+            rng = None if damager.seed is None else np.random.default_rng(damager.seed)
+
+            def noise(x: np.ndarray, y: np.ndarray, start: int) -> Tuple:
+                if rng is None:
+                    values = np.random.rand(len(x), quantity)
+                else:
+                    values = rng.random((len(x), quantity))  # the same stream
+                return np.concatenate((x, values), axis=1), y
+
+            stage.shape = (shape[0], shape[1] + quantity)
+            stage.block = noise
+            return stage
+
+        return None
+
+    if name == "fix":
+        fixer = bound["fixer"]
+
+        if overlay or bound["train"] or type(fixer).transform is not Fixer.transform:
+            return None  # the training rows are known after `split()`
+
+        if not bound["refit"] or not fixer.learns:
+            if bound["refit"]:
+                fixer.fit(np.empty((0, shape[1])))
+            elif fixer.statistics is None:
+                raise Exception("The fixer is not fitted. Call the method fit().")
+
+            values = fixer.values()
+
+            def fix(x: np.ndarray, y: np.ndarray, start: int) -> Tuple:
+                np.copyto(x, np.broadcast_to(values, x.shape), where=np.isnan(x))
+                return x, y
+
+            stage.mutates = True
+            stage.block = fix
+            return stage
+
+        stage.fixer = fixer
+        stage.statistics = Statistics(shape[1])
+
+        def learn(x: np.ndarray, y: np.ndarray, start: int) -> Tuple:
+            stage.statistics.merge(Statistics.of(x))
+            return x, y
+
+        stage.block = learn
+        return stage
+
+    return None
+
+
+def execute(plans: List[Plan], urls: List[str] = None) -> List[Data]:
+    """Runs the plans with the common source in one pass over the row blocks
+
+    A row block passes each call once: the branches reuse the block of their
+    common prefix, it is copied before the call changing it in place, when
+    the block is used by the branches not passing the call.
+
+    Parameters:
+    - plans (List[Plan]): The plans.
+    - urls (List[str]): Paths to the directories for the memory-mapped arrays
+      of each plan, `None` for the in-memory arrays.
+
+    Returns: (List[Data]) The data set of each plan."""
+    started = time.perf_counter()
+    log = logger("Plan")
+
+    source = plans[0]
+    if any(
+        (p.source, p.args, p.kwargs) != (source.source, source.args, source.kwargs)
+        for p in plans
+    ):
+        raise Exception("The plans have different sources.")
+
+    if urls is None:
+        urls = [""] * len(plans)
+
+    if not hasattr(source.source, "stream"):
+        return [plan.build() for plan in plans]
+
+    shape, rows = source.source.stream(*source.args, **source.kwargs)
+
+    recipes = [plan.steps for plan in plans]  # before the fixers learn
+
+    compiled = {}
+    stages = [plan.stages(shape, compiled) for plan in plans]
+
+    users = {}  # the plans passing a prefix
+    for i, s in enumerate(stages):
+        for j in range(len(s) + 1):
+            users.setdefault(tuple(id(stage) for stage in s[:j]), set()).add(i)
+
+    def process(block: np.ndarray, start: int) -> List[Tuple]:
+        # the state of a prefix keeps the prefix, which created its features
+        # block, e.g. `makeTarget()` passes the block it gets
+        states = {(): (block, None, ())}
+        results = []
+
+        for s in stages:
+            k = ()
+            x, y, origin = block, None, ()
+
+            for stage in s:
+                k = k + (id(stage),)
+                if k in states:
+                    x, y, origin = states[k]
+                    continue
+                if stage.mutates and users[origin] != users[k]:
+                    x, origin = x.copy(), k  # the block is used by other branches
+                changed, y = stage.block(x, y, start)
+                if changed is not x:
+                    origin = k
+                x = changed
+                states[k] = (x, y, origin)
+
+            results.append((x, y))
+
+        return results
+
+    outputs = None
+    start = 0
+
+    for block in rows:
+        results = process(block, start)
+
+        if outputs is None:
+            outputs = [
+                output(x, y, shape[0], url) for (x, y), url in zip(results, urls)
+            ]
+
+        for arrays, (x, y) in zip(outputs, results):
+            arrays["x"][start : start + len(x)] = x
+            if y is not None:
+                arrays["y"][start : start + len(y)] = y
+
+        start += len(block)
+
+    if outputs is None:  # no rows
+        results = process(np.empty((0, shape[1])), 0)
+        outputs = [output(x, y, 0, url) for (x, y), url in zip(results, urls)]
+
+    datas = [
+        build(plan, recipe, s, arrays)
+        for plan, recipe, s, arrays in zip(plans, recipes, stages, outputs)
+    ]
+
+    record(
+        log,
+        "execute",
+        plans=len(plans),
+        rows=start,
+        fused=[len(s) for s in stages],
+        duration=time.perf_counter() - started,
+    )
+
+    return datas
+
+
+def output(x: np.ndarray, y: np.ndarray, rows: int, url: str) -> Dict[str, np.ndarray]:
+    """Allocates the output arrays of the plan
+
+    Parameters:
+    - x (ndarray): The first features block.
+    - y (ndarray): The first target block, `None` without targets.
+    - rows (int): Number of rows.
+    - url (str): Path to the directory for the memory-mapped arrays, empty for
+      the in-memory arrays.
+
+    Returns: (Dict[str, ndarray]) The arrays by the `Data` attribute."""
+    if url != "":
+        os.makedirs(url, exist_ok=True)
+
+    arrays = {}
+    for attr, block in [("x", x), ("y", y)]:
+        if block is not None:
+            arrays[attr] = allocate(
+                (rows,) + block.shape[1:],
+                block.dtype,
+                url and url + os.sep + attr + ".npy",
+            )
+
+    return arrays
+
+
+def build(
+    plan: Plan, recipe: List[Dict], stages: List[Stage], arrays: Dict[str, np.ndarray]
+) -> Data:
+    """Creates the data set of the executed plan
+
+    Parameters:
+    - plan (Plan): The plan.
+    - recipe (List[Dict]): The steps of the plan.
+    - stages (List[Stage]): The fused calls of the plan.
+    - arrays (Dict[str, ndarray]): The output arrays by the `Data` attribute.
+
+    Returns: (Data) The data set, the not fused calls are applied to it."""
+    from lab.data import Data  # `lab.data` creates the plans
+
+    data = Data.__new__(plan.source)
+    Data.__init__(data)
+    data.logger = logger(plan.source.__name__)
+
+    for attr, array in arrays.items():
+        setattr(data, attr, array)
+
+    na = [stage.na for stage in stages if stage.na is not None]
+    if na:
+        data.x.flags.writeable = False  # the base array is shared by the variants
+        data.na = functools.reduce(np.union1d, na)
+        data.fill = None
+
+    data.recipe = recipe[: len(stages) + 1]
+
+    for stage in stages:
+        if stage.fixer is not None:
+            stage.fixer.statistics = stage.statistics
+            stage.fixer.transform(data.x)
+
+    for name, args, kwargs in plan.calls[len(stages) :]:
+        data = getattr(data, name)(*args, **kwargs)
+
+    return data
@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 """The plot class"""
 
 __author__ = "Ruben R. Kazumov"
@@ -9,17 +11,86 @@ __maintainer__ = "Ruben R. Kazumov"
 __email__ = "kazumov@gmail.com"
 __status__ = "Production"
 
-import os, sys
+import os, sys, math
 
 from uuid import uuid4
 
 from abc import ABC
 
-from keras.callbacks.callbacks import History
+from concurrent.futures import ProcessPoolExecutor
+
+from typing import Dict, List, Tuple, Union, TYPE_CHECKING
+
+from lab.log import logger
+
+if TYPE_CHECKING:
+    from keras.callbacks.callbacks import History
+
+    from matplotlib.figure import Figure
+
+
+STYLES = ["seaborn", "seaborn-v0_8"]  # the style name before and after matplotlib 3.6
+
+FIGURES = {}  # the figures reused by the process, by the grid size
+
+STYLED = []  # not empty after the style is set
+
+SIZE = (6.4, 4.8)  # the size of one plot, inches
+
+
+def style() -> None:
+    """Sets the non-interactive backend and the plot style once per process"""
+    if STYLED:
+        return
+
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+    import matplotlib.style
+
+    import seaborn
+
+    for name in STYLES:
+        if name in matplotlib.style.available:
+            matplotlib.style.use(name)
+            break
+
+    seaborn.set_style("whitegrid")
+
+    STYLED.append(True)
+
+
+def figure(rows: int = 1, columns: int = 1) -> Tuple[Figure, List]:
+    """Returns the cleared figure of the grid size and its axes
+
+    The figures are not registered in `pyplot`, so they are not kept open, and
+    one figure of a size is reused for all the plots of the process.
 
-import matplotlib.pyplot as plt
+    Parameters:
+    - rows (int): Number of the plot rows.
+    - columns (int): Number of the plot columns.
 
-import seaborn
+    Returns: (Tuple[Figure, List]) The figure and the axes, row by row."""
+    style()
+
+    if (rows, columns) not in FIGURES:
+        from matplotlib.figure import Figure
+
+        FIGURES[(rows, columns)] = Figure(figsize=(SIZE[0] * columns, SIZE[1] * rows))
+
+    f = FIGURES[(rows, columns)]
+    f.clear()
+
+    return f, [f.add_subplot(rows, columns, i + 1) for i in range(rows * columns)]
+
+
+def metrics(history: Union[History, Dict]) -> Dict[str, List[float]]:
+    """Returns the metric values of the fitting history or the metrics dictionary"""
+    return {
+        name: [float(v) for v in values]
+        for name, values in getattr(history, "history", history).items()
+    }
 
 
 class Plot(ABC):
@@ -43,6 +114,15 @@ class Plot(ABC):
                 # remove old file
                 os.remove(self.url)
 
+    def save(self, f: Figure) -> str:
+        """Saves the figure to the plot file
+
+        Returns (str): URL to plot file."""
+        os.makedirs(self.path, exist_ok=True)
+        f.savefig(self.url)
+        f.clear()
+        return self.url
+
 
 class FittingAccuracy(Plot):
     """The fitting accuracy plot"""
@@ -54,44 +134,37 @@ class FittingAccuracy(Plot):
 
     def plot(
         self,
-        history: History,
+        history: Union[History, Dict],
         trainingDataSelector: str = "accuracy",
         testDataSelector: str = "val_accuracy",
     ) -> str:
         """Creates a fitting accuracy plot.
         
         Parameter:
-        - history (History): A fitting history.
+        - history (History): A fitting history or its metrics dictionary.
         - trainingDataSelector (str): A histroy data attribute name for the training data.
         - testDataSelector (str): A histroy data attribute name fro the testing data.
 
         Returns (str): URL to plot file."""
+        history = metrics(history)
 
-        plt.style.use("seaborn")
-
-        seaborn.set_style("whitegrid")
-
-        plt.figure()
-
-        axes = plt.gca()
+        f, (axes,) = figure()
 
         axes.set_ylim([0.4, 1.0])
 
-        plt.plot(history.history[trainingDataSelector])
+        axes.plot(history[trainingDataSelector])
 
-        plt.plot(history.history[testDataSelector])
+        axes.plot(history[testDataSelector])
 
-        plt.title(f"Accuracy plot for the data: ({self.title})")
+        axes.set_title(f"Accuracy plot for the data: ({self.title})")
 
-        plt.ylabel("Accuracy")
+        axes.set_ylabel("Accuracy")
 
-        plt.xlabel("Epoch")
+        axes.set_xlabel("Epoch")
 
-        plt.legend(["Train", "Test"], loc="upper left")
+        axes.legend(["Train", "Test"], loc="upper left")
 
-        plt.savefig(self.url)
-
-        return self.url
+        return self.save(f)
 
 
 class FittingLossFunction(Plot):
@@ -104,37 +177,160 @@ class FittingLossFunction(Plot):
 
     def plot(
         self,
-        history: History,
+        history: Union[History, Dict],
         trainingDataSelector: str = "loss",
         testDataSelector: str = "val_loss",
-    ) -> None:
+    ) -> str:
         """Plots a history of the loss function value change
 
         Parameter:
-        - history (History): A fitting history.
+        - history (History): A fitting history or its metrics dictionary.
         - trainingDataSelector (str): A histroy data attribute name for the training data.
         - testDataSelector (str): A histroy data attribute name fro the testing data.
         
         Returns (str): URL to plot file."""
+        history = metrics(history)
 
-        plt.style.use("seaborn")
+        f, (axes,) = figure()
 
-        seaborn.set_style("whitegrid")
+        axes.plot(history[trainingDataSelector])
 
-        plt.figure()
+        axes.plot(history[testDataSelector])
 
-        plt.plot(history.history[trainingDataSelector])
+        axes.set_title(f"Loss function plot for the data: ({self.title})")
 
-        plt.plot(history.history[testDataSelector])
+        axes.set_ylabel("Loss")
 
-        plt.title(f"Loss function plot for the data: ({self.title})")
+        axes.set_xlabel("Epoch")
 
-        plt.ylabel("Loss")
+        axes.legend(["Train", "Test"], loc="upper left")
 
-        plt.xlabel("Epoch")
+        return self.save(f)
 
-        plt.legend(["Train", "Test"], loc="upper left")
 
-        plt.savefig(self.url)
+class FittingOverlay(Plot):
+    """The metric of several fits in one plot, e.g. the zero and the mean fixed data"""
 
-        return self.url
+    def __init__(self, title: str = "", path: str = "plots", fileName: str = ""):
+        self.title = title
+        super().__init__(path=path, fileName=fileName)
+
+    def plot(
+        self, histories: Dict[str, Union[History, Dict]], selector: str = "val_accuracy"
+    ) -> str:
+        """Plots the metric of each fit
+
+        Parameter:
+        - histories (Dict[str, History]): The fitting histories by the legend label.
+        - selector (str): A histroy data attribute name.
+
+        Returns (str): URL to plot file."""
+        f, (axes,) = figure()
+
+        draw(axes, histories, selector)
+
+        axes.set_title(f"{selector} plot for the data: ({self.title})")
+
+        return self.save(f)
+
+
+class FittingPanels(Plot):
+    """The small multiples of the overlay plots, e.g. one panel per NA rate"""
+
+    def __init__(self, title: str = "", path: str = "plots", fileName: str = ""):
+        self.title = title
+        super().__init__(path=path, fileName=fileName)
+
+    def plot(
+        self,
+        panels: Dict[str, Dict[str, Union[History, Dict]]],
+        selector: str = "val_accuracy",
+        columns: int = 3,
+    ) -> str:
+        """Plots the metric of each fit, the fits are grouped in the panels
+
+        Parameter:
+        - panels (Dict[str, Dict[str, History]]): The fitting histories by the
+          legend label, by the panel title.
+        - selector (str): A histroy data attribute name.
+        - columns (int): The maximum number of panels in a row.
+
+        Returns (str): URL to plot file."""
+        columns = max(1, min(columns, len(panels)))
+        rows = math.ceil(len(panels) / columns)
+
+        f, axes = figure(rows, columns)
+
+        for a, (title, histories) in zip(axes, panels.items()):
+            draw(a, histories, selector)
+            a.set_title(title)
+
+        for a in axes[len(panels) :]:
+            a.set_visible(False)
+
+        f.suptitle(f"{selector} plot for the data: ({self.title})")
+
+        return self.save(f)
+
+
+def draw(axes, histories: Dict[str, Union[History, Dict]], selector: str) -> None:
+    """Draws the metric curve of each fit on the axes"""
+    for label, history in histories.items():
+        axes.plot(metrics(history)[selector], label=label)
+
+    if "acc" in selector:
+        axes.set_ylim([0.4, 1.0])
+
+    axes.set_ylabel(selector)
+
+    axes.set_xlabel("Epoch")
+
+    axes.legend(loc="upper left")
+
+
+def plain(data: Union[History, Dict]) -> Dict:
+    """Replaces the fitting histories by the metrics dictionaries, so the plot
+    data is sent to the worker processes without the fitted models"""
+    if hasattr(data, "history"):
+        return metrics(data)
+    if isinstance(data, dict):
+        return {name: plain(value) for name, value in data.items()}
+    return data
+
+
+def make(job: Dict) -> str:
+    """Renders the plot of the job
+
+    Parameters:
+    - job (Dict): The plot class `plot`, its constructor arguments `args`, the
+      plotted `data` and the `plot()` method keyword arguments `options`.
+
+    Returns: (str) URL to the plot file, empty for the failed plot."""
+    try:
+        return job["plot"](**job.get("args", {})).plot(
+            job["data"], **job.get("options", {})
+        )
+    except Exception as e:
+        logger("Plot").error("make(): the plot failed: {0}".format(e))
+        return ""
+
+
+def render(jobs: List[Dict], workers: int = 0) -> List[str]:
+    """Renders the plots in a process pool
+
+    Each worker process sets the plot style and creates the figures once.
+
+    Parameters:
+    - jobs (List[Dict]): The plot jobs, see `make()`.
+    - workers (int): Number of the worker processes, 0 for the CPU count, 1
+      for the rendering in the calling process.
+
+    Returns: (List[str]) The plot URLs in the jobs order."""
+    jobs = [dict(job, data=plain(job["data"])) for job in jobs]
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        return [make(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(make, jobs, chunksize=math.ceil(len(jobs) / workers)))
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+"""The fitting history store class"""
+
+__author__ = "Ruben R. Kazumov"
+__copyright__ = "Copyright 2019, Ruben R. Kazumov"
+__credits__ = ["Ruben R. Kazumov"]
+__license__ = "MIT"
+__version__ = [3, 0, 0]
+__maintainer__ = "Ruben R. Kazumov"
+__email__ = "kazumov@gmail.com"
+__status__ = "Production"
+
+import os, json, hashlib, datetime
+
+from typing import Dict, List, Tuple, Union, TYPE_CHECKING
+
+import logging, logging.config
+
+import numpy as np
+
+from lab.model import History
+from lab.log import logger
+
+if TYPE_CHECKING:
+    from keras.callbacks.callbacks import History as KerasHistory
+
+
+INDEX = "index.json"
+
+INDEX_FORMAT = "lab.store/1"
+
+
+def key(parameters: Dict) -> str:
+    """Calculates the address of the run by its parameters"""
+    return hashlib.sha256(json.dumps(parameters, sort_keys=True).encode()).hexdigest()
+
+
+class HistoryStore:
+    """The compact storage of the fitting histories
+
+    The metrics of a run are stored as one `float32` array, an epoch per row
+    and a metric per column, in the `<key>.npy` file. The index file has the
+    run parameters, the metric names and the converged epoch of each run, so
+    the runs are found and plotted without the refitting and without Keras."""
+
+    def __init__(self, path: str = "histories"):
+        """Parameters:
+
+        - path (str): Path to the store directory."""
+        self.path = path
+
+        os.makedirs(path, exist_ok=True)
+
+        self.index = {}
+        url = self.path + os.sep + INDEX
+        if os.path.exists(url):
+            with open(url, "r") as f:
+                index = json.load(f)
+            if index.get("format") != INDEX_FORMAT:
+                raise Exception("The unknown history index format.")
+            self.index = index["runs"]
+
+        self.logger = logger(__class__.__name__)
+
+    def put(
+        self,
+        history: Union[KerasHistory, History, Dict],
+        parameters: Dict,
+        convergedEpoch: int = None,
+    ) -> str:
+        """Stores the fitting history of the run
+
+        The run with the same parameters is replaced.
+
+        Parameters:
+        - history (Union[History, Dict]): The fitting history or its metrics.
+        - parameters (Dict): The run parameters, JSON serializable.
+        - convergedEpoch (int): The converged epoch, `None` for the attribute
+          of the history.
+
+        Returns: (str) The run key."""
+        metrics = getattr(history, "history", history)
+        names = sorted(metrics.keys())
+        epochs = max([len(metrics[name]) for name in names] + [0])
+
+        values = np.full((epochs, len(names)), np.nan, dtype=np.float32)
+        for i, name in enumerate(names):
+            values[: len(metrics[name]), i] = metrics[name]
+
+        if convergedEpoch is None:
+            convergedEpoch = getattr(history, "convergedEpoch", None)
+
+        k = key(parameters)
+        np.save(self.path + os.sep + k + ".npy", values)
+
+        self.index[k] = {
+            "parameters": parameters,
+            "metrics": names,
+            "epochs": epochs,
+            "lengths": [len(metrics[name]) for name in names],
+            "convergedEpoch": convergedEpoch,
+            "created": datetime.datetime.now().isoformat(),
+        }
+        self.save()
+
+        self.logger.info("put(): stored `%s`", k)
+
+        return k
+
+    def save(self) -> None:
+        """Writes the index file"""
+        url = self.path + os.sep + INDEX
+        with open(url + ".tmp", "w") as f:
+            json.dump({"format": INDEX_FORMAT, "runs": self.index}, f)
+        os.replace(url + ".tmp", url)
+
+    def get(self, k: str) -> History:
+        """Reads the fitting history of the run
+
+        Parameters:
+        - k (str): The run key.
+
+        Returns: (History) The history with the `parameters` and the
+        `convergedEpoch` attributes."""
+        if k not in self.index:
+            raise Exception("The run `{0}` is not in the store.".format(k))
+
+        run = self.index[k]
+        values = np.load(self.path + os.sep + k + ".npy")
+
+        history = History()
+        history.epoch = list(range(len(values)))
+        lengths = run.get("lengths", [len(values)] * len(run["metrics"]))
+        for name, column, length in zip(run["metrics"], values.T, lengths):
+            history.history[name] = column[:length].tolist()
+
+        history.parameters = run["parameters"]
+        history.convergedEpoch = run["convergedEpoch"]
+
+        return history
+
+    def find(self, **parameters) -> List[str]:
+        """Finds the runs with the parameter values
+
+        Returns: (List[str]) The run keys in the storing order."""
+        return [
+            k
+            for k, run in self.index.items()
+            if all(run["parameters"].get(n) == v for n, v in parameters.items())
+        ]
+
+    def load(self, **parameters) -> List[History]:
+        """Reads the fitting histories of the runs with the parameter values"""
+        return [self.get(k) for k in self.find(**parameters)]
@@ -0,0 +1,356 @@
+from __future__ import annotations
+
+"""The experiment sweep class"""
+
+__author__ = "Ruben R. Kazumov"
+__copyright__ = "Copyright 2019, Ruben R. Kazumov"
+__credits__ = ["Ruben R. Kazumov"]
+__license__ = "MIT"
+__version__ = [3, 0, 0]
+__maintainer__ = "Ruben R. Kazumov"
+__email__ = "kazumov@gmail.com"
+__status__ = "Production"
+
+import os, itertools
+
+from typing import Dict, List
+
+import logging, logging.config
+
+from concurrent.futures import ProcessPoolExecutor
+
+from lab.block import seeds
+from lab.cache import Cache, Recipe, describeCall
+from lab.data import Data, DataRandom
+from lab.target import TGAlpha
+from lab.damager import DMGNA, DMGNoiseFeatures
+from lab.fixer import FXZero, FXMean, FXKNN
+from lab import trace
+from lab.store import HistoryStore
+from lab.plot import FittingAccuracy, FittingLossFunction, FittingPanels, render
+from lab.worker import run
+from lab.log import logger
+
+FIXERS = {"zero": FXZero, "mean": FXMean, "knn": FXKNN}
+
+SIGNATURES = {"zero": "0", "mean": "Mu", "knn": "KNN"}
+
+THREADS = [
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "TF_NUM_INTRAOP_THREADS",
+    "TF_NUM_INTEROP_THREADS",
+]
+
+DEFAULTS = {
+    "features": [15],
+    "observations": [10000],
+    "noiseFeatures": [5],
+    "na": [0.001],
+    "fixer": ["zero", "mean"],
+    "split": [0.3],
+}
+
+
+PARAMETERS = list(DEFAULTS.keys()) + [
+    "epochs",
+    "batchSize",
+    "patience",
+    "minDelta",
+    "backend",
+    "seed",
+]  # the job parameters of the stored runs
+
+DEFAULTS_RUN = {name: values[0] for name, values in DEFAULTS.items()}
+
+LIMITS = []  # the thread limits of the worker process
+
+
+def limitThreads(threads: int) -> None:
+    """Limits the numeric threads of the worker process
+
+    Called before the worker imports the fitting framework, the variables
+    limit the framework. The BLAS thread pools of NumPy are sized, when the
+    parent process loads it, so they are limited by `threadpoolctl`.
+
+    Parameters:
+    - threads (int): Number of threads per fit."""
+    for variable in THREADS:
+        os.environ[variable] = str(threads)
+
+    from threadpoolctl import threadpool_limits
+
+    LIMITS.append(threadpool_limits(limits=threads))
+
+
+def parameters(job: Dict) -> Dict:
+    """Selects the parameters of the job run, which index the stored history"""
+    return {name: job[name] for name in PARAMETERS if name in job}
+
+
+def results(store: HistoryStore, **selected) -> List[Dict]:
+    """Reads the stored runs as the job results for `plotResults()`
+
+    Parameters:
+    - store (HistoryStore): The fitting histories store.
+    - selected: The parameter values of the runs.
+
+    Returns: (List[Dict]) The results of the runs."""
+    runs = []
+    for history in store.load(**selected):
+        run = dict(DEFAULTS_RUN, **history.parameters)
+        runs.append(
+            dict(
+                run,
+                signature=signature(run),
+                status="ok",
+                history=history.history,
+                convergedEpoch=history.convergedEpoch,
+            )
+        )
+    return runs
+
+
+def signature(job: Dict) -> str:
+    """Formats the data signature of the job"""
+    return "F={0}, OBS={1}, NF={2}, NA={3}, FX={4}, SPL={5}".format(
+        job["features"],
+        job["observations"],
+        job["noiseFeatures"],
+        job["na"],
+        SIGNATURES.get(job["fixer"], job["fixer"]),
+        job["split"],
+    )
+
+
+class Sweep:
+    """Runs the fitting experiments over the parameters grid
+
+    The data sets are prepared in the main process through the cache, the fits
+    run in a process pool sized to the CPU cores. Each worker limits the
+    numeric threads, so the concurrent fits do not oversubscribe the cores."""
+
+    def __init__(
+        self,
+        grid: Dict[str, List] = None,
+        path: str = "data",
+        plots: str = "plots",
+        histories: str = "histories",
+        epochs: int = 300,
+        batchSize: int = 512,
+        patience: int = 0,
+        minDelta: float = 0.0,
+        backend: str = "keras",
+        threads: int = 1,
+        workers: int = 0,
+        seed: int = 1,
+        trace: str = "",
+    ):
+        """Parameters:
+
+        - grid (Dict[str, List]): The values of `features`, `observations`,
+          `noiseFeatures`, `na`, `fixer` (`zero`, `mean` or `knn`) and `split`.
+          The missing parameters get the default values.
+        - path (str): Path to the data sets cache.
+        - plots (str): Path to the plots directory, empty for no plots.
+        - histories (str): Path to the fitting histories store, empty for no
+          store, see `HistoryStore`.
+        - epochs (int): A number of fitting epochs.
+        - batchSize (int): A bath size for fitting.
+        - patience (int): The convergence mode patience, 0 for the fixed
+          number of epochs, see `Fitter.fit()`.
+        - minDelta (float): The minimum improvement of the convergence mode.
+        - backend (str): The training backend, `keras` or `numpy`.
+        - threads (int): Number of numeric threads per fit.
+        - workers (int): Number of the worker processes, 0 for the number of
+          CPU cores divided by the threads.
+        - seed (int): Random generator seed of the data sets.
+        - trace (str): Path to the trace file of the data preparation and the
+          fits, empty for no tracing, see `lab.trace`."""
+        self.grid = dict(DEFAULTS, **(grid or {}))
+        self.cache = Cache(path)
+        self.plots = plots
+        self.store = HistoryStore(histories) if histories != "" else None
+        self.epochs = epochs
+        self.batchSize = batchSize
+        self.patience = patience
+        self.minDelta = minDelta
+        self.backend = backend
+        self.threads = threads
+        self.workers = workers or max(1, (os.cpu_count() or 1) // threads)
+        self.seed = seed
+        self.trace = trace
+
+        self.logger = logger(__class__.__name__)
+
+    def jobs(self) -> List[Dict]:
+        """Lists the jobs of the grid
+
+        Returns: (List[Dict]) The parameters of each job."""
+        names = list(self.grid.keys())
+
+        return [
+            dict(
+                zip(names, values),
+                epochs=self.epochs,
+                batchSize=self.batchSize,
+                patience=self.patience,
+                minDelta=self.minDelta,
+                backend=self.backend,
+                seed=self.seed,
+                plots=self.plots,
+                trace=self.trace != "",
+            )
+            for values in itertools.product(*[self.grid[name] for name in names])
+        ]
+
+    def prepare(self, job: Dict) -> str:
+        """Builds the fixed data set of the job or gets it from the cache
+
+        Parameters:
+        - job (Dict): The job.
+
+        Returns: (str) URL to the data set."""
+        # the steps drawing from the same seed would share the random streams
+        data, noise, na, split = seeds(self.seed, 4)
+
+        recipe = (
+            Recipe(
+                DataRandom,
+                features=job["features"],
+                observations=job["observations"],
+                seed=data,
+            )
+            .makeTarget(TGAlpha())
+            .damage(DMGNoiseFeatures(seed=noise), job["noiseFeatures"])
+            .damage(DMGNA(seed=na), job["na"], overlay=True)
+            .split(testSize=job["split"], seed=split)
+        )
+
+        # the fixer learns on the training rows, the test rows do not leak
+        fixer = FIXERS[job["fixer"]]()
+
+        url = self.cache.url(
+            recipe.steps + [describeCall(Data.fix, (fixer,), {"train": True})]
+        )
+        if url != "":
+            return url  # the variant is not fixed again
+
+        damaged = Data().read(self.cache.build(recipe))
+
+        return self.cache.put(damaged.variant(fixer, train=True))
+
+    def run(self) -> List[Dict]:
+        """Runs the jobs
+
+        Returns: (List[Dict]) The job results in the grid order, each one has
+        the `status` (`ok` or `failed`), the `history` of the fitting metrics
+        and the `error` traceback."""
+        # the tracer already running, e.g. by `LAB_TRACE`, gets the events and
+        # is left running
+        started = self.trace != "" and trace.active() is None
+        tracer = trace.start(self.trace) if self.trace != "" else None
+
+        try:
+            jobs = self.jobs()
+
+            for job in jobs:
+                job["url"] = self.prepare(job)
+                job["signature"] = signature(job)
+
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=limitThreads,
+                initargs=(self.threads,),
+            ) as pool:
+                results = list(pool.map(run, [dict(job, plots="") for job in jobs]))
+
+            for job, result in zip(jobs, results):
+                result["plots"] = job["plots"]
+                self.logger.info("run(): %s %s", result["signature"], result["status"])
+
+                if tracer is not None:
+                    tracer.merge(result.pop("events", []))
+
+            if self.store is not None:
+                for result in results:
+                    if result["status"] == "ok":
+                        result["key"] = self.store.put(
+                            dict(result["history"]),
+                            parameters(result),
+                            convergedEpoch=result["convergedEpoch"],
+                        )
+
+            if self.plots != "":
+                self.plot(results)
+        finally:
+            if started:
+                trace.stop()
+
+        return results
+
+    def plot(self, results: List[Dict]) -> List[str]:
+        """Renders the plots of the fitted jobs, see `plotResults()`"""
+        return plotResults(results, path=self.plots, workers=self.workers)
+
+
+def plotResults(
+    results: List[Dict], path: str = "plots", workers: int = 0
+) -> List[str]:
+    """Renders the plots of the fitted jobs in a process pool
+
+    Each job gets the accuracy and the loss plots in its `images`. The
+    combined plots have a panel per NA rate with the curves of the fixers,
+    one plot per the other parameters.
+
+    Parameters:
+    - results (List[Dict]): The job results, or the stored runs, see
+      `results()`.
+    - path (str): Path to the plots directory.
+    - workers (int): Number of the rendering processes, 0 for the CPU count.
+
+    Returns: (List[str]) URLs of the combined plots."""
+    fitted = [r for r in results if r["status"] == "ok"]
+
+    jobs = [
+        {
+            "plot": plot,
+            "args": {"dataSignature": r["signature"], "path": path},
+            "data": r["history"],
+        }
+        for r in fitted
+        for plot in [FittingAccuracy, FittingLossFunction]
+    ]
+
+    groups = {}
+    for r in fitted:
+        group = tuple(
+            r[name] for name in ["features", "observations", "noiseFeatures", "split"]
+        )
+        groups.setdefault(group, {}).setdefault("NA={0}".format(r["na"]), {})[
+            SIGNATURES.get(r["fixer"], r["fixer"])
+        ] = r["history"]
+
+    for (features, observations, noiseFeatures, split), panels in groups.items():
+        for selector in ["val_accuracy", "val_loss"]:
+            jobs.append(
+                {
+                    "plot": FittingPanels,
+                    "args": {
+                        "title": "F={0}, OBS={1}, NF={2}, SPL={3}".format(
+                            features, observations, noiseFeatures, split
+                        ),
+                        "path": path,
+                    },
+                    "data": panels,
+                    "options": {"selector": selector},
+                }
+            )
+
+    urls = render(jobs, workers=workers)
+
+    for i, r in enumerate(fitted):
+        r["images"] = urls[2 * i : 2 * i + 2]
+
+    return urls[2 * len(fitted) :]
@@ -13,7 +13,7 @@ __status__ = "Production"
 
 import os, sys, functools, math
 
-from typing import List
+from typing import Callable, List
 
 import logging, logging.config
 
@@ -23,17 +23,27 @@ from enum import Enum
 
 import numpy as np
 
+from lab.log import logger
+
+
+def batch(targetGenerator: Callable, x: np.ndarray) -> np.ndarray:
+    """Generates target values for the whole features matrix
+
+    Parameters:
+    - targetGenerator (Callable): The `TargetGenerator` or a plain callable,
+      which calculates the target value of a row.
+    - x (ndarray): 2D array of the feature values, one row per observation.
+
+    Returns: (ndarray) 1D array of the target values."""
+    if hasattr(targetGenerator, "batch"):
+        return targetGenerator.batch(x)
+
+    return np.apply_along_axis(targetGenerator, axis=1, arr=x)
+
 
 class TargetGenerator(ABC):
     def __init__(self):
-        logging.basicConfig(
-            filename="app.log",
-            filemode="w",
-            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            level=logging.INFO,
-        )
-
-        self.logger = logging.getLogger(__class__.__name__)
+        self.logger = logger(__class__.__name__)
 
     @abstractmethod
     def __call__(self, x: List[float]) -> float:
@@ -42,6 +52,18 @@ class TargetGenerator(ABC):
         )
         return None
 
+    def batch(self, x: np.ndarray) -> np.ndarray:
+        """Generates target values for the whole features matrix
+
+        The default implementation applies `__call__()` to each row. Child
+        classes override it with a vectorized version.
+
+        Parameters:
+        - x (ndarray): 2D array of the feature values, one row per observation.
+
+        Returns: (ndarray) 1D array of the target values."""
+        return np.apply_along_axis(self, axis=1, arr=x)
+
     @abstractmethod
     def LaTeX(self) -> str:
         raise NotImplementedError(
@@ -53,7 +75,7 @@ class TargetGenerator(ABC):
 class TGAlpha(TargetGenerator):
     def __init__(self):
         super().__init__()
-        self.logger = logging.getLogger(__class__.__name__)
+        self.logger = logger(__class__.__name__)
         self.logger.info("instantiated")
 
     def __call__(self, x: List[float]) -> float:
@@ -78,5 +100,21 @@ class TGAlpha(TargetGenerator):
 
         return target
 
+    def batch(self, x: np.ndarray) -> np.ndarray:
+        """Generates target values for the whole features matrix
+
+        Parameters:
+        - x (ndarray): 2D array of the feature values, one row per observation.
+
+        Returns: (ndarray) 1D array of the target values.
+        """
+        assert x.shape[1] > 0, "no features"
+
+        tops = np.count_nonzero(np.sin(x) > 0.5, axis=1)  # tops in each row
+
+        avg = math.sin(0.5) * x.shape[1]
+
+        return (tops > avg) * 1.0  # step
+
     def LaTeX(self) -> str:
         return r"$t=((\sum_{i}{(\sin{f_i}>0.5)\times1.0})>\mu_f)\times1.0$"
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+"""The pipeline tracing"""
+
+__author__ = "Ruben R. Kazumov"
+__copyright__ = "Copyright 2019, Ruben R. Kazumov"
+__credits__ = ["Ruben R. Kazumov"]
+__license__ = "MIT"
+__version__ = [3, 0, 0]
+__maintainer__ = "Ruben R. Kazumov"
+__email__ = "kazumov@gmail.com"
+__status__ = "Production"
+
+import os, sys, json, time, atexit, functools, threading, contextlib
+
+from typing import Callable, Dict, List
+
+try:
+    import resource
+except ImportError:  # not a Unix
+    resource = None
+
+TRACE = "LAB_TRACE"  # the environment variable of the trace file path
+
+ARRAYS = ["x", "y", "xTrain", "yTrain", "xTest", "yTest", "na", "fill"]
+
+TRACERS = []  # the running tracer of the process
+
+
+def rss() -> int:
+    """Returns the peak resident set size of the process in bytes"""
+    if resource is None:
+        return 0
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def nbytes(data: object) -> int:
+    """Returns the size of the `Data` arrays in bytes"""
+    return sum(getattr(getattr(data, attr, None), "nbytes", 0) or 0 for attr in ARRAYS)
+
+
+class Tracer:
+    """Collects the timeline of the pipeline stages and the fitting epochs
+
+    The events are in the Chrome trace event format: the saved file is opened
+    as a timeline in `chrome://tracing` or Perfetto. A stage costs two clock
+    readings and one `getrusage()` call, so the tracer can stay on."""
+
+    def __init__(self, url: str = "trace.json"):
+        """Parameters:
+
+        - url (str): Path to the trace file."""
+        self.url = url
+        self.events = []
+        self.lock = threading.Lock()
+        self.origin = time.time_ns() // 1000 - time.perf_counter_ns() // 1000
+
+    def now(self) -> int:
+        """Returns the event time in microseconds since the epoch"""
+        return self.origin + time.perf_counter_ns() // 1000
+
+    def add(self, event: Dict) -> None:
+        """Adds the event of the current process and thread"""
+        event.setdefault("pid", os.getpid())
+        event.setdefault("tid", threading.get_ident())
+        with self.lock:
+            self.events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str = "data", **args):
+        """Records the wall time, the CPU time and the peak RSS change of the block
+
+        Parameters:
+        - name (str): The stage name.
+        - category (str): The stage category, e.g. `data` or `fit`.
+        - args: The stage values, added to the event. The block may add more
+          values to the yielded dictionary."""
+        args = dict(args)
+        started, cpu, peak = self.now(), time.process_time(), rss()
+        try:
+            yield args
+        finally:
+            args["cpu"] = time.process_time() - cpu
+            args["rssPeakDelta"] = rss() - peak
+            self.add(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": started,
+                    "dur": self.now() - started,
+                    "args": args,
+                }
+            )
+
+    def counter(self, name: str, **values) -> None:
+        """Records the values drawn as the counter track"""
+        self.add({"name": name, "ph": "C", "ts": self.now(), "args": values})
+
+    def merge(self, events: List[Dict]) -> None:
+        """Adds the events recorded by the other process"""
+        with self.lock:
+            self.events.extend(events)
+
+    def save(self, url: str = "") -> str:
+        """Writes the trace file
+
+        Parameters:
+        - url (str): Path to the trace file, the tracer file by default.
+
+        Returns: (str) URL to the trace file."""
+        url = url or self.url
+        with self.lock:
+            events = list(self.events)
+        with open(url, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return url
+
+
+def start(url: str = "trace.json") -> Tracer:
+    """Starts tracing the process, returns the running tracer if any
+
+    Parameters:
+    - url (str): Path to the trace file written by `stop()`.
+
+    Returns: (Tracer) The tracer."""
+    if not TRACERS:
+        TRACERS.append(Tracer(url))
+    return TRACERS[0]
+
+
+def stop(save: bool = True) -> Tracer:
+    """Stops tracing the process
+
+    Parameters:
+    - save (bool): Writes the trace file.
+
+    Returns: (Tracer) The stopped tracer, `None` if not tracing."""
+    if not TRACERS:
+        return None
+
+    tracer = TRACERS.pop()
+    if save and tracer.url != "":
+        tracer.save()
+    return tracer
+
+
+def active() -> Tracer:
+    """Returns the running tracer, `None` if not tracing"""
+    return TRACERS[0] if TRACERS else None
+
+
+def traced(category: str = "data") -> Callable:
+    """Decorates the `Data` method or the method with the `Data` argument to trace
+    its call
+
+    The event has the `x` shape and the size of the data set arrays before and
+    after the call. The method runs untouched, when not tracing."""
+
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not TRACERS:
+                return method(self, *args, **kwargs)
+
+            source = self
+            if not hasattr(self, "recipe") and len(args) > 0:
+                source = args[0]
+
+            with TRACERS[0].span(
+                method.__qualname__, category, bytesIn=nbytes(source)
+            ) as values:
+                result = method(self, *args, **kwargs)
+
+                data = result if hasattr(result, "recipe") else source
+                values["bytesOut"] = nbytes(data)
+                values["shape"] = list(getattr(getattr(data, "x", None), "shape", ()))
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+class EpochTrace:
+    """Records the epoch spans and the samples per second of the fitting
+
+    The callback has the Keras `Callback` epoch methods, see `epochTrace()`."""
+
+    def __init__(self, tracer: Tracer, samples: int):
+        """Parameters:
+
+        - tracer (Tracer): The tracer.
+        - samples (int): Number of the training rows in an epoch."""
+        super().__init__()
+        self.tracer = tracer
+        self.samples = samples
+        self.started = 0
+
+    def on_epoch_begin(self, epoch: int, logs: Dict = None) -> None:
+        self.started = self.tracer.now()
+
+    def on_epoch_end(self, epoch: int, logs: Dict = None) -> None:
+        duration = self.tracer.now() - self.started
+        samplesPerSecond = self.samples / duration * 1e6 if duration > 0 else 0.0
+
+        args = {name: float(value) for name, value in (logs or {}).items()}
+        args.update(epoch=epoch, samplesPerSecond=samplesPerSecond)
+
+        self.tracer.add(
+            {
+                "name": "epoch",
+                "cat": "fit",
+                "ph": "X",
+                "ts": self.started,
+                "dur": duration,
+                "args": args,
+            }
+        )
+        self.tracer.counter("samplesPerSecond", samplesPerSecond=samplesPerSecond)
+
+
+def epochTrace(tracer: Tracer, samples: int, keras: bool = True) -> EpochTrace:
+    """Creates the epoch callback
+
+    Parameters:
+    - tracer (Tracer): The tracer.
+    - samples (int): Number of the training rows in an epoch.
+    - keras (bool): Makes the Keras `Callback`, False for the NumPy backend.
+
+    Returns: (EpochTrace) The callback."""
+    if not keras:
+        return EpochTrace(tracer, samples)
+
+    from keras.callbacks import Callback
+
+    return type("KerasEpochTrace", (EpochTrace, Callback), {})(tracer, samples)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=TRACERS.clear)  # the parent collects
+
+if os.environ.get(TRACE, "") != "":
+    start(os.environ[TRACE])
+    atexit.register(stop)
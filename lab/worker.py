@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+"""The fitting worker"""
+
+__author__ = "Ruben R. Kazumov"
+__copyright__ = "Copyright 2019, Ruben R. Kazumov"
+__credits__ = ["Ruben R. Kazumov"]
+__license__ = "MIT"
+__version__ = [3, 0, 0]
+__maintainer__ = "Ruben R. Kazumov"
+__email__ = "kazumov@gmail.com"
+__status__ = "Production"
+
+import os, stat, socket, tempfile, traceback, importlib
+
+from typing import Dict
+
+import logging, logging.config
+
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from lab import trace
+from lab.log import logger
+
+
+def runtime() -> str:
+    """Returns the per-user directory of the worker socket
+
+    The directory is `$XDG_RUNTIME_DIR/lab` or `lab-<uid>` in the temporary
+    directory, see `secure()`."""
+    base = os.environ.get("XDG_RUNTIME_DIR", "")
+    if base == "":
+        return os.path.join(tempfile.gettempdir(), "lab-{0}".format(os.getuid()))
+    return os.path.join(base, "lab")
+
+
+ADDRESS = os.path.join(runtime(), "fitter.sock")
+
+KEY = "authkey"  # the file of the connection key, next to the socket
+
+STOP = "stop"  # the message stopping the worker
+
+FRAMEWORK = ["keras", "matplotlib.figure", "seaborn"]  # the slow imports
+
+
+def run(job: Dict) -> Dict:
+    """Fits the model to the job data set and plots the fitting history
+
+    The errors are returned in the result.
+
+    Parameters:
+    - job (Dict): The job with `url` (the data set URL), `signature`, `epochs`,
+      `batchSize`, `plots` (path to the plots directory, empty for no plots)
+      and optional `backend` (see `Fitter`), `patience` and `minDelta` (the
+      convergence mode, see `Fitter.fit()`), `cwd` (the directory of the
+      relative paths) and `trace` (records the job trace events).
+
+    Returns: (Dict) The job with `status` (`ok` or `failed`), `history` (the
+    fitting metrics), `convergedEpoch`, `images` (the plot URLs), `error`
+    (the traceback) and `events` (the trace events of the traced job)."""
+    result = dict(
+        job, status="failed", history={}, convergedEpoch=0, images=[], error=""
+    )
+
+    tracing = job.get("trace", False) and trace.active() is None
+    if tracing:
+        trace.start("")
+
+    try:
+        os.chdir(job.get("cwd", os.getcwd()))
+
+        from lab.data import Data
+        from lab.fitter import Fitter
+        from lab.plot import FittingAccuracy, FittingLossFunction
+
+        data = Data().read(job["url"])
+
+        history = Fitter(backend=job.get("backend", "keras")).fit(
+            data,
+            batchSize=job["batchSize"],
+            epochs=job["epochs"],
+            patience=job.get("patience", 0),
+            minDelta=job.get("minDelta", 0.0),
+        )
+
+        if job["plots"] != "":
+            for plot in [FittingAccuracy, FittingLossFunction]:
+                result["images"].append(
+                    plot(dataSignature=job["signature"], path=job["plots"]).plot(
+                        history
+                    )
+                )
+
+        for metric, values in history.history.items():
+            result["history"][metric] = [float(v) for v in values]
+
+        result["convergedEpoch"] = history.convergedEpoch
+
+        result["status"] = "ok"
+
+    except Exception:
+        result["error"] = traceback.format_exc()
+
+    if tracing:
+        result["events"] = trace.stop(save=False).events
+
+    return result
+
+
+def secure(directory: str, create: bool = False) -> str:
+    """Checks the socket directory is private to the user
+
+    Parameters:
+    - directory (str): Path to the directory.
+    - create (bool): Creates the missing directory with the 0700 mode.
+
+    Returns: (str) The directory.
+
+    Raises: (PermissionError) The directory belongs to other user or is open
+    to other users."""
+    if create:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) & 0o077 != 0:
+        raise PermissionError(
+            "The worker directory `{0}` must be private to the user (0700).".format(
+                directory
+            )
+        )
+
+    return directory
+
+
+def authkey(address: str, create: bool = False) -> bytes:
+    """Reads the connection key of the worker
+
+    The key is stored in the socket directory, only the user's processes can
+    connect to the worker and can answer the client.
+
+    Parameters:
+    - address (str): Path to the worker Unix socket.
+    - create (bool): Creates the new random key.
+
+    Returns: (bytes) The key.
+
+    Raises: (OSError) The key is missing, the worker is not running."""
+    url = os.path.join(secure(os.path.dirname(address), create), KEY)
+
+    if create:
+        fd = os.open(url, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(os.urandom(32))
+
+    with open(url, "rb") as f:
+        return f.read()
+
+
+def serve(address: str = ADDRESS) -> None:
+    """Runs the jobs received over the Unix socket until the stop message
+
+    The fitting framework and the plotting libraries are imported once. The
+    socket is created in the private directory, the clients must have the
+    connection key, see `authkey()`.
+
+    Parameters:
+    - address (str): Path to the Unix socket."""
+    log = logger("Worker")
+
+    try:
+        for module in FRAMEWORK:
+            importlib.import_module(module)  # keeps the framework loaded
+    except ImportError:
+        log.exception("serve(): the fitting framework is not available")
+
+    secure(os.path.dirname(address), create=True)
+
+    if os.path.exists(address):
+        probe = socket.socket(socket.AF_UNIX)
+        try:
+            probe.connect(address)
+        except OSError:
+            os.remove(address)  # the socket of the stopped worker
+        else:
+            raise Exception("The worker is running on `{0}`.".format(address))
+        finally:
+            probe.close()
+
+    key = authkey(address, create=True)
+
+    with Listener(address, family="AF_UNIX", authkey=key) as listener:
+        log.info("serve(): listening on `%s`", address)
+
+        while True:
+            try:
+                connection = listener.accept()
+            except (AuthenticationError, AssertionError, EOFError):
+                log.warning("serve(): rejected the client without the key")
+                continue
+
+            with connection:
+                try:
+                    job = connection.recv()
+
+                    if job == STOP:
+                        connection.send(STOP)
+                        break
+
+                    log.info("serve(): got job `%s`", job.get("url"))
+                    connection.send(run(job))
+                except Exception:  # e.g. the client is gone, the job is not a dict
+                    log.exception("serve(): the connection failed")
+
+    return None
+
+
+def submit(job: Dict, address: str = ADDRESS) -> Dict:
+    """Runs the job in the worker
+
+    Parameters:
+    - job (Dict): The job, see `run()`.
+    - address (str): Path to the worker Unix socket.
+
+    Returns: (Dict) The job result.
+
+    Raises: (OSError) The worker is not running or its directory is not
+    private, (AuthenticationError) the socket does not belong to the worker."""
+    key = authkey(address)
+
+    try:
+        connection = Client(address, family="AF_UNIX", authkey=key)
+    except AssertionError as e:  # the wrong handshake message
+        raise AuthenticationError(str(e))
+
+    with connection:
+        connection.send(job)
+        return connection.recv()
+
+
+def stop(address: str = ADDRESS) -> None:
+    """Stops the worker
+
+    Parameters:
+    - address (str): Path to the worker Unix socket."""
+    submit(STOP, address)
+    return None
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import os, sys, json
+from typing import Dict
+import argparse
+
+from lab.store import HistoryStore
+from lab.sweep import plotResults, results
+
+
+def parameters() -> Dict:
+    parser = argparse.ArgumentParser(
+        description="Plots the stored fitting histories without the refitting.",
+        prefix_chars="--",
+    )
+
+    parser.add_argument(
+        "--histories",
+        dest="histories",
+        default="histories",
+        help="sets a fitting histories store path",
+    )
+
+    parser.add_argument(
+        "--plots", dest="plots", default="plots", help="sets a plots directory path"
+    )
+
+    parser.add_argument(
+        "--where",
+        dest="where",
+        action="append",
+        default=[],
+        help="selects the runs by a parameter value, e.g. --where na=0.01",
+    )
+
+    parser.add_argument(
+        "--workers",
+        dest="workers",
+        type=int,
+        default=0,
+        help="sets a number of the rendering processes",
+    )
+
+    args = parser.parse_args()
+
+    return args
+
+
+def main():
+    params = parameters()
+
+    selected = {}
+    for condition in params.where:
+        name, value = condition.split("=", 1)
+        try:
+            selected[name] = json.loads(value)
+        except ValueError:
+            selected[name] = value  # a string value, e.g. fixer=zero
+
+    runs = results(HistoryStore(params.histories), **selected)
+
+    for url in plotResults(runs, path=params.plots, workers=params.workers):
+        print(url)
+
+    print("plotted", len(runs), "runs")
+
+
+if __name__ == "__main__":
+    main()
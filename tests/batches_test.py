@@ -0,0 +1,89 @@
+import unittest
+
+import os, tempfile
+
+import numpy as np
+
+from numpy.lib.format import open_memmap
+
+from lab.batches import BatchSource
+
+from lab.damager import DMGNA
+
+from lab.data import Data
+
+
+class BatchSourceClassTests(unittest.TestCase):
+    def setUp(self):
+        self.x = np.arange(1000 * 3, dtype=float).reshape((1000, 3))
+        self.y = np.arange(1000, dtype=float)
+
+    def test_steps(self):
+        source = BatchSource(self.x, self.y, batchSize=64, blockSize=300)
+        self.assertEqual(source.steps, len(list(source)), "wrong number of batches")
+
+    def test_epoch_covers_all_rows_once(self):
+        source = BatchSource(self.x, self.y, batchSize=64, blockSize=300, seed=1)
+        x, y = map(np.concatenate, zip(*source))
+        self.assertListEqual(sorted(y.tolist()), self.y.tolist(), "rows are lost")
+        self.assertTrue(np.array_equal(x[:, 0], y * 3), "rows are mixed up")
+        self.assertFalse(np.array_equal(y, self.y), "rows are not shuffled")
+
+    def test_block_level_shuffling(self):
+        source = BatchSource(self.x, self.y, batchSize=100, blockSize=100, seed=1)
+        for _, y in source:
+            self.assertEqual(len(set(y // 100)), 1, "batch mixes the blocks")
+
+    def test_reproducible_shuffling(self):
+        first = BatchSource(self.x, self.y, batchSize=64, blockSize=300, seed=2)
+        second = BatchSource(self.x, self.y, batchSize=64, blockSize=300, seed=2)
+        for (_, a), (_, b) in zip(first, second):
+            self.assertTrue(np.array_equal(a, b), "shuffling is not reproducible")
+
+    def test_subset_rows_source(self):
+        data = Data().setX(self.x).damage(DMGNA(seed=1), 0.1, overlay=True)
+        data.y = self.y.reshape((-1, 1))
+        data.split(testSize=0.3, seed=2)
+        source = BatchSource(data.xTrain, data.yTrain, batchSize=64, shuffle=False)
+        x = np.concatenate([x for x, _ in source])
+        expected = data.rows(0, 1000)[data.rowsTrain].astype(np.float32)
+        self.assertTrue(np.array_equal(x, expected, equal_nan=True), "wrong rows")
+
+    def test_ordered_source(self):
+        source = BatchSource(self.x, self.y, batchSize=64, shuffle=False)
+        y = np.concatenate([y for _, y in source])
+        self.assertTrue(np.array_equal(y, self.y), "rows are shuffled")
+
+    def test_endless_generator(self):
+        source = BatchSource(self.x, self.y, batchSize=400, shuffle=False)
+        batches = source.generator()
+        sizes = [len(next(batches)[1]) for _ in range(2 * source.steps)]
+        self.assertListEqual(sizes, [400, 400, 200] * 2, "wrong epochs")
+
+    def test_memory_mapped_source(self):
+        with tempfile.TemporaryDirectory() as path:
+            x = open_memmap(os.path.join(path, "x.npy"), "w+", float, self.x.shape)
+            x[:] = self.x
+            x.flush()
+            x = np.load(os.path.join(path, "x.npy"), mmap_mode="r")
+
+            source = BatchSource(x, self.y, batchSize=64, blockSize=128, seed=3)
+            batches = list(source)
+            del x, source
+
+        self.assertEqual(sum(len(b[0]) for b in batches), 1000, "rows are lost")
+        self.assertIsInstance(batches[0][0], np.ndarray, "batch is not in memory")
+
+    def test_reading_errors(self):
+        source = BatchSource(self.x, self.y)
+        source.x = None
+        with self.assertRaises(Exception):
+            list(source)
+
+    def test_different_lengths(self):
+        with self.assertRaises(Exception):
+            BatchSource(self.x, self.y[:-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+
+import os, sys, tempfile
+
+from unittest import mock
+
+import numpy as np
+
+from lab.cache import Cache, Recipe, describe, key
+
+from lab.data import Data, DataRandom
+
+from lab.target import TGAlpha
+
+from lab.damager import DMGNA, DMGNoiseFeatures
+
+
+class CacheClassTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache = Cache(self.dir.name)
+        self.recipe = (
+            Recipe(DataRandom, features=5, observations=200, seed=1)
+            .makeTarget(TGAlpha())
+            .damage(DMGNoiseFeatures(seed=2), 3)
+            .split(testSize=0.25, seed=3)
+        )
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_recipe_equals_recorded_steps(self):
+        data = self.recipe.build()
+        self.assertEqual(
+            self.recipe.steps, data.recipe, "recipe differs from the recorded steps"
+        )
+
+    def test_recorded_steps_ignore_block_parameters(self):
+        d1 = DataRandom(features=5, observations=200, seed=1).makeTarget(TGAlpha())
+        d2 = DataRandom(5, 200, 1).makeTarget(TGAlpha(), blockSize=16, workers=2)
+        self.assertEqual(key(d1.recipe), key(d2.recipe), "keys differ")
+
+    def test_build_returns_stored_data_set(self):
+        url = self.cache.build(self.recipe)
+        self.assertEqual(self.cache.build(self.recipe), url, "data set rebuilt")
+        self.assertEqual(
+            self.cache.put(self.recipe.build()), url, "data set stored twice"
+        )
+        self.assertEqual(len(os.listdir(self.dir.name)), 1, "wrong cache content")
+
+    def test_not_reproducible_data_set_is_not_cached(self):
+        recipe = Recipe(DataRandom, features=5, observations=200).makeTarget(TGAlpha())
+        self.assertEqual(key(recipe.steps), "", "not reproducible recipe has a key")
+        self.assertNotEqual(
+            self.cache.build(recipe), self.cache.build(recipe), "data set cached"
+        )
+
+    def test_unseeded_damager_is_not_reproducible(self):
+        data = DataRandom(features=5, observations=200, seed=1).damage(DMGNA(), 0.1)
+        self.assertEqual(key(data.recipe), "", "not reproducible data has a key")
+
+    def test_read_data_set_keeps_recipe(self):
+        url = self.cache.build(self.recipe)
+        data = Data().read(url)
+        self.assertEqual(data.recipe, self.recipe.steps, "recipe is lost")
+
+    def test_least_recently_used_data_set_evicted(self):
+        first = self.cache.build(self.recipe)
+        self.cache.sizeLimit = 1
+        second = self.cache.build(
+            Recipe(DataRandom, features=5, observations=200, seed=4)
+        )
+        self.assertFalse(os.path.exists(first), "old data set is not evicted")
+        self.assertTrue(os.path.exists(second), "new data set is evicted")
+
+    def test_not_reproducible_data_sets_are_evicted(self):
+        recipe = Recipe(DataRandom, features=5, observations=200)
+        self.cache.sizeLimit = 1
+        urls = [self.cache.build(recipe) for _ in range(3)]
+        self.assertEqual(
+            os.listdir(os.path.dirname(urls[-1])), [os.path.basename(urls[-1])]
+        )
+
+    def test_saved_data_sets_are_not_evicted(self):
+        url = DataRandom(features=5, observations=200).save(self.dir.name)
+        self.cache.sizeLimit = 1
+        self.cache.build(Recipe(DataRandom, features=5, observations=200))
+        self.cache.build(self.recipe)
+        self.assertTrue(os.path.exists(url), "saved data set is evicted")
+
+    def test_interrupted_save_is_not_cached(self):
+        data = self.recipe.build()
+
+        def interrupted(url):
+            os.makedirs(url)
+            raise KeyboardInterrupt()
+
+        with mock.patch.object(data, "saveArrays", interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                self.cache.put(data)
+        self.assertEqual(self.cache.url(self.recipe), "", "partial data set found")
+        self.assertEqual(os.listdir(self.dir.name), [], "partial data set is kept")
+        self.assertEqual(self.cache.put(data), self.cache.url(self.recipe))
+
+    def test_list_is_described_like_array(self):
+        rows = np.random.rand(300, 10)
+        data = Data().setX(rows.tolist())
+        self.assertEqual(data.recipe[-1]["x"], describe(rows), "list is copied")
+        self.assertEqual(describe([DMGNA(seed=1)]), [describe(DMGNA(seed=1))])
+
+
+if __name__ == "__main__":
+    unittest.main()
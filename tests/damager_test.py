@@ -56,7 +56,43 @@ class DamagersClassTests(unittest.TestCase):
             "damager created wrong number of features",
         )
 
-    @unittest.skip  # not implemented
+    def test_DMGNA_damages_exact_number_of_cells(self):
+        x = np.zeros((1000, 7))
+        DMGNA(seed=1, blockSize=64)(x, 0.013)
+        self.assertEqual(np.isnan(x).sum(), 91, "wrong number of NA cells")
+
+    def test_DMGNA_damage_is_reproducible_in_parallel(self):
+        x1 = np.zeros((1000, 7))
+        x2 = np.zeros((1000, 7))
+        DMGNA(seed=2, blockSize=64)(x1, 0.1)
+        DMGNA(seed=2, blockSize=64, workers=4)(x2, 0.1)
+        self.assertTrue(
+            np.array_equal(np.isnan(x1), np.isnan(x2)), "damage is not reproducible"
+        )
+
+    def test_DMGNA_mask_equals_damage(self):
+        x = np.zeros((1000, 7))
+        dmg = DMGNA(seed=3, blockSize=64)
+        mask = dmg.mask(x.shape, 0.1)
+        dmg(x, 0.1)
+        self.assertListEqual(
+            list(mask), list(np.flatnonzero(np.isnan(x))), "mask differs from damage"
+        )
+
+    def test_DMGNA_samples_single_block(self):
+        dmg = DMGNA(seed=4, blockSize=64)
+        cells = dmg.sample((1000, 7), 500)
+        self.assertListEqual(
+            list(dmg.sample((1000, 7), 500, block=5)[0]),
+            list(cells[5]),
+            "the block differs from the block of the whole sample",
+        )
+
+    def test_DMGNA_scales_with_number_of_cells(self):
+        mask = DMGNA(seed=5).mask((10 ** 8, 100), 10 ** -6)
+        self.assertEqual(len(mask), 10000, "wrong number of NA cells")
+        self.assertEqual(len(np.unique(mask)), 10000, "repeated NA cells")
+
     def test_data_damaged_by_DMGNoiseValues_damager(self):
         d = deepcopy(self.data)
         dmg = DMGNoiseValues()
@@ -67,6 +103,62 @@ class DamagersClassTests(unittest.TestCase):
             "damager did not change the data",
         )
 
+    def test_DMGNoiseValues_keeps_feature_ranges(self):
+        x = np.random.rand(1000, 4) * [1.0, 10.0, 100.0, 1000.0]
+        d = x.copy()
+        DMGNoiseValues(seed=1, blockSize=64, workers=2)(d, 0.2)
+        self.assertEqual((d != x).sum(), 800, "wrong number of noise cells")
+        self.assertTrue(
+            np.all(d.min(axis=0) >= x.min(axis=0))
+            and np.all(d.max(axis=0) <= x.max(axis=0)),
+            "noise is out of the feature range",
+        )
+
+    def test_DMGNoiseValues_normal_noise_is_reproducible(self):
+        x = np.random.rand(500, 3)
+        d1, d2 = x.copy(), x.copy()
+        DMGNoiseValues(seed=2, distribution="normal", blockSize=64)(d1, 0.1)
+        DMGNoiseValues(seed=2, distribution="normal", workers=3, blockSize=64)(d2, 0.1)
+        self.assertTrue(np.array_equal(d1, d2), "noise is not reproducible")
+
+    def test_DMGNA_masks_are_nested(self):
+        rates = [0.001, 0.01, 0.05, 0.1]
+        masks = DMGNA(seed=6, blockSize=64).masks((1000, 7), rates)
+        self.assertListEqual(
+            [len(m) for m in masks], [7, 70, 350, 700], "wrong mask sizes"
+        )
+        for small, large in zip(masks, masks[1:]):
+            self.assertTrue(np.all(np.isin(small, large)), "masks are not nested")
+
+    def test_DMGNA_largest_mask_equals_single_mask(self):
+        dmg = DMGNA(seed=7, blockSize=64)
+        self.assertListEqual(
+            list(dmg.masks((1000, 7), [0.01, 0.1])[1]),
+            list(dmg.mask((1000, 7), 0.1)),
+            "the largest mask differs from the single rate mask",
+        )
+
+    def test_DMGNA_per_column_masks(self):
+        masks = DMGNA(seed=8).masks((1000, 3), [[0.0, 0.1, 0.2], [0.1, 0.2, 0.4]])
+        for mask, expected in zip(masks, [[0, 100, 200], [100, 200, 400]]):
+            self.assertListEqual(
+                list(np.bincount(mask % 3, minlength=3)),
+                expected,
+                "wrong number of NA cells in columns",
+            )
+        self.assertTrue(np.all(np.isin(masks[0], masks[1])), "masks are not nested")
+
+    def test_DMGNA_row_and_block_masks(self):
+        dmg = DMGNA(seed=9)
+        rowMask = dmg.masks((1000, 5), [0.1], pattern="row")[0]
+        self.assertEqual(len(np.unique(rowMask // 5)), 100, "wrong number of rows")
+        self.assertEqual(len(rowMask), 500, "rows are not damaged entirely")
+
+        blockMask = dmg.masks((1000, 5), [0.1], pattern="block", blockLength=10)[0]
+        self.assertEqual(len(blockMask), 500, "wrong number of NA cells")
+        runs = np.unique((blockMask // 5) // 10 * 5 + blockMask % 5)
+        self.assertEqual(len(runs), 50, "cells are not damaged in blocks")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,6 +1,8 @@
 import unittest
 
-import os, sys
+import os, sys, tempfile
+
+import numpy as np
 
 from numpy import ndarray
 
@@ -12,8 +14,11 @@ from lab.target import TGAlpha
 class DataClassTests(unittest.TestCase):
     def setUp(self):
         self.data = Data()
-        self.dataStoragePath = "data"
-        # return super().setUp()
+        self.dir = tempfile.TemporaryDirectory()
+        self.dataStoragePath = self.dir.name
+
+    def tearDown(self):
+        self.dir.cleanup()
 
     def test_instantiation(self):
         self.assertIsInstance(self.data, Data, "it has wrong type")
@@ -57,6 +62,31 @@ class DataClassTests(unittest.TestCase):
             "the data is damaged during store/read operation",
         )
 
+    def test_storeInColumnarFormat(self):
+        self.data.setX([[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]]).makeTarget(TGAlpha())
+        url = self.data.save(self.dataStoragePath, format="npy")
+        self.assertTrue(os.path.isdir(url), "the data set is not a directory")
+        self.assertTrue(
+            os.path.exists(os.path.join(url, "manifest.json")), "manifest missing"
+        )
+        self.assertTrue(os.path.exists(os.path.join(url, "y.npy")), "y missing")
+
+    def test_readFromColumnarFormat(self):
+        x = np.random.rand(20, 4)
+        self.data.setX(x).makeTarget(TGAlpha()).split(testSize=0.25)
+        url = self.data.save(self.dataStoragePath, format="npy")
+
+        d = Data().read(url)
+        self.assertIsInstance(d.xTest, np.memmap, "the array is not mapped")
+        for attr in ["x", "y", "xTrain", "xTest", "yTrain", "yTest"]:
+            self.assertTrue(
+                np.array_equal(getattr(d, attr), getattr(self.data, attr)),
+                "the `{0}` is damaged during store/read operation".format(attr),
+            )
+
+        d.x[0, 0] = -1.0  # copy-on-write
+        self.assertEqual(Data().read(url).x[0, 0], x[0, 0], "the file is changed")
+
     def test_makeTarget(self):
         self.data.setX([[1, 2, 3], [2, 2, 4], [3, 4, 2]])
         tg = TGAlpha()
@@ -73,6 +103,31 @@ class DataClassTests(unittest.TestCase):
             "target class not in set {0., 1.}",
         )
 
+    def test_makeTargetByPlainCallable(self):
+        x = np.random.rand(50, 4) * 3.0
+        expected = Data().setX(x).makeTarget(TGAlpha()).y
+        self.data.setX(x).makeTarget(TGAlpha().__call__, blockSize=16)
+        self.assertTrue(np.array_equal(self.data.y, expected), "targets differ")
+
+    def test_makeTargetInBlocks(self):
+        x = np.random.rand(1000, 7) * 3.0
+        expected = Data().setX(x).makeTarget(TGAlpha()).y
+        self.data.setX(x).makeTarget(TGAlpha(), blockSize=64, workers=4)
+        self.assertListEqual(
+            list(self.data.y.flatten()),
+            list(expected.flatten()),
+            "block targets differ from the whole data set targets",
+        )
+
+    def test_makeTargetIntoMemoryMappedFile(self):
+        x = np.random.rand(100, 5) * 3.0
+        with tempfile.TemporaryDirectory() as path:
+            url = os.path.join(path, "y.npy")
+            self.data.setX(x).makeTarget(TGAlpha(), blockSize=30, url=url)
+            self.assertIsInstance(self.data.y, np.memmap, "target is not mapped")
+            self.assertEqual(self.data.y.shape, (100, 1), "wrong target shape")
+            del self.data.y
+
 
 class RandomDataClassTests(unittest.TestCase):
     def setUp(self):
@@ -82,6 +137,107 @@ class RandomDataClassTests(unittest.TestCase):
         self.assertEqual(self.data.x.shape[0], 10000, "wrong observations number")
         self.assertEqual(self.data.x.shape[1], 10, "wrong features number")
 
+    def test_sameDataForAnyNumberOfWorkers(self):
+        x = DataRandom(4, 1000, seed=1, blockSize=64).x
+        for workers in [2, 0]:
+            other = DataRandom(4, 1000, seed=1, blockSize=64, workers=workers)
+            self.assertTrue(
+                np.array_equal(other.x, x),
+                "data depends on the number of workers",
+            )
+
+    def test_float32Data(self):
+        x = DataRandom(4, 1000, seed=1, dtype=np.float32, blockSize=64, workers=2).x
+        self.assertEqual(x.dtype, np.float32, "wrong data type")
+        self.assertTrue(np.all((x >= 0.0) & (x < 1.0)), "values out of [0, 1)")
+
+    def test_generateIntoMemoryMappedFile(self):
+        with tempfile.TemporaryDirectory() as path:
+            url = os.path.join(path, "x.npy")
+            data = DataRandom(4, 1000, seed=1, blockSize=64, workers=2, url=url)
+            self.assertIsInstance(data.x, np.memmap, "data is not mapped")
+            self.assertTrue(
+                np.array_equal(data.x, DataRandom(4, 1000, 1, blockSize=64).x),
+                "mapped data differs",
+            )
+            del data.x
+
+
+class SplitTests(unittest.TestCase):
+    def setUp(self):
+        self.data = DataRandom(features=4, observations=1001, seed=1).makeTarget(
+            TGAlpha()
+        )
+        self.rows = {
+            tuple(r): y for r, y in zip(self.data.x.tolist(), self.data.y[:, 0])
+        }
+
+    def assertAligned(self, x, y):
+        self.assertTrue(
+            all(self.rows[tuple(r)] == v for r, v in zip(x.tolist(), y[:, 0])),
+            "features and targets are mixed up",
+        )
+
+    def test_split_views(self):
+        self.data.split(testSize=0.3, seed=1, views=True)
+        self.assertEqual(self.data.xTest.shape, (301, 4), "wrong test size")
+        self.assertEqual(self.data.xTrain.shape, (700, 4), "wrong training size")
+        for attr in ["xTrain", "xTest", "yTrain", "yTest"]:
+            base = self.data.y if attr.startswith("y") else self.data.x
+            self.assertTrue(
+                np.shares_memory(getattr(self.data, attr), base), "subset is a copy"
+            )
+        self.assertAligned(self.data.xTrain, self.data.yTrain)
+        self.assertAligned(self.data.xTest, self.data.yTest)
+
+    def test_split_views_are_reproducible(self):
+        other = DataRandom(features=4, observations=1001, seed=1).makeTarget(TGAlpha())
+        self.data.split(seed=2, views=True)
+        other.split(seed=2, views=True)
+        self.assertTrue(np.array_equal(self.data.xTest, other.xTest), "wrong split")
+
+    def test_stratified_split(self):
+        self.data.split(testSize=0.3, seed=1, stratify=True)
+        self.assertEqual(len(self.data.yTest), 301, "wrong test size")
+        share = self.data.y.mean()
+        self.assertAlmostEqual(self.data.yTest.mean(), share, delta=1 / 301)
+        self.assertAlmostEqual(self.data.yTrain.mean(), share, delta=1 / 700)
+        self.assertAligned(self.data.xTest, self.data.yTest)
+
+    def test_split_views_storage(self):
+        self.data.split(seed=1, views=True)
+        with tempfile.TemporaryDirectory() as path:
+            url = self.data.save(path, format="npy", name="split")
+            self.assertFalse(os.path.exists(os.path.join(url, "xTrain.npy")))
+
+            d = Data().read(url)
+            self.assertEqual(d.boundary, 700, "wrong boundary")
+            self.assertTrue(np.array_equal(d.xTest, self.data.xTest), "wrong subset")
+            del d
+
+            d = Data().read(self.data.save(path))
+            self.assertTrue(np.shares_memory(d.xTrain, d.x), "subset is a copy")
+
+    def test_folds(self):
+        tested = []
+        for fold in self.data.folds(k=4, repeats=2, seed=1, stratify=True):
+            self.assertTrue(np.shares_memory(fold.xTrain, fold.x), "subset is a copy")
+            self.assertEqual(len(fold.xTrain) + len(fold.xTest), 1001)
+            self.assertAligned(fold.xTrain, fold.yTrain)
+            self.assertAligned(fold.xTest, fold.yTest)
+            tested.extend(tuple(r) for r in fold.xTest.tolist())
+
+        self.assertEqual(len(tested), 2 * 1001, "wrong number of test rows")
+        self.assertEqual(len(set(tested)), 1001, "row is not tested")
+
+    def test_folds_keep_split_views(self):
+        self.data.split(testSize=0.3, seed=1, views=True)
+        xTest, yTest = np.array(self.data.xTest), np.array(self.data.yTest)
+        for fold in self.data.folds(k=3, seed=1):
+            self.assertFalse(np.shares_memory(fold.x, self.data.x), "x is shared")
+        self.assertTrue(np.array_equal(self.data.xTest, xTest), "subset is changed")
+        self.assertTrue(np.array_equal(self.data.yTest, yTest), "subset is changed")
+
 
 if __name__ == "__main__":
     unittest.main()
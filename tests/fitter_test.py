@@ -0,0 +1,103 @@
+import unittest
+
+import numpy as np
+
+from lab.data import DataRandom
+
+from lab.target import TGAlpha
+
+from lab.fitter import Fitter, convergedEpoch, replicaHistory
+
+
+class FitterClassTests(unittest.TestCase):
+    def test_instantiation(self):
+        self.assertIsInstance(Fitter(), Fitter, "it has wrong type")
+
+    def test_converged_epoch_of_accuracy(self):
+        values = [0.5, 0.7, 0.8, 0.81, 0.805, 0.8]
+        self.assertEqual(convergedEpoch(values, "val_accuracy"), 4, "wrong epoch")
+        self.assertEqual(
+            convergedEpoch(values, "val_accuracy", minDelta=0.02), 3, "wrong epoch"
+        )
+
+    def test_converged_epoch_of_loss(self):
+        values = [0.7, 0.5, 0.4, 0.45, 0.41]
+        self.assertEqual(convergedEpoch(values, "val_loss"), 3, "wrong epoch")
+
+    def test_converged_epoch_without_values(self):
+        self.assertEqual(convergedEpoch([], "val_accuracy"), 0, "wrong epoch")
+
+    def test_replica_history(self):
+        history = {
+            "loss": [1.0],
+            "replica0_loss": [0.4],
+            "replica1_loss": [0.6],
+            "replica0_accuracy": [0.8],
+            "replica1_accuracy": [0.7],
+            "val_loss": [1.2],
+            "val_replica0_loss": [0.5],
+            "val_replica1_loss": [0.7],
+            "val_replica0_accuracy": [0.75],
+            "val_replica1_accuracy": [0.65],
+        }
+        self.assertDictEqual(
+            replicaHistory(history, 1),
+            {
+                "loss": [0.6],
+                "accuracy": [0.7],
+                "val_loss": [0.7],
+                "val_accuracy": [0.65],
+            },
+            "wrong replica metrics",
+        )
+
+    def test_numpy_backend_fit(self):
+        data = (
+            DataRandom(features=8, observations=2000, seed=1)
+            .makeTarget(TGAlpha())
+            .split(testSize=0.3, seed=1)
+        )
+        history = Fitter(backend="numpy", seed=1).fit(data, batchSize=64, epochs=5)
+        self.assertListEqual(
+            sorted(history.history.keys()),
+            ["accuracy", "loss", "val_accuracy", "val_loss"],
+            "wrong metrics",
+        )
+        self.assertEqual(len(history.epoch), 5, "wrong number of epochs")
+        self.assertLess(
+            history.history["loss"][-1], history.history["loss"][0], "no training"
+        )
+
+    def test_numpy_backend_convergence_mode(self):
+        data = (
+            DataRandom(features=8, observations=500, seed=2)
+            .makeTarget(TGAlpha())
+            .split(testSize=0.3, seed=2)
+        )
+        history = Fitter(backend="numpy", seed=2).fit(
+            data, batchSize=64, epochs=200, patience=3, minDelta=0.5
+        )
+        self.assertEqual(history.convergedEpoch, 1, "wrong converged epoch")
+        self.assertEqual(len(history.epoch), 4, "fitting is not stopped")
+
+    def test_numpy_backend_stream_fit(self):
+        data = (
+            DataRandom(features=8, observations=2000, seed=1)
+            .makeTarget(TGAlpha())
+            .split(testSize=0.3, seed=1)
+        )
+        history = Fitter(backend="numpy", seed=1).fit(
+            data, batchSize=64, epochs=5, stream=True, blockSize=256
+        )
+        self.assertEqual(len(history.epoch), 5, "wrong number of epochs")
+        self.assertLess(
+            history.history["loss"][-1], history.history["loss"][0], "no training"
+        )
+
+    def test_unknown_backend(self):
+        with self.assertRaises(Exception):
+            Fitter(backend="torch")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,16 +1,16 @@
 import unittest
 
-import os, sys, copy
+import os, sys, copy, tempfile
 
 import numpy as np
 
-from lab.data import Data, DataRandom
+from lab.data import Data, DataRandom, Rows
 
 from lab.target import TGAlpha
 
 from lab.damager import DMGNA, DMGNoiseFeatures, DMGNoiseValues
 
-from lab.fixer import Fixer, FXZero, FXMean
+from lab.fixer import Fixer, FXZero, FXMean, FXKNN
 
 
 class FixersClassTests(unittest.TestCase):
@@ -41,3 +41,198 @@ class FixersClassTests(unittest.TestCase):
         m = FXMean()
         d.fix(m)
         d.info()  # after fix
+
+    def test_meanFixEqualsNanMean(self):
+        x = np.random.rand(1000, 6)
+        x[np.random.rand(1000, 6) < 0.1] = np.nan
+        expected = np.where(np.isnan(x), np.nanmean(x, axis=0), x)
+        fixed = FXMean(blockSize=64, workers=3)(x.copy())
+        self.assertTrue(np.allclose(fixed, expected), "wrong mean values")
+
+    def test_streamingStatistics(self):
+        x = np.random.rand(1000, 4) * 100.0
+        x[np.random.rand(1000, 4) < 0.2] = np.nan
+        s = FXMean(blockSize=37).fit(x).statistics
+        self.assertTrue(np.allclose(s.mean, np.nanmean(x, axis=0)), "wrong means")
+        self.assertTrue(
+            np.allclose(s.variance, np.nanvar(x, axis=0)), "wrong variances"
+        )
+        self.assertListEqual(
+            list(s.na), list(np.isnan(x).sum(axis=0)), "wrong NA counts"
+        )
+
+    def test_fitOnTrainTransformTest(self):
+        train = np.random.rand(100, 3)
+        test = np.array([[np.nan, 0.0, 0.0], [0.0, np.nan, 0.0]])
+        m = FXMean().fit(train)
+        fixed = m.transform(test)
+        self.assertAlmostEqual(fixed[0, 0], train[:, 0].mean(), msg="wrong value")
+        self.assertAlmostEqual(fixed[1, 1], train[:, 1].mean(), msg="wrong value")
+
+        d = Data().setX(np.array([[np.nan, 1.0, 1.0]])).fix(m, refit=False)
+        self.assertAlmostEqual(d.x[0, 0], train[:, 0].mean(), msg="data refitted")
+
+    def test_overlayVariants(self):
+        base = np.arange(40, dtype=float).reshape((8, 5))
+        d = Data().setX(base.copy()).damage(self.dmgNA, 0.25, overlay=True)
+        self.assertTrue(np.array_equal(d.x, base), "the base data is changed")
+        self.assertEqual(len(d.na), 10, "wrong number of NA cells")
+        self.assertEqual(np.isnan(d.rows(0, 8)).sum(), 10, "NA cells are not NaN")
+
+        zero = d.variant(FXZero())
+        mean = d.variant(FXMean())
+        self.assertIs(zero.x, d.x, "the variant copied the base data")
+        self.assertIs(mean.x, d.x, "the variant copied the base data")
+
+        damaged = d.rows(0, 8)
+        self.assertTrue(
+            np.array_equal(zero.rows(0, 8), FXZero()(damaged.copy())),
+            "wrong zero overlay values",
+        )
+        self.assertTrue(
+            np.allclose(mean.rows(0, 8), FXMean()(damaged.copy())),
+            "wrong mean overlay values",
+        )
+
+    def test_splitOverlayVariants(self):
+        d = DataRandom(features=4, observations=200, seed=1).makeTarget(TGAlpha())
+        d.damage(DMGNA(seed=2), 0.2, overlay=True)
+        for views in [False, True]:
+            split = copy.copy(d).split(testSize=0.25, seed=3, views=views)
+            self.assertGreater(np.isnan(split.xTrain).sum(), 0, "subsets not damaged")
+            zero, mean = split.variant(FXZero()), split.variant(FXMean())
+            fixed = split.variant(FXZero()).rows(0, 200)
+            self.assertTrue(
+                np.array_equal(zero.xTest, fixed[split.rowsTest]), "stale subsets"
+            )
+            self.assertFalse(np.isnan(mean.xTrain).any(), "subsets not fixed")
+            self.assertFalse(np.array_equal(zero.xTrain, mean.xTrain), "same subsets")
+            self.assertEqual(
+                np.isnan(split.xTrain).sum(),
+                np.isnan(split.rows(0, 200)[split.rowsTrain]).sum(),
+            )
+
+    def test_variantsShareSubsets(self):
+        d = DataRandom(features=4, observations=200, seed=1).makeTarget(TGAlpha())
+        d.damage(DMGNA(seed=2), 0.2, overlay=True).split(testSize=0.25, seed=3)
+        zero, mean = d.variant(FXZero()), d.variant(FXMean())
+        self.assertIsInstance(zero.xTrain, Rows, "the subset is a copy")
+        self.assertTrue(np.shares_memory(zero.x, mean.x), "the base data is copied")
+
+        batch = np.empty((10, 4), dtype=np.float32)
+        mean.xTrain.rows(5, 15, out=batch)
+        expected = mean.rows(0, 200)[mean.rowsTrain[5:15]].astype(np.float32)
+        self.assertTrue(np.array_equal(batch, expected), "wrong batch rows")
+
+        with tempfile.TemporaryDirectory() as path:
+            for format in ["npy", "pickle"]:
+                url = mean.save(path, format=format)
+                read = Data().read(url)
+                self.assertIsInstance(read.xTest, Rows, "the subset is stored")
+                self.assertTrue(np.array_equal(read.xTest, mean.xTest), "wrong rows")
+                del read
+
+    def test_overlayAfterSplitIsRejected(self):
+        d = DataRandom(features=4, observations=100, seed=1).makeTarget(TGAlpha())
+        d.split(testSize=0.25, seed=3)
+        with self.assertRaises(Exception):
+            d.damage(DMGNA(seed=2), 0.1, overlay=True)
+
+    def test_meanOverlayFillOfEmptyColumn(self):
+        x = np.random.rand(10, 3)
+        with np.errstate(all="raise"):
+            fill = FXMean().fill(x, np.arange(1, 30, 3))
+        self.assertTrue(np.isnan(fill).all(), "the empty column has a mean")
+
+    def test_overlayFixRefit(self):
+        d = Data().setX(np.random.rand(50, 4)).damage(self.dmgNA, 0.2, overlay=True)
+        stale = FXMean().fit(np.full((3, 4), 100.0))
+        fixed = d.variant(stale).rows(0, 50)
+        self.assertTrue(np.allclose(fixed, FXMean()(d.rows(0, 50))), "stale means")
+
+        stale.fit(np.full((3, 4), 100.0))
+        kept = copy.copy(d).fix(stale, refit=False).rows(0, 50)
+        self.assertTrue(np.all(kept[np.isnan(d.rows(0, 50))] == 100.0), "refitted")
+
+        with self.assertRaises(Exception):
+            copy.copy(d).fix(FXMean(), refit=False)
+
+    def test_overlayFolds(self):
+        d = DataRandom(features=4, observations=100, seed=1).makeTarget(TGAlpha())
+        d.damage(DMGNA(seed=2), 0.2, overlay=True).fix(FXMean())
+        for fold in d.folds(k=4, seed=1):
+            self.assertFalse(hasattr(fold, "na"), "the fold keeps the overlay")
+            self.assertTrue(
+                np.array_equal(fold.rows(0, 100), fold.x), "wrong fold rows"
+            )
+
+    def test_fixOnTrainingRows(self):
+        d = DataRandom(features=4, observations=200, seed=1).makeTarget(TGAlpha())
+        d.damage(DMGNA(seed=2), 0.2, overlay=True).split(testSize=0.25, seed=3)
+        means = np.nanmean(np.asarray(d.xTrain), axis=0)
+        test = np.asarray(d.xTest)
+
+        fixed = np.asarray(d.variant(FXMean(), train=True).xTest)
+        self.assertTrue(
+            np.allclose(fixed, np.where(np.isnan(test), means, test)),
+            "the test rows leak into the statistics",
+        )
+
+        copies = Data().setX(d.rows(0, 200))
+        copies.y = d.y
+        copies.split(testSize=0.25, seed=3).fix(FXMean(), train=True)
+        self.assertTrue(np.allclose(copies.xTest, fixed), "wrong fixed test subset")
+
+        with self.assertRaises(Exception):
+            Data().setX(d.rows(0, 200)).fix(FXMean(), train=True)
+
+    def test_overlayRowsBlock(self):
+        d = Data().setX(np.random.rand(50, 4)).damage(self.dmgNA, 0.2, overlay=True)
+        d.fix(FXMean())
+        batch = np.empty((10, 4))
+        d.rows(20, 30, out=batch)
+        self.assertTrue(
+            np.array_equal(batch, d.rows(0, 50)[20:30]), "wrong rows of the block"
+        )
+
+    def test_sweepVariants(self):
+        d = Data().setX(np.random.rand(200, 5))
+        variants = d.sweep(DMGNA(seed=1), [0.01, 0.1])
+        self.assertEqual(len(variants), 2, "wrong number of variants")
+        self.assertTrue(
+            np.all(np.isin(variants[0].na, variants[1].na)), "masks are not nested"
+        )
+        fixed = variants[1].variant(FXMean()).rows(0, 200)
+        self.assertFalse(np.isnan(fixed).any(), "the variant is not fixed")
+        self.assertIs(variants[1].x, d.x, "the variant copied the base data")
+
+    def test_knnFixEqualsBruteForce(self):
+        x = np.random.rand(300, 5)
+        x[np.random.rand(300, 5) < 0.05] = np.nan
+        complete = x[~np.isnan(x).any(axis=1)]
+
+        expected = x.copy()
+        for row in expected:
+            observed = ~np.isnan(row)
+            if observed.all():
+                continue
+            distance = np.sum((complete[:, observed] - row[observed]) ** 2, axis=1)
+            nearest = np.argsort(distance)[:3]
+            row[~observed] = complete[nearest][:, ~observed].mean(axis=0)
+
+        knn = FXKNN(k=3, blockSize=50, workers=2, referenceBlock=16)
+        fixed = knn(x.copy())
+        self.assertTrue(np.allclose(fixed, expected), "wrong neighbours values")
+        self.assertGreater(knn.rowsPerSecond, 0.0, "throughput is not reported")
+
+    def test_knnQueryBatches(self):
+        x = np.random.rand(200, 4)
+        x[np.random.rand(200, 4) < 0.2] = np.nan
+        whole = FXKNN(k=3, referenceBlock=4096)(x.copy())
+        batched = FXKNN(k=3, referenceBlock=8)(x.copy())
+        self.assertTrue(np.allclose(batched, whole), "batches change the values")
+
+    def test_knnOverlayFill(self):
+        d = Data().setX(np.random.rand(100, 4)).damage(self.dmgNA, 0.05, overlay=True)
+        fixed = d.variant(FXKNN(k=2)).rows(0, 100)
+        self.assertFalse(np.isnan(fixed).any(), "the variant is not fixed")
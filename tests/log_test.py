@@ -0,0 +1,62 @@
+import unittest
+
+import os, sys, logging
+
+from lab.log import PACKAGE, Fields, configure, logger, record
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, r):
+        self.records.append(r)
+
+
+class LogTests(unittest.TestCase):
+    def setUp(self):
+        self.capture = Capture()
+        self.log = logger("LogTests")
+        self.log.addHandler(self.capture)
+
+    def tearDown(self):
+        self.log.removeHandler(self.capture)
+        self.log.setLevel(logging.NOTSET)
+
+    def test_logging_is_configured_once(self):
+        self.assertIs(configure(), configure(), "logging is configured twice")
+        handlers = logging.getLogger(PACKAGE).handlers
+        self.assertEqual(len(handlers), 1, "wrong number of package handlers")
+        self.assertIsInstance(handlers[0], logging.handlers.QueueHandler)
+
+    def test_package_logger_name(self):
+        self.assertEqual(self.log.name, PACKAGE + ".LogTests", "wrong logger name")
+
+    def test_structured_record(self):
+        record(self.log, "stage", shape=(2, 3), duration=0.5)
+        self.assertEqual(len(self.capture.records), 1, "record is missing")
+        r = self.capture.records[0]
+        self.assertEqual(r.stage, "stage", "wrong stage")
+        self.assertDictEqual(r.fields, {"shape": (2, 3), "duration": 0.5})
+        self.assertEqual(
+            r.getMessage(), 'stage() {"shape": [2, 3], "duration": 0.5}', "wrong message"
+        )
+
+    def test_disabled_level_skips_record(self):
+        self.log.setLevel(logging.WARNING)
+        record(self.log, "stage", rows=1)
+        self.assertEqual(len(self.capture.records), 0, "disabled record is logged")
+
+    def test_lazy_fields(self):
+        class Expensive:
+            def __str__(self):
+                raise AssertionError("formatted")
+
+        self.log.setLevel(logging.WARNING)
+        self.log.info("%s", Fields({"value": Expensive()}))
+        self.assertEqual(len(self.capture.records), 0, "disabled record is logged")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,7 +4,7 @@ import keras
 
 from keras import Sequential
 
-from lab.model import ModelDDDD
+from lab.model import ModelDDDD, ModelStacked
 
 
 class ModelDDDDClassTests(unittest.TestCase):
@@ -25,3 +25,11 @@ class ModelDDDDClassTests(unittest.TestCase):
         self.assertRegexpMatches(
             s, "Total params", "the missing term `Total params` in the model summary"
         )
+
+    def test_stacked_model_replicas(self):
+        m = ModelStacked(40, replicas=3)()
+        self.assertEqual(len(m.inputs), 3, "wrong number of replica inputs")
+        self.assertEqual(len(m.outputs), 3, "wrong number of replica outputs")
+        self.assertEqual(
+            m.count_params(), 3 * self.model().count_params(), "replicas share weights"
+        )
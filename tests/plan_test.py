@@ -0,0 +1,98 @@
+import unittest
+
+import os, tempfile
+
+import numpy as np
+
+from lab.data import Data, DataRandom
+
+from lab.plan import Plan, execute
+
+from lab.target import TGAlpha
+
+from lab.damager import DMGNA, DMGNoiseFeatures
+
+from lab.fixer import FXKNN, FXMean, FXZero
+
+
+class PlanClassTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.base = (
+            DataRandom.lazy(features=5, observations=1000, seed=1, blockSize=128)
+            .makeTarget(TGAlpha())
+            .damage(DMGNoiseFeatures(seed=2), 2)
+            .damage(DMGNA(seed=3, blockSize=300), 0.1)
+        )
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def assertSameData(self, data, expected):
+        self.assertEqual(data.recipe, expected.recipe, "recipe differs")
+        self.assertTrue(
+            np.allclose(data.x, expected.x, equal_nan=True), "features differ"
+        )
+        self.assertTrue(np.array_equal(data.y, expected.y), "targets differ")
+
+    def test_chained_call_returns_new_plan(self):
+        plan = self.base.fix(FXZero())
+        self.assertIsInstance(plan, Plan, "not a plan")
+        self.assertEqual(len(self.base.calls), 3, "base plan changed")
+        self.assertEqual(len(plan.calls), 4, "call not recorded")
+
+    def test_execute_equals_eager_build(self):
+        for fixer in [FXZero, FXMean]:
+            data = self.base.fix(fixer()).execute()
+            self.assertSameData(data, self.base.fix(fixer()).build())
+
+    def test_branches_share_upstream(self):
+        zero, mean = execute([self.base.fix(FXZero()), self.base.fix(FXMean())])
+        damaged = self.base.build()
+        self.assertSameData(zero, self.base.fix(FXZero()).build())
+        self.assertSameData(mean, self.base.fix(FXMean()).build())
+        self.assertEqual(np.sum(np.isnan(zero.x)), 0, "NaN not fixed")
+        self.assertTrue(
+            np.array_equal(np.isnan(damaged.x), zero.x != mean.x), "branches mixed"
+        )
+
+    def test_branch_damage_is_not_shared(self):
+        source = DataRandom.lazy(features=6, observations=1000, seed=1)
+        damaged = source.makeTarget(TGAlpha()).damage(DMGNA(seed=2), 0.3)
+        clean = source.makeTarget(TGAlpha())
+        a, b = execute([damaged, clean])
+        self.assertSameData(a, damaged.build())
+        self.assertSameData(b, clean.build())
+        self.assertEqual(np.sum(np.isnan(b.x)), 0, "damage of the other branch")
+
+    def test_not_fused_calls_run_after_pass(self):
+        plan = self.base.split(testSize=0.25, seed=4).fix(FXZero())
+        data = self.base.split(testSize=0.25, seed=4).execute()
+        expected = self.base.split(testSize=0.25, seed=4).build()
+        self.assertSameData(data, expected)
+        self.assertTrue(
+            np.array_equal(data.xTest, expected.xTest, equal_nan=True), "split differs"
+        )
+        self.assertEqual(len(plan.stages((1000, 5), {})), 3, "wrong fused calls")
+        self.assertEqual(
+            len(self.base.fix(FXKNN(k=2)).stages((1000, 5), {})), 3, "KNN fused"
+        )
+
+    def test_overlay_is_fused(self):
+        plan = DataRandom.lazy(
+            features=4, observations=500, seed=1, blockSize=64
+        ).damage(DMGNA(seed=2), 0.05, overlay=True)
+        data, expected = plan.execute(), plan.build()
+        self.assertTrue(np.array_equal(data.na, expected.na), "overlay differs")
+        self.assertTrue(np.array_equal(data.x, expected.x), "base data damaged")
+        self.assertFalse(data.x.flags.writeable, "base data writeable")
+
+    def test_save_writes_arrays_in_place(self):
+        url = self.base.fix(FXMean()).save(self.dir.name, name="plan")
+        data = Data().read(url)
+        self.assertSameData(data, self.base.fix(FXMean()).build())
+
+    def test_different_sources_are_rejected(self):
+        other = DataRandom.lazy(features=5, observations=1000, seed=2)
+        with self.assertRaises(Exception):
+            execute([self.base, other])
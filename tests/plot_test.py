@@ -0,0 +1,71 @@
+import unittest
+
+import os, sys, tempfile
+
+from lab.plot import (
+    FIGURES,
+    FittingAccuracy,
+    FittingLossFunction,
+    FittingOverlay,
+    FittingPanels,
+    render,
+)
+
+
+class PlotClassTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.relpath(self.dir.name)
+        self.history = {
+            "accuracy": [0.5, 0.6, 0.7],
+            "val_accuracy": [0.5, 0.55, 0.6],
+            "loss": [0.7, 0.6, 0.5],
+            "val_loss": [0.7, 0.65, 0.6],
+        }
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_accuracy_plot(self):
+        url = FittingAccuracy("test", path=self.path).plot(self.history)
+        self.assertTrue(os.path.exists(url), "plot file is missing")
+
+    def test_figures_are_reused(self):
+        for _ in range(3):
+            FittingLossFunction("test", path=self.path).plot(self.history)
+        self.assertEqual(len(FIGURES), 1, "figures are not reused")
+
+    def test_overlay_plot(self):
+        url = FittingOverlay("test", path=self.path, fileName="overlay.png").plot(
+            {"0": self.history, "Mu": self.history}
+        )
+        self.assertTrue(url.endswith("overlay.png"), "wrong plot file name")
+        self.assertTrue(os.path.exists(url), "plot file is missing")
+
+    def test_panels_plot(self):
+        panels = {
+            "NA={0}".format(na): {"0": self.history, "Mu": self.history}
+            for na in [0.01, 0.1, 0.2, 0.3]
+        }
+        url = FittingPanels("test", path=self.path).plot(panels, "val_loss")
+        self.assertTrue(os.path.exists(url), "plot file is missing")
+
+    def test_parallel_rendering(self):
+        jobs = [
+            {
+                "plot": FittingAccuracy,
+                "args": {"dataSignature": str(i), "path": self.path},
+                "data": self.history,
+            }
+            for i in range(4)
+        ]
+        jobs.append({"plot": FittingAccuracy, "data": {}})
+
+        urls = render(jobs, workers=2)
+        self.assertEqual(len(urls), 5, "wrong number of plots")
+        self.assertTrue(all(os.path.exists(u) for u in urls[:4]), "plots are missing")
+        self.assertEqual(urls[4], "", "failed plot has URL")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+import os, sys, json, subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BUDGET = float(os.environ.get("LAB_IMPORT_BUDGET", "1.0"))  # seconds
+
+HEAVY = ["keras", "tensorflow", "matplotlib", "seaborn", "pandas", "sklearn"]
+
+PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import numpy
+numpyLoaded = time.perf_counter()
+import {modules}
+finished = time.perf_counter()
+print(json.dumps({{
+    "numpy": numpyLoaded - started,
+    "lab": finished - numpyLoaded,
+    "loaded": sorted(m for m in {heavy} if m in sys.modules),
+}}))
+"""
+
+
+def probe(modules: str) -> dict:
+    """Imports the modules in a fresh interpreter and measures the import time"""
+    output = subprocess.check_output(
+        [sys.executable, "-c", PROBE.format(modules=modules, heavy=HEAVY)], cwd=ROOT
+    )
+    return json.loads(output)
+
+
+class StartupTests(unittest.TestCase):
+    def test_data_modules_import_within_budget(self):
+        result = probe("lab.data, lab.damager, lab.fixer, lab.target, lab.cache")
+        self.assertListEqual(result["loaded"], [], "heavy modules are imported")
+        self.assertLess(result["lab"], BUDGET, "import time is over the budget")
+
+    def test_fitting_modules_import_without_framework(self):
+        result = probe("lab.fitter, lab.model, lab.plot, lab.sweep, lab.worker")
+        self.assertListEqual(result["loaded"], [], "heavy modules are imported")
+        self.assertLess(result["lab"], BUDGET, "import time is over the budget")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+import os, sys, tempfile
+
+import numpy as np
+
+from lab.model import History
+
+from lab.store import HistoryStore
+
+
+class HistoryStoreClassTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.store = HistoryStore(self.dir.name)
+        self.history = History()
+        for epoch in range(3):
+            self.history.append(
+                epoch, {"accuracy": 0.5 + epoch / 10, "loss": 0.75 - epoch / 8}
+            )
+        self.history.convergedEpoch = 2
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_stored_history(self):
+        k = self.store.put(self.history, {"na": 0.1, "fixer": "zero"})
+        history = self.store.get(k)
+        self.assertListEqual(history.epoch, [0, 1, 2], "wrong epochs")
+        self.assertTrue(
+            np.allclose(history.history["accuracy"], [0.5, 0.6, 0.7]), "wrong metric"
+        )
+        self.assertListEqual(
+            history.history["loss"], [0.75, 0.625, 0.5], "wrong metric"
+        )
+        self.assertEqual(history.convergedEpoch, 2, "wrong converged epoch")
+        self.assertDictEqual(
+            history.parameters, {"na": 0.1, "fixer": "zero"}, "wrong parameters"
+        )
+
+    def test_compact_format(self):
+        k = self.store.put(self.history, {"na": 0.1})
+        values = np.load(os.path.join(self.dir.name, k + ".npy"))
+        self.assertEqual(values.dtype, np.float32, "wrong data type")
+        self.assertTupleEqual(values.shape, (3, 2), "wrong shape")
+
+    def test_metrics_of_different_lengths(self):
+        k = self.store.put({"loss": [0.5, 0.4], "val_loss": [0.6]}, {"na": 0.1})
+        self.assertEqual(
+            len(self.store.get(k).history["val_loss"]), 1, "wrong metric length"
+        )
+
+    def test_metrics_keep_nan_values(self):
+        k = self.store.put({"loss": [0.5, np.nan, 0.4], "val_loss": [0.6]}, {})
+        history = self.store.get(k).history
+        self.assertEqual(len(history["loss"]), 3, "NaN value is dropped")
+        self.assertTrue(np.isnan(history["loss"][1]), "wrong NaN value")
+        self.assertEqual(len(history["val_loss"]), 1, "padding is kept")
+
+    def test_converged_epoch_of_metrics(self):
+        k = self.store.put({"loss": [0.5, 0.4]}, {"na": 0.1}, convergedEpoch=1)
+        self.assertEqual(self.store.get(k).convergedEpoch, 1, "epoch is lost")
+
+    def test_index_is_persistent(self):
+        self.store.put(self.history, {"na": 0.1, "fixer": "zero"})
+        self.store.put(self.history, {"na": 0.1, "fixer": "mean"})
+        self.store.put(self.history, {"na": 0.2, "fixer": "zero"})
+        self.store.put(self.history, {"na": 0.2, "fixer": "zero"})
+
+        store = HistoryStore(self.dir.name)
+        self.assertEqual(len(store.find()), 3, "wrong number of runs")
+        self.assertEqual(len(store.find(na=0.1)), 2, "wrong selection")
+        self.assertEqual(len(store.load(na=0.2, fixer="zero")), 1, "wrong selection")
+
+    def test_missing_run(self):
+        with self.assertRaises(Exception):
+            self.store.get("0" * 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import unittest
+
+import os, sys, json, tempfile
+
+from unittest import mock
+
+import numpy as np
+
+from lab import trace
+
+from lab.data import Data
+
+from concurrent.futures import ProcessPoolExecutor
+
+from lab.sweep import Sweep, limitThreads, parameters, results, signature
+
+
+class SweepClassTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.sweep = Sweep(
+            {"observations": [200], "na": [0.01, 0.1], "fixer": ["zero", "mean"]},
+            path=self.dir.name,
+            plots="",
+            histories=os.path.join(self.dir.name, "histories"),
+        )
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_jobs_cover_grid(self):
+        jobs = self.sweep.jobs()
+        self.assertEqual(len(jobs), 4, "wrong number of jobs")
+        self.assertEqual(jobs[0]["features"], 15, "default parameter is missing")
+        self.assertEqual(
+            signature(jobs[1]),
+            "F=15, OBS=200, NF=5, NA=0.01, FX=Mu, SPL=0.3",
+            "wrong data signature",
+        )
+
+    def test_prepared_data_is_fixed_and_cached(self):
+        job = self.sweep.jobs()[3]
+        url = self.sweep.prepare(job)
+        with mock.patch.object(Data, "variant") as variant:
+            self.assertEqual(self.sweep.prepare(job), url, "data set is prepared twice")
+        variant.assert_not_called()
+
+        data = Data().read(url)
+        self.assertEqual(len(data.na), 200 * 20 // 10, "wrong number of NA cells")
+        self.assertFalse(np.isnan(data.rows(0, 200)).any(), "data is not fixed")
+        self.assertTrue(data.recipe[-1]["train"], "the fixer learns on the test rows")
+
+    def test_prepared_steps_have_own_seeds(self):
+        data = Data().read(self.sweep.prepare(self.sweep.jobs()[0]))
+        steps = [data.recipe[0]] + [s.get("damager", s) for s in data.recipe[2:5]]
+        self.assertEqual(len({s["seed"] for s in steps}), 4, "steps share the seed")
+
+    def test_fixers_change_training_data(self):
+        zero, mean = [Data().read(self.sweep.prepare(j)) for j in self.sweep.jobs()[2:]]
+        for d in [zero, mean]:
+            self.assertFalse(np.isnan(d.xTrain).any(), "training data is not fixed")
+        self.assertFalse(
+            np.array_equal(zero.xTrain, mean.xTrain), "fixers give the same data"
+        )
+
+    def test_combined_plots(self):
+        self.sweep.plots = os.path.relpath(os.path.join(self.dir.name, "plots"))
+        self.sweep.workers = 1
+        history = {"val_accuracy": [0.5, 0.6], "val_loss": [0.7, 0.6]}
+        history.update(accuracy=[0.5, 0.7], loss=[0.7, 0.5])
+        results = [
+            dict(job, signature=signature(job), status="ok", history=history)
+            for job in self.sweep.jobs()
+        ]
+
+        urls = self.sweep.plot(results)
+        self.assertEqual(len(urls), 2, "wrong number of combined plots")
+        self.assertTrue(all(os.path.exists(u) for u in urls), "plots are missing")
+        self.assertEqual(len(results[0]["images"]), 2, "job plots are missing")
+
+    def test_stored_runs_are_results(self):
+        history = {"val_accuracy": [0.5, 0.6], "val_loss": [0.7, 0.6]}
+        for job in self.sweep.jobs():
+            self.sweep.store.put(history, parameters(job))
+
+        runs = results(self.sweep.store, na=0.1)
+        self.assertEqual(len(runs), 2, "wrong number of runs")
+        self.assertEqual(
+            runs[0]["signature"], signature(self.sweep.jobs()[2]), "wrong signature"
+        )
+        self.assertTrue(
+            np.allclose(runs[0]["history"]["val_loss"], [0.7, 0.6]), "wrong history"
+        )
+
+    def test_traced_run(self):
+        url = os.path.join(self.dir.name, "trace.json")
+        self.sweep.grid["fixer"] = ["zero"]
+        self.sweep.grid["na"] = [0.01]
+        self.sweep.epochs, self.sweep.backend, self.sweep.workers = 2, "numpy", 1
+        self.sweep.trace = url
+
+        result = self.sweep.run()[0]
+        self.assertEqual(result["status"], "ok", "job failed")
+        self.assertEqual(
+            self.sweep.store.get(result["key"]).convergedEpoch,
+            result["convergedEpoch"],
+            "converged epoch is not stored",
+        )
+        with open(url) as f:
+            names = {e["name"] for e in json.load(f)["traceEvents"]}
+        for name in ["Data.makeTarget", "Fitter.fit", "epoch"]:
+            self.assertIn(name, names, "stage is missing")
+
+    def test_failed_run_stops_tracing(self):
+        self.sweep.trace = os.path.join(self.dir.name, "trace.json")
+        self.sweep.grid["fixer"] = ["unknown"]
+        with self.assertRaises(Exception):
+            self.sweep.run()
+        self.assertIsNone(trace.active(), "the tracer is left running")
+
+    def test_running_tracer_is_kept(self):
+        self.sweep.grid["fixer"] = ["zero"]
+        self.sweep.grid["na"] = [0.01]
+        self.sweep.epochs, self.sweep.backend, self.sweep.workers = 2, "numpy", 1
+        self.sweep.trace = os.path.join(self.dir.name, "trace.json")
+
+        tracer = trace.start("")
+        try:
+            self.sweep.run()
+            self.assertIs(trace.active(), tracer, "the running tracer is stopped")
+        finally:
+            trace.stop()
+        self.assertIn("Fitter.fit", {e["name"] for e in tracer.events})
+        self.assertFalse(os.path.exists(self.sweep.trace), "wrong trace file")
+
+
+def threadPools():
+    from threadpoolctl import threadpool_info
+
+    return [pool["num_threads"] for pool in threadpool_info()]
+
+
+class LimitThreadsTests(unittest.TestCase):
+    def test_worker_blas_threads_are_limited(self):
+        with ProcessPoolExecutor(1, initializer=limitThreads, initargs=(1,)) as pool:
+            threads = pool.submit(threadPools).result()
+        self.assertGreater(len(threads), 0, "no BLAS thread pool")
+        self.assertEqual(set(threads), {1}, "thread pools are not limited")
+
+
+if __name__ == "__main__":
+    unittest.main()
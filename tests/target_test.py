@@ -0,0 +1,38 @@
+import unittest
+
+import numpy as np
+
+from lab.target import TargetGenerator, TGAlpha
+
+
+class TGRowSum(TargetGenerator):
+    """The per-row generator without the batch implementation"""
+
+    def __call__(self, x) -> float:
+        return (sum(x) > 1.0) * 1.0
+
+    def LaTeX(self) -> str:
+        return r"$t=(\sum_{i}{f_i}>1)\times1.0$"
+
+
+class TargetGeneratorClassTests(unittest.TestCase):
+    def setUp(self):
+        self.x = np.random.rand(100, 7) * 3.0
+
+    def test_TGAlpha_batch_equals_per_row_call(self):
+        tg = TGAlpha()
+        expected = [tg(row) for row in self.x]
+        self.assertListEqual(
+            list(tg.batch(self.x)), expected, "batch and per-row targets differ"
+        )
+
+    def test_default_batch_uses_per_row_call(self):
+        tg = TGRowSum()
+        expected = [tg(row) for row in self.x]
+        self.assertListEqual(
+            list(tg.batch(self.x)), expected, "default batch differs from __call__"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
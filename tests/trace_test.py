@@ -0,0 +1,80 @@
+import unittest
+
+import os, sys, json, tempfile
+
+from lab import trace
+
+from lab.data import DataRandom
+
+from lab.target import TGAlpha
+
+from lab.damager import DMGNA
+
+from lab.fitter import Fitter
+
+
+class TraceTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.url = os.path.join(self.dir.name, "trace.json")
+
+    def tearDown(self):
+        trace.stop(save=False)
+        self.dir.cleanup()
+
+    def test_no_events_without_tracing(self):
+        self.assertIsNone(trace.active(), "tracing is on")
+        DataRandom(features=5, observations=100, seed=1).makeTarget(TGAlpha())
+        self.assertIsNone(trace.stop(), "tracer is created")
+
+    def test_data_pipeline_stages(self):
+        tracer = trace.start(self.url)
+        data = (
+            DataRandom(features=5, observations=100, seed=1)
+            .makeTarget(TGAlpha())
+            .damage(DMGNA(seed=1), 0.1)
+            .split(testSize=0.3, seed=1)
+        )
+        names = [e["name"] for e in tracer.events]
+        self.assertListEqual(
+            names,
+            ["DataRandom.__init__", "Data.makeTarget", "Data.damage", "Data.split"],
+            "wrong stages",
+        )
+
+        event = tracer.events[1]
+        self.assertEqual(event["ph"], "X", "wrong event type")
+        self.assertGreaterEqual(event["dur"], 0, "wrong duration")
+        self.assertEqual(event["args"]["bytesIn"], 100 * 5 * 8, "wrong input size")
+        self.assertEqual(event["args"]["bytesOut"], 100 * 6 * 8, "wrong output size")
+        self.assertListEqual(event["args"]["shape"], [100, 5], "wrong shape")
+        for name in ["cpu", "rssPeakDelta"]:
+            self.assertIn(name, event["args"], "value is missing")
+
+    def test_trace_file(self):
+        trace.start(self.url)
+        DataRandom(features=5, observations=100, seed=1)
+        trace.stop()
+
+        with open(self.url) as f:
+            events = json.load(f)["traceEvents"]
+        self.assertEqual(len(events), 1, "wrong number of events")
+
+    def test_fit_epochs(self):
+        data = (
+            DataRandom(features=8, observations=500, seed=1)
+            .makeTarget(TGAlpha())
+            .split(testSize=0.3, seed=1)
+        )
+        tracer = trace.start(self.url)
+        Fitter(backend="numpy", seed=1).fit(data, batchSize=64, epochs=3)
+
+        epochs = [e for e in tracer.events if e["name"] == "epoch"]
+        self.assertEqual(len(epochs), 3, "wrong number of epochs")
+        self.assertGreater(epochs[0]["args"]["samplesPerSecond"], 0, "wrong speed")
+        self.assertIn("val_loss", epochs[0]["args"], "metrics are missing")
+        self.assertEqual(tracer.events[-1]["name"], "Fitter.fit", "fit is missing")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+
+import os, sys, tempfile, threading, time
+
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from lab.worker import KEY, authkey, run, serve, stop, submit
+
+
+class WorkerTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.address = os.path.join(self.dir.name, "worker.sock")
+        self.job = {
+            "url": os.path.join(self.dir.name, "missing.pkl"),
+            "signature": "",
+            "epochs": 1,
+            "batchSize": 32,
+            "plots": "",
+        }
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_failed_job_returns_error(self):
+        result = run(self.job)
+        self.assertEqual(result["status"], "failed", "wrong job status")
+        self.assertGreater(len(result["error"]), 0, "error is missing")
+
+    def test_submit_without_worker_raises(self):
+        with self.assertRaises(OSError):
+            submit(self.job, self.address)
+
+    def test_worker_runs_jobs_until_stopped(self):
+        worker = threading.Thread(target=serve, args=(self.address,))
+        worker.start()
+        for _ in range(100):
+            if os.path.exists(self.address):
+                break
+            time.sleep(0.1)
+
+        for _ in range(2):
+            result = submit(self.job, self.address)
+            self.assertEqual(result["url"], self.job["url"], "wrong job result")
+            self.assertEqual(result["status"], "failed", "wrong job status")
+
+        stop(self.address)
+        worker.join(timeout=10)
+        self.assertFalse(worker.is_alive(), "worker is not stopped")
+
+    def test_worker_survives_broken_connections(self):
+        worker = threading.Thread(target=serve, args=(self.address,))
+        worker.start()
+        for _ in range(100):
+            if os.path.exists(self.address):
+                break
+            time.sleep(0.1)
+
+        key = authkey(self.address)
+        Client(self.address, family="AF_UNIX", authkey=key).close()
+        with Client(self.address, family="AF_UNIX", authkey=key) as connection:
+            connection.send(["not", "a", "job"])
+            with self.assertRaises(EOFError):
+                connection.recv()
+
+        result = submit(self.job, self.address)
+        self.assertEqual(result["url"], self.job["url"], "worker is stopped")
+
+        stop(self.address)
+        worker.join(timeout=10)
+        self.assertFalse(worker.is_alive(), "worker is not stopped")
+
+    def test_shared_directory_is_rejected(self):
+        shared = os.path.join(self.dir.name, "shared")
+        os.mkdir(shared)
+        os.chmod(shared, 0o777)
+        with self.assertRaises(Exception):
+            serve(os.path.join(shared, "worker.sock"))
+        with self.assertRaises(OSError):  # the client falls back to `run()`
+            submit(self.job, os.path.join(shared, "worker.sock"))
+
+    def test_client_rejects_socket_without_key(self):
+        with open(os.path.join(self.dir.name, KEY), "wb") as f:
+            f.write(b"secret")
+
+        with Listener(self.address, family="AF_UNIX") as listener:
+
+            def reply():
+                with listener.accept() as connection:
+                    connection.send({"status": "ok"})
+
+            fake = threading.Thread(target=reply)
+            fake.start()
+            with self.assertRaises(AuthenticationError):
+                submit(self.job, self.address)
+            fake.join(timeout=10)
+
+
+if __name__ == "__main__":
+    unittest.main()